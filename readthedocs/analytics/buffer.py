@@ -0,0 +1,104 @@
+"""
+Buffer of page views.
+
+Registering a page view with ``get_or_create`` and an ``UPDATE`` on each request
+locks the rows of the most visited pages on the request path.
+When ``RTD_PAGEVIEWS_BUFFER`` is enabled, page views are counted in memory per process,
+keyed by (project, version, path, date, status),
+and the counts are sent to a task that adds them to ``PageView`` in bulk
+(see ``PageViewManager.increment_page_views``).
+
+The buffer is sent when it has ``RTD_PAGEVIEWS_BUFFER_MAX_SIZE`` different pages,
+when ``RTD_PAGEVIEWS_BUFFER_INTERVAL`` seconds have passed since it was last sent,
+or when the process exits.
+The interval is checked by a daemon thread started by the first page view of each process,
+so page views aren't kept in the buffer of a process that stops receiving requests.
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import Counter
+
+import structlog
+from django.conf import settings
+
+log = structlog.get_logger(__name__)
+
+
+class PageViewBuffer:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._full_paths = {}
+        self._last_flush = time.monotonic()
+        # PID of the process that started the timer, threads aren't copied to forked processes.
+        self._timer_pid = None
+
+    def add(self, project_id, version_id, path, full_path, date, status):
+        key = (project_id, version_id, path, date.isoformat(), status)
+        with self._lock:
+            self._start_timer()
+            self._counts[key] += 1
+            self._full_paths.setdefault(key, full_path)
+            should_flush = (
+                len(self._counts) >= int(settings.RTD_PAGEVIEWS_BUFFER_MAX_SIZE)
+                or time.monotonic() - self._last_flush >= int(settings.RTD_PAGEVIEWS_BUFFER_INTERVAL)
+            )
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Send the buffered page views to be saved by a task."""
+        from readthedocs.analytics.tasks import increment_page_views
+
+        with self._lock:
+            page_views = [
+                [*key, self._full_paths[key], count]
+                for key, count in self._counts.items()
+            ]
+            self._counts.clear()
+            self._full_paths.clear()
+            self._last_flush = time.monotonic()
+
+        if not page_views:
+            return
+        try:
+            increment_page_views.delay(page_views)
+        except Exception:
+            log.exception('Failed to send page views.', count=len(page_views))
+
+    def _start_timer(self):
+        """Start the thread that sends the buffer periodically, it must be called holding the lock."""
+        if self._timer_pid == os.getpid():
+            return
+        self._timer_pid = os.getpid()
+        threading.Thread(
+            target=self._run_timer,
+            name='page-view-buffer',
+            daemon=True,
+        ).start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self._flush_if_due())
+
+    def _flush_if_due(self):
+        """
+        Send the buffer if ``RTD_PAGEVIEWS_BUFFER_INTERVAL`` seconds have passed since it was last sent.
+
+        :returns: the seconds until the buffer has to be sent again.
+        """
+        interval = int(settings.RTD_PAGEVIEWS_BUFFER_INTERVAL)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+        return max(self._last_flush + interval - time.monotonic(), 1)
+
+    def __len__(self):
+        return len(self._counts)
+
+
+page_view_buffer = PageViewBuffer()
+atexit.register(page_view_buffer.flush)
@@ -0,0 +1,83 @@
+"""
+Benchmark registering page views.
+
+Registers ``--views`` page views spread over ``--pages`` pages of a project
+inside a transaction that is rolled back,
+and reports the time and the number of queries that write to the database:
+updating ``PageView`` on each page view (the previous implementation),
+and buffering the page views (``RTD_PAGEVIEWS_BUFFER``).
+
+The buffered page views are saved by a task,
+run it with ``CELERY_ALWAYS_EAGER`` (the default in development)
+so they are saved in the same process.
+
+Invoked via ``./manage.py benchmark_page_views --views 10000 --pages 100``.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.crypto import get_random_string
+
+from readthedocs.analytics.buffer import page_view_buffer
+from readthedocs.analytics.models import PageView
+from readthedocs.projects.models import Project
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', type=int, default=10000)
+        parser.add_argument('--pages', type=int, default=100)
+
+    def handle(self, *args, **options):
+        for buffered in (False, True):
+            try:
+                with transaction.atomic():
+                    self._benchmark(options['views'], options['pages'], buffered)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def _benchmark(self, views, pages, buffered):
+        project = Project.objects.create(
+            name='Benchmark page views',
+            slug=f'benchmark-page-views-{get_random_string(8).lower()}',
+        )
+        version = project.versions.first()
+
+        with override_settings(RTD_PAGEVIEWS_BUFFER=buffered):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.monotonic()
+                for i in range(views):
+                    PageView.objects.register_page_view(
+                        project=project,
+                        version=version,
+                        path=f'page-{i % pages}.html',
+                        full_path=f'/en/latest/page-{i % pages}.html',
+                        status=200,
+                    )
+                page_view_buffer.flush()
+                elapsed = time.monotonic() - start
+
+        writes = sum(
+            1
+            for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE'))
+        )
+        view_count = sum(
+            PageView.objects.filter(project=project).values_list('view_count', flat=True),
+        )
+        name = 'buffered' if buffered else 'per request'
+        self.stdout.write(
+            f'{name}: {elapsed * 1000:.1f} ms, '
+            f'{len(queries)} queries, {writes} writes, {view_count} views saved',
+        )
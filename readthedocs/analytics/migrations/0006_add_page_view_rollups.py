@@ -0,0 +1,46 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0090_dont_allow_ips_on_domains'),
+        ('analytics', '0005_add_unique_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageViewTopPage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.PositiveIntegerField(default=200)),
+                ('per_version', models.BooleanField(default=False, help_text='Pages are grouped by full path instead of path.')),
+                ('rank', models.PositiveIntegerField()),
+                ('path', models.CharField(max_length=4096)),
+                ('url_path', models.CharField(help_text='Path of the page in the documentation of the project.', max_length=4096)),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('date', models.DateField(help_text='Last day of the period.')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_view_top_pages', to='projects.project')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'unique_together': {('project', 'status', 'per_version', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PageViewDailyTotal',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.PositiveIntegerField(default=200)),
+                ('view_count', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_view_daily_totals', to='projects.project')),
+            ],
+            options={
+                'unique_together': {('project', 'date', 'status')},
+            },
+        ),
+    ]
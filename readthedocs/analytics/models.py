@@ -3,15 +3,23 @@ import datetime
 from collections import namedtuple
 from urllib.parse import urlparse
 
-from django.db import models
+import structlog
+from django.conf import settings
+from django.db import connection, models
 from django.db.models import Sum
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from readthedocs.analytics.buffer import page_view_buffer
 from readthedocs.builds.models import Version
 from readthedocs.core.resolver import resolve, resolve_path
 from readthedocs.projects.models import Feature, Project
 
+log = structlog.get_logger(__name__)
+
+# Number of page views added in each query when saving buffered page views.
+PAGEVIEWS_UPSERT_BATCH_SIZE = 500
+
 
 def _last_30_days_iter():
     """Returns iterator for previous 30 days (including today)."""
@@ -26,7 +34,13 @@ class PageViewManager(models.Manager):
     """Manager for PageView model."""
 
     def register_page_view(self, project, version, path, full_path, status):
-        """Track page view with the given parameters."""
+        """
+        Track page view with the given parameters.
+
+        If ``RTD_PAGEVIEWS_BUFFER`` is enabled, the page view is buffered
+        and saved later by a task (see ``readthedocs.analytics.buffer``),
+        ``None`` is returned in that case.
+        """
         # TODO: remove after the migration of duplicate records has been completed.
         if project.has_feature(Feature.DISABLE_PAGEVIEWS):
             return
@@ -35,6 +49,17 @@ class PageViewManager(models.Manager):
         path = "/" + path.lstrip("/")
         full_path = "/" + full_path.lstrip("/")
 
+        if settings.RTD_PAGEVIEWS_BUFFER:
+            page_view_buffer.add(
+                project_id=project.pk,
+                version_id=version.pk if version else None,
+                path=path,
+                full_path=full_path,
+                date=timezone.now().date(),
+                status=status,
+            )
+            return None
+
         page_view, created = self.get_or_create(
             project=project,
             version=version,
@@ -51,6 +76,66 @@ class PageViewManager(models.Manager):
             page_view.save(update_fields=["view_count"])
         return page_view
 
+    def increment_page_views(self, page_views):
+        """
+        Add the view counts of ``page_views`` with one query per batch.
+
+        Rows that don't exist are created, and the count of existing rows is increased
+        (``INSERT ... ON CONFLICT DO UPDATE``).
+        There is one query for page views with a version and another for page views without it,
+        since they are unique on different constraints.
+
+        :param page_views: list of (project_id, version_id, path, date, status, full_path, count).
+        """
+        # Rows are unique per key, otherwise the same row would be updated twice in one query.
+        rows = {}
+        for project_id, version_id, path, date, status, full_path, count in page_views:
+            key = (project_id, version_id, path, date, status)
+            if key in rows:
+                rows[key][4] += count
+            else:
+                rows[key] = [project_id, version_id, path, full_path, count, date, status]
+
+        with_version = [row for row in rows.values() if row[1] is not None]
+        without_version = [row for row in rows.values() if row[1] is None]
+        self._upsert(with_version, conflict='(project_id, version_id, path, date, status)')
+        self._upsert(
+            without_version,
+            conflict='(project_id, path, date, status) WHERE version_id IS NULL',
+        )
+
+    def _upsert(self, rows, conflict):
+        table = self.model._meta.db_table
+        project_table = Project._meta.db_table
+        version_table = Version._meta.db_table
+        for start in range(0, len(rows), PAGEVIEWS_UPSERT_BATCH_SIZE):
+            batch = rows[start:start + PAGEVIEWS_UPSERT_BATCH_SIZE]
+            values = ', '.join(['(%s, %s, %s, %s, %s, %s, %s)'] * len(batch))
+            # Projects and versions can be deleted after their page views were buffered,
+            # page views of deleted objects are skipped instead of failing the whole batch.
+            sql = (
+                'WITH page_views '
+                '(project_id, version_id, path, full_path, view_count, date, status) '
+                f'AS (VALUES {values}) '
+                f'INSERT INTO {table} '
+                '(project_id, version_id, path, full_path, view_count, date, status) '
+                'SELECT project_id, CAST(version_id AS integer), path, full_path, '
+                'view_count, date, status '
+                'FROM page_views '
+                f'WHERE EXISTS (SELECT 1 FROM {project_table} '
+                'WHERE id = page_views.project_id) '
+                'AND (page_views.version_id IS NULL '
+                f'OR EXISTS (SELECT 1 FROM {version_table} '
+                'WHERE id = CAST(page_views.version_id AS integer))) '
+                f'ON CONFLICT {conflict} '
+                f'DO UPDATE SET view_count = {table}.view_count + EXCLUDED.view_count'
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [value for row in batch for value in row])
+                skipped = len(batch) - cursor.rowcount
+            if skipped > 0:
+                log.info('Page views of deleted objects skipped.', count=skipped)
+
 
 class PageView(models.Model):
 
@@ -205,3 +290,106 @@ class PageView(models.Model):
         }
 
         return final_data
+
+
+class PageViewDailyTotal(models.Model):
+
+    """
+    Total page views per day for a project.
+
+    It's a rollup of ``PageView``, updated periodically by ``update_page_view_rollups``.
+    """
+
+    project = models.ForeignKey(
+        Project,
+        related_name='page_view_daily_totals',
+        on_delete=models.CASCADE,
+    )
+    date = models.DateField()
+    status = models.PositiveIntegerField(default=200)
+    view_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("project", "date", "status")
+
+    def __str__(self):
+        return f"PageViewDailyTotal: [{self.project.slug}] - {self.view_count} for {self.date}"
+
+    @classmethod
+    def page_views_by_date(cls, project, status=200):
+        """
+        Returns the total page views count for last 30 days for a particular project.
+
+        Same as ``PageView.page_views_by_date``, reading from the rollups.
+        """
+        since = timezone.now().date() - timezone.timedelta(days=30)
+        count_dict = dict(
+            cls.objects.filter(project=project, date__gte=since, status=status)
+            .values_list('date', 'view_count')
+        )
+        return {
+            'labels': [
+                timezone.datetime.strftime(date, '%d %b')
+                for date in _last_30_days_iter()
+            ],
+            'int_data': [count_dict.get(date) or 0 for date in _last_30_days_iter()],
+        }
+
+
+class PageViewTopPage(models.Model):
+
+    """
+    Most viewed pages of a project in the last 30 days.
+
+    It's a rollup of ``PageView``, updated periodically by ``update_page_view_rollups``.
+    Only the top pages shown in the dashboard are stored (see ``readthedocs.analytics.rollups``).
+    """
+
+    project = models.ForeignKey(
+        Project,
+        related_name='page_view_top_pages',
+        on_delete=models.CASCADE,
+    )
+    status = models.PositiveIntegerField(default=200)
+    per_version = models.BooleanField(
+        default=False,
+        help_text=_("Pages are grouped by full path instead of path."),
+    )
+    rank = models.PositiveIntegerField()
+    path = models.CharField(max_length=4096)
+    url_path = models.CharField(
+        max_length=4096,
+        help_text=_("Path of the page in the documentation of the project."),
+    )
+    view_count = models.PositiveIntegerField(default=0)
+    date = models.DateField(help_text=_("Last day of the period."))
+
+    class Meta:
+        unique_together = ("project", "status", "per_version", "rank")
+        ordering = ["rank"]
+
+    def __str__(self):
+        return f"PageViewTopPage: [{self.project.slug}] - {self.rank}. {self.path}"
+
+    @classmethod
+    def top_viewed_pages(cls, project, limit=10, status=200, per_version=False):
+        """
+        Returns top pages according to view counts.
+
+        Same as ``PageView.top_viewed_pages`` for the last 30 days, reading from the rollups.
+        """
+        PageViewResult = namedtuple("PageViewResult", "path, url, count")
+        parsed_domain = urlparse(resolve(project))
+        queryset = cls.objects.filter(
+            project=project,
+            status=status,
+            per_version=per_version,
+        )[:limit]
+        return [
+            PageViewResult(
+                path=top_page.path,
+                url=parsed_domain._replace(path=top_page.url_path).geturl(),
+                count=top_page.view_count,
+            )
+            for top_page in queryset
+        ]
@@ -0,0 +1,165 @@
+"""
+Rollups of page views used by the traffic analytics dashboard.
+
+Aggregating the ``PageView`` rows of the last 30 days of a project on each dashboard load
+(and resolving the URL of each top page) is slow for projects with lots of pages.
+``update_page_view_rollups`` updates periodically:
+
+- ``PageViewDailyTotal``: the total views per day of each project.
+  Only the days since the last day that was rolled up (or ``ROLLUP_DAYS`` days ago) are updated,
+  previous days don't get more page views.
+  The first run rolls up all the days in the retention period.
+- ``PageViewTopPage``: the top ``TOP_PAGES_LIMIT`` pages of each project in the last 30 days.
+  They are only recomputed for the projects whose daily totals changed in this run,
+  and for the projects that had page views in the days that left the period
+  since their top pages were updated.
+  The top pages of the other projects don't change, only their date is updated.
+"""
+
+import structlog
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from readthedocs.analytics.models import PageView, PageViewDailyTotal, PageViewTopPage
+from readthedocs.core.resolver import resolve_path
+from readthedocs.projects.models import Project
+
+log = structlog.get_logger(__name__)
+
+# Number of days updated on each run, page views can be saved some time after the request.
+ROLLUP_DAYS = 2
+TOP_PAGES_DAYS = 30
+TOP_PAGES_LIMIT = 25
+# Top pages shown in the dashboard (status, per_version).
+TOP_PAGES = [
+    (200, False),
+    (404, True),
+]
+TOP_PAGES_STATUSES = {status for status, _ in TOP_PAGES}
+
+
+def update_daily_totals(since):
+    """
+    Update the daily totals of all projects from ``since``.
+
+    :returns: the ids of the projects whose totals of the statuses
+     of the top pages changed.
+    """
+    previous_totals = {
+        (project_id, date, status): count
+        for project_id, date, status, count in (
+            PageViewDailyTotal.objects.filter(date__gte=since)
+            .values_list('project', 'date', 'status', 'view_count')
+            .iterator()
+        )
+    }
+    totals = (
+        PageView.objects.filter(date__gte=since)
+        .values_list('project', 'date', 'status')
+        .annotate(count=Sum('view_count'))
+        .order_by()
+    )
+    daily_totals = []
+    changed_project_ids = set()
+    for project_id, date, status, count in totals.iterator():
+        daily_totals.append(
+            PageViewDailyTotal(
+                project_id=project_id,
+                date=date,
+                status=status,
+                view_count=count,
+            )
+        )
+        key = (project_id, date, status)
+        if previous_totals.pop(key, None) != count and status in TOP_PAGES_STATUSES:
+            changed_project_ids.add(project_id)
+    # Totals that don't exist anymore.
+    changed_project_ids.update(
+        project_id
+        for project_id, _, status in previous_totals
+        if status in TOP_PAGES_STATUSES
+    )
+
+    with transaction.atomic():
+        PageViewDailyTotal.objects.filter(date__gte=since).delete()
+        PageViewDailyTotal.objects.bulk_create(daily_totals, batch_size=500)
+    return changed_project_ids
+
+
+def update_top_pages(project, today):
+    """Update the top pages of ``project`` for the 30 days before ``today``."""
+    since = today - timezone.timedelta(days=TOP_PAGES_DAYS)
+    default_version = project.get_default_version()
+    top_pages = []
+    for status, per_version in TOP_PAGES:
+        group_by = 'full_path' if per_version else 'path'
+        queryset = (
+            PageView.objects.filter(project=project, date__gte=since, status=status)
+            .values_list(group_by)
+            .annotate(count=Sum('view_count'))
+            .order_by('-count')[:TOP_PAGES_LIMIT]
+        )
+        for rank, (path, count) in enumerate(queryset, start=1):
+            if per_version:
+                url_path = path or ''
+            else:
+                # If we aren't grouping by version,
+                # then always link to the default version.
+                url_path = resolve_path(
+                    project=project,
+                    version_slug=default_version,
+                    filename=path,
+                )
+            top_pages.append(
+                PageViewTopPage(
+                    project=project,
+                    status=status,
+                    per_version=per_version,
+                    rank=rank,
+                    path=path or '',
+                    url_path=url_path,
+                    view_count=count,
+                    date=today,
+                )
+            )
+
+    with transaction.atomic():
+        PageViewTopPage.objects.filter(project=project).delete()
+        PageViewTopPage.objects.bulk_create(top_pages)
+
+
+def update_page_view_rollups():
+    today = timezone.now().date()
+    last_date = PageViewDailyTotal.objects.aggregate(Max('date'))['date__max']
+    if last_date is None:
+        # First run, roll up all the page views.
+        retention_days = int(settings.RTD_ANALYTICS_DEFAULT_RETENTION_DAYS)
+        since = today - timezone.timedelta(days=retention_days)
+    else:
+        since = min(last_date, today - timezone.timedelta(days=ROLLUP_DAYS - 1))
+    project_ids = update_daily_totals(since)
+
+    # The period of the top pages that weren't updated today moved,
+    # they only change for the projects with page views in the days that left the period.
+    outdated_top_pages = PageViewTopPage.objects.filter(date__lt=today)
+    oldest_date = outdated_top_pages.aggregate(Min('date'))['date__min']
+    if oldest_date is not None:
+        project_ids.update(
+            PageViewDailyTotal.objects.filter(
+                project__in=outdated_top_pages.values('project'),
+                status__in=TOP_PAGES_STATUSES,
+                date__gte=oldest_date - timezone.timedelta(days=TOP_PAGES_DAYS),
+                date__lt=today - timezone.timedelta(days=TOP_PAGES_DAYS),
+            )
+            .values_list('project', flat=True)
+            .order_by()
+            .distinct()
+        )
+
+    for project in Project.objects.filter(pk__in=project_ids).iterator():
+        update_top_pages(project, today)
+    # The top pages of the other projects are the same.
+    outdated_top_pages.update(date=today)
+    log.info('Page view rollups updated.', projects=len(project_ids))
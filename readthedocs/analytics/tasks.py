@@ -1,11 +1,14 @@
 """Tasks for Read the Docs' analytics."""
 
+import datetime
+
 from django.conf import settings
 from django.utils import timezone
 
 import readthedocs
 from readthedocs.worker import app
 
+from . import rollups
 from .models import PageView
 from .utils import send_to_analytics
 
@@ -82,3 +85,27 @@ def delete_old_page_counts():
     retention_days = settings.RTD_ANALYTICS_DEFAULT_RETENTION_DAYS
     days_ago = timezone.now().date() - timezone.timedelta(days=retention_days)
     return PageView.objects.filter(date__lt=days_ago).delete()
+
+
+@app.task(queue='web')
+def increment_page_views(page_views):
+    """
+    Save page views buffered by ``readthedocs.analytics.buffer``.
+
+    :param page_views: list of (project_id, version_id, path, date, status, full_path, count),
+     ``date`` is in ISO format.
+    """
+    PageView.objects.increment_page_views([
+        [project_id, version_id, path, datetime.date.fromisoformat(date), status, full_path, count]
+        for project_id, version_id, path, date, status, full_path, count in page_views
+    ])
+
+
+@app.task(queue='web')
+def update_page_view_rollups():
+    """
+    Update the rollups of page views used by the traffic analytics dashboard.
+
+    This is intended to run from a periodic task every hour.
+    """
+    rollups.update_page_view_rollups()
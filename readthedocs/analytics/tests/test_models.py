@@ -1,10 +1,15 @@
+from unittest import mock
+
 import pytest
 from django.contrib.auth.models import User
 from django.db import IntegrityError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django_dynamic_fixture import get
 
+from readthedocs.analytics.buffer import PageViewBuffer
 from readthedocs.analytics.models import PageView
+from readthedocs.builds.models import Version
 from readthedocs.projects.models import Project
 
 
@@ -64,3 +69,125 @@ class TestModels(TestCase):
             status=200,
         )
         self.assertEqual(PageView.objects.all().count(), 2)
+
+    def test_increment_page_views(self):
+        today = timezone.now().date()
+        get(
+            PageView,
+            project=self.project,
+            version=self.version,
+            path="/index.html",
+            full_path="/en/latest/index.html",
+            date=today,
+            status=200,
+            view_count=5,
+        )
+        page_views = [
+            [self.project.pk, self.version.pk, "/index.html", today, 200, "/en/latest/index.html", 2],
+            [self.project.pk, self.version.pk, "/index.html", today, 200, "/en/latest/index.html", 1],
+            [self.project.pk, self.version.pk, "/api.html", today, 200, "/en/latest/api.html", 3],
+            [self.project.pk, None, "/en/missing", today, 404, "/en/missing", 4],
+        ]
+
+        with self.assertNumQueries(2):
+            PageView.objects.increment_page_views(page_views)
+        # Rows without version are updated as well.
+        PageView.objects.increment_page_views(page_views[3:])
+
+        self.assertEqual(
+            set(PageView.objects.values_list("version", "path", "full_path", "view_count")),
+            {
+                (self.version.pk, "/index.html", "/en/latest/index.html", 8),
+                (self.version.pk, "/api.html", "/en/latest/api.html", 3),
+                (None, "/en/missing", "/en/missing", 8),
+            },
+        )
+
+    def test_increment_page_views_of_deleted_objects(self):
+        today = timezone.now().date()
+        deleted_version = get(Version, project=self.project)
+        deleted_version_id = deleted_version.pk
+        deleted_version.delete()
+        page_views = [
+            [self.project.pk, self.version.pk, "/index.html", today, 200, "/en/latest/index.html", 2],
+            [self.project.pk, deleted_version_id, "/index.html", today, 200, "/en/old/index.html", 1],
+            [self.project.pk + 100, None, "/en/missing", today, 404, "/en/missing", 4],
+        ]
+
+        with self.assertNumQueries(2):
+            PageView.objects.increment_page_views(page_views)
+
+        # Only the page views of the existing project and version are saved.
+        self.assertEqual(
+            set(PageView.objects.values_list("project", "version", "path", "view_count")),
+            {(self.project.pk, self.version.pk, "/index.html", 2)},
+        )
+
+    @override_settings(
+        RTD_PAGEVIEWS_BUFFER=True,
+        RTD_PAGEVIEWS_BUFFER_MAX_SIZE=2,
+        RTD_PAGEVIEWS_BUFFER_INTERVAL=60 * 60,
+    )
+    @mock.patch("readthedocs.analytics.models.page_view_buffer", PageViewBuffer())
+    @mock.patch("readthedocs.analytics.tasks.increment_page_views")
+    def test_register_page_view_buffered(self, increment_page_views):
+        for _ in range(3):
+            PageView.objects.register_page_view(
+                project=self.project,
+                version=self.version,
+                path="index.html",
+                full_path="/en/latest/index.html",
+                status=200,
+            )
+        self.assertEqual(PageView.objects.count(), 0)
+        increment_page_views.delay.assert_not_called()
+
+        # The buffer is sent when it has two different pages.
+        PageView.objects.register_page_view(
+            project=self.project,
+            version=None,
+            path="/en/missing",
+            full_path="/en/missing",
+            status=404,
+        )
+        today = timezone.now().date().isoformat()
+        increment_page_views.delay.assert_called_once_with([
+            [self.project.pk, self.version.pk, "/index.html", today, 200, "/en/latest/index.html", 3],
+            [self.project.pk, None, "/en/missing", today, 404, "/en/missing", 1],
+        ])
+
+    @override_settings(
+        RTD_PAGEVIEWS_BUFFER=True,
+        RTD_PAGEVIEWS_BUFFER_MAX_SIZE=1000,
+        RTD_PAGEVIEWS_BUFFER_INTERVAL=60,
+    )
+    @mock.patch("readthedocs.analytics.buffer.threading.Thread")
+    @mock.patch("readthedocs.analytics.tasks.increment_page_views")
+    def test_page_view_buffer_timer(self, increment_page_views, thread):
+        page_view_buffer = PageViewBuffer()
+        with mock.patch("readthedocs.analytics.models.page_view_buffer", page_view_buffer):
+            for _ in range(2):
+                PageView.objects.register_page_view(
+                    project=self.project,
+                    version=self.version,
+                    path="index.html",
+                    full_path="/en/latest/index.html",
+                    status=200,
+                )
+
+        # The timer is started once per process.
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+        # The buffer isn't sent before the interval.
+        self.assertGreater(page_view_buffer._flush_if_due(), 50)
+        increment_page_views.delay.assert_not_called()
+
+        # The buffer is sent without waiting for another page view.
+        page_view_buffer._last_flush -= 60
+        self.assertGreater(page_view_buffer._flush_if_due(), 50)
+        today = timezone.now().date().isoformat()
+        increment_page_views.delay.assert_called_once_with([
+            [self.project.pk, self.version.pk, "/index.html", today, 200, "/en/latest/index.html", 2],
+        ])
+        self.assertEqual(len(page_view_buffer), 0)
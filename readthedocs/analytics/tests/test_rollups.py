@@ -0,0 +1,183 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django_dynamic_fixture import get
+
+from readthedocs.analytics.models import (
+    PageView,
+    PageViewDailyTotal,
+    PageViewTopPage,
+)
+from readthedocs.analytics.rollups import update_page_view_rollups, update_top_pages
+from readthedocs.core.resolver import resolve_path
+from readthedocs.projects.models import Project
+
+
+class TestPageViewRollups(TestCase):
+
+    def setUp(self):
+        self.user = get(User)
+        self.project = get(Project, slug='project', users=[self.user])
+        self.version = self.project.versions.get(slug='latest')
+        self.today = timezone.now().date()
+        for days_ago in range(40):
+            date = self.today - timezone.timedelta(days=days_ago)
+            for i in range(3):
+                get(
+                    PageView,
+                    project=self.project,
+                    version=self.version,
+                    path=f'/page-{i}.html',
+                    full_path=f'/en/latest/page-{i}.html',
+                    date=date,
+                    status=200,
+                    view_count=i + 1,
+                )
+            get(
+                PageView,
+                project=self.project,
+                version=None,
+                path='/en/latest/missing.html',
+                full_path='/en/latest/missing.html',
+                date=date,
+                status=404,
+                view_count=1,
+            )
+
+    def _add_page_views(self, date, view_count):
+        PageView.objects.increment_page_views([
+            [self.project.pk, self.version.pk, '/page-0.html', date, 200, '/en/latest/page-0.html', view_count],
+        ])
+
+    def test_rollups(self):
+        update_page_view_rollups()
+
+        self.assertEqual(PageViewDailyTotal.objects.filter(status=200).count(), 40)
+        self.assertEqual(
+            PageViewDailyTotal.page_views_by_date(self.project),
+            PageView.page_views_by_date(self.project.slug),
+        )
+        self.assertEqual(
+            PageViewTopPage.top_viewed_pages(self.project, limit=25),
+            PageView.top_viewed_pages(self.project, limit=25),
+        )
+        self.assertEqual(
+            PageViewTopPage.top_viewed_pages(self.project, limit=25, status=404, per_version=True),
+            PageView.top_viewed_pages(self.project, limit=25, status=404, per_version=True),
+        )
+        self.assertEqual(
+            [page.path for page in PageViewTopPage.top_viewed_pages(self.project, limit=2)],
+            ['/page-2.html', '/page-1.html'],
+        )
+
+    def test_rollups_are_updated_incrementally(self):
+        update_page_view_rollups()
+
+        self._add_page_views(self.today, 100)
+        # Old days aren't updated.
+        self._add_page_views(self.today - timezone.timedelta(days=10), 100)
+        update_page_view_rollups()
+
+        totals = dict(
+            PageViewDailyTotal.objects.filter(status=200).values_list('date', 'view_count'),
+        )
+        self.assertEqual(totals[self.today], 106)
+        self.assertEqual(totals[self.today - timezone.timedelta(days=10)], 6)
+        top_page = PageViewTopPage.objects.get(project=self.project, status=200, rank=1)
+        self.assertEqual(top_page.path, '/page-0.html')
+        self.assertEqual(
+            top_page.url_path,
+            resolve_path(self.project, version_slug='latest', filename='/page-0.html'),
+        )
+        self.assertEqual(top_page.date, self.today)
+
+    def test_top_pages_are_only_updated_when_they_change(self):
+        other_project = get(Project, slug='other')
+        get(
+            PageView,
+            project=other_project,
+            version=None,
+            path='/index.html',
+            full_path='/en/latest/index.html',
+            date=self.today - timezone.timedelta(days=5),
+            status=200,
+            view_count=1,
+        )
+        update_page_view_rollups()
+
+        with mock.patch(
+            'readthedocs.analytics.rollups.update_top_pages',
+            wraps=update_top_pages,
+        ) as update:
+            # Nothing changed.
+            update_page_view_rollups()
+            update.assert_not_called()
+
+            self._add_page_views(self.today, 100)
+            update_page_view_rollups()
+            self.assertEqual([call[0][0] for call in update.call_args_list], [self.project])
+
+            # The period moved since the top pages were updated,
+            # only the project with page views in the days that left the period changes.
+            update.reset_mock()
+            PageViewTopPage.objects.update(date=self.today - timezone.timedelta(days=1))
+            update_page_view_rollups()
+            self.assertEqual([call[0][0] for call in update.call_args_list], [self.project])
+
+        self.assertEqual(
+            set(PageViewTopPage.objects.values_list('project', 'date').distinct()),
+            {(self.project.pk, self.today), (other_project.pk, self.today)},
+        )
+
+    def test_download_daily_totals(self):
+        update_page_view_rollups()
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('projects_traffic_analytics', args=[self.project.slug]),
+            {'download': 'daily'},
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0], 'Date,Views')
+        self.assertEqual(len(rows), 41)
+        self.assertEqual(
+            rows[1],
+            f'{timezone.datetime.strftime(self.today, "%Y-%m-%d %H:%M:%S")},6',
+        )
+
+    def test_dashboard_without_rollups(self):
+        self.client.force_login(self.user)
+        url = reverse('projects_traffic_analytics', args=[self.project.slug])
+
+        # The page views are read directly until the project has rollups.
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context['page_data'],
+            PageView.page_views_by_date(project_slug=self.project.slug),
+        )
+        self.assertEqual(
+            response.context['top_pages_200'],
+            PageView.top_viewed_pages(self.project, limit=25),
+        )
+
+        response = self.client.get(url, {'download': 'daily'})
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0], 'Date,Views')
+        self.assertEqual(len(rows), 41)
+        self.assertEqual(
+            rows[1],
+            f'{timezone.datetime.strftime(self.today, "%Y-%m-%d %H:%M:%S")},6',
+        )
+
+        update_page_view_rollups()
+        with mock.patch.object(PageView, 'top_viewed_pages') as top_viewed_pages:
+            response = self.client.get(url)
+            top_viewed_pages.assert_not_called()
+        self.assertEqual(
+            response.context['page_data'],
+            PageViewDailyTotal.page_views_by_date(self.project),
+        )
@@ -0,0 +1,95 @@
+"""
+Cache for the responses of the footer API.
+
+The footer is requested on every page view of the documentation,
+and generating it requires several queries and rendering a template.
+The response only changes when the versions, builds or translations
+of a project change, so it's stored in Django's cache.
+
+The cache is versioned per group of translations
+(the main language project and all of its translations share the same version),
+since the footer of a project lists the other translations of its main project.
+The version is changed when any of its inputs change (see ``readthedocs.api.v2.signals``).
+
+Each request logs if it was a hit or a miss (``footer_cache_hit``),
+so the hit rate can be followed from the logs.
+"""
+
+import hashlib
+import json
+
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import get_random_string
+
+log = structlog.get_logger(__name__)
+
+
+def _get_group_id(project):
+    return project.main_language_project_id or project.pk
+
+
+def _get_version_cache_key(group_id):
+    return f'footer-version:{group_id}'
+
+
+def _get_group_version(project):
+    version_key = _get_version_cache_key(_get_group_id(project))
+    version = cache.get(version_key)
+    if version is None:
+        version = get_random_string(16)
+        cache.set(version_key, version, timeout=settings.RTD_FOOTER_CACHE_TIMEOUT)
+    return version
+
+
+def get_footer_cache_key(project, version, user, params):
+    """
+    Return the key to cache the footer of ``version``.
+
+    Authenticated users can have access to private versions,
+    so their footers are cached per user.
+
+    :param params: Query parameters that change the footer (theme, page, etc).
+    """
+    if user.is_authenticated:
+        visibility = f'user:{user.pk}'
+    else:
+        visibility = 'anonymous'
+    digest = hashlib.sha256(
+        json.dumps([visibility, params], sort_keys=True).encode(),
+    ).hexdigest()
+    return 'footer:{project_id}:{group_version}:{version_id}:{digest}'.format(
+        project_id=project.pk,
+        group_version=_get_group_version(project),
+        version_id=version.pk,
+        digest=digest,
+    )
+
+
+def get_footer(cache_key):
+    """
+    Return the cached footer response data.
+
+    :returns: the response data or ``None`` if it isn't cached.
+    """
+    data = cache.get(cache_key)
+    log.debug('Footer cache.', footer_cache_hit=data is not None)
+    return data
+
+
+def set_footer(cache_key, data):
+    cache.set(cache_key, data, timeout=settings.RTD_FOOTER_CACHE_TIMEOUT)
+
+
+def invalidate_footer(*projects):
+    """Change the version of the footers of ``projects`` and all of their translations."""
+    group_ids = set()
+    for project in projects:
+        # The project could have been the main project of a group of translations before.
+        group_ids.update([project.pk, project.main_language_project_id])
+    keys = [_get_version_cache_key(group_id) for group_id in group_ids if group_id]
+    if keys:
+        log.debug('Invalidating footer cache.', group_ids=group_ids)
+        cache.delete_many(keys)
+
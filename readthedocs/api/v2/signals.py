@@ -0,0 +1,63 @@
+"""Invalidate the footer API cache when its inputs change."""
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from readthedocs.api.v2.cache import invalidate_footer
+from readthedocs.builds.constants import BUILD_STATE_FINISHED
+from readthedocs.builds.models import Build, Version
+from readthedocs.projects.models import Domain, Project, ProjectRelationship
+
+
+@receiver(post_save, sender=Version)
+@receiver(post_delete, sender=Version)
+def invalidate_version_footer(instance, *args, **kwargs):
+    invalidate_footer(instance.project)
+
+
+@receiver(post_save, sender=Build)
+def invalidate_build_footer(instance, *args, **kwargs):
+    """Invalidate the footer when a build finishes, it lists the downloads of the version."""
+    if instance.state == BUILD_STATE_FINISHED:
+        invalidate_footer(instance.project)
+
+
+@receiver(post_save, sender=Project)
+@receiver(pre_delete, sender=Project)
+def invalidate_project_footer(instance, *args, **kwargs):
+    """
+    Invalidate the footer of the project and its translations (or main project).
+
+    The links of the footers of its subprojects use the parent project, they are invalidated too.
+    """
+    invalidate_footer(instance, *_get_subprojects(instance))
+
+
+@receiver(post_save, sender=Domain)
+@receiver(pre_delete, sender=Domain)
+def invalidate_domain_footer(instance, *args, **kwargs):
+    """
+    Invalidate the footer of the project, the links of the footer use its canonical domain.
+
+    The links of the footers of its subprojects use the domain of the parent project,
+    they are invalidated too.
+    """
+    if instance.project_id:
+        invalidate_footer(instance.project, *_get_subprojects(instance.project))
+
+
+@receiver(post_save, sender=ProjectRelationship)
+@receiver(pre_delete, sender=ProjectRelationship)
+def invalidate_subproject_footer(instance, *args, **kwargs):
+    """Invalidate the footer of the child, its links use the domain of the parent."""
+    if instance.child_id:
+        invalidate_footer(instance.child)
+
+
+def _get_subprojects(project):
+    if not project.pk:
+        return []
+    return Project.objects.filter(superprojects__parent=project).only(
+        'pk',
+        'main_language_project_id',
+    )
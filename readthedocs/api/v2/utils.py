@@ -3,6 +3,7 @@
 import itertools
 
 import structlog
+from django.db.models import Case, CharField, Q, Value, When
 from rest_framework.pagination import PageNumberPagination
 
 from readthedocs.builds.constants import (
@@ -16,9 +17,13 @@ from readthedocs.builds.constants import (
     TAG,
 )
 from readthedocs.builds.models import RegexAutomationRule, Version
+from readthedocs.projects.version_handling import version_sort_key
 
 log = structlog.get_logger(__name__)
 
+# Number of versions created or updated in each query when syncing versions.
+SYNC_VERSIONS_BATCH_SIZE = 500
+
 
 def sync_versions_to_db(project, versions, type):  # pylint: disable=redefined-builtin
     """
@@ -42,6 +47,7 @@ def sync_versions_to_db(project, versions, type):  # pylint: disable=redefined-b
 
     # Add new versions
     versions_to_create = []
+    versions_to_update = {}
     added = set()
     has_user_stable = False
     has_user_latest = False
@@ -76,26 +82,12 @@ def sync_versions_to_db(project, versions, type):  # pylint: disable=redefined-b
                 continue
 
             # Update slug with new identifier
-            Version.objects.filter(
-                project=project,
-                verbose_name=version_name,
-                # Always filter by type, a tag and a branch
-                # can share the same verbose_name.
-                type=type,
-            ).update(
-                identifier=version_id,
-                machine=False,
-            )
-
-            log.info(
-                'Re-syncing versions: version updated.',
-                version_verbose_name=version_name,
-                version_id=version_id,
-            )
+            versions_to_update[version_name] = version_id
         else:
             # New Version
             versions_to_create.append((version_id, version_name))
 
+    _update_versions(project, type, versions_to_update)
     added.update(_create_versions(project, type, versions_to_create))
 
     if not has_user_stable:
@@ -125,7 +117,44 @@ def sync_versions_to_db(project, versions, type):  # pylint: disable=redefined-b
     return added
 
 
-def _create_versions(project, type, versions):
+def _update_versions(project, type, versions):  # pylint: disable=redefined-builtin
+    """
+    Update the identifier of existing versions.
+
+    All versions are updated in one query per batch,
+    using a ``CASE`` expression to set the identifier of each version.
+
+    :param versions: dictionary of version_name to version_id.
+    """
+    versions = list(versions.items())
+    for start in range(0, len(versions), SYNC_VERSIONS_BATCH_SIZE):
+        batch = versions[start:start + SYNC_VERSIONS_BATCH_SIZE]
+        Version.objects.filter(
+            project=project,
+            verbose_name__in=[version_name for version_name, _ in batch],
+            # Always filter by type, a tag and a branch
+            # can share the same verbose_name.
+            type=type,
+        ).update(
+            identifier=Case(
+                *[
+                    When(verbose_name=version_name, then=Value(version_id))
+                    for version_name, version_id in batch
+                ],
+                output_field=CharField(),
+            ),
+            machine=False,
+        )
+
+    for version_name, version_id in versions:
+        log.info(
+            'Re-syncing versions: version updated.',
+            version_verbose_name=version_name,
+            version_id=version_id,
+        )
+
+
+def _create_versions(project, type, versions):  # pylint: disable=redefined-builtin
     """
     Create versions (tuple of version_id and version_name).
 
@@ -133,23 +162,32 @@ def _create_versions(project, type, versions):
 
     .. note::
 
-       ``Version.slug`` relies on the post_save signal,
-       so we can't use bulk_create.
+       ``Version.slug`` is generated in ``pre_save`` querying the database for each version,
+       and ``Version.sort_key`` in ``Version.save``,
+       so both are generated here to create the versions with ``bulk_create``.
+       Signals aren't sent for these versions.
     """
-    versions_objs = (
+    if not versions:
+        return set()
+
+    slug_field = Version._meta.get_field('slug')
+    slugs = slug_field.create_slugs(
+        [version_name for _, version_name in versions],
+        existing_slugs=project.versions.order_by().values_list('slug', flat=True),
+    )
+    versions_objs = [
         Version(
             project=project,
             type=type,
             identifier=version_id,
             verbose_name=version_name,
+            slug=slug,
+            sort_key=version_sort_key(version_name),
         )
-        for version_id, version_name in versions
-    )
-    added = set()
-    for version in versions_objs:
-        version.save()
-        added.add(version.slug)
-    return added
+        for (version_id, version_name), slug in zip(versions, slugs)
+    ]
+    Version.objects.bulk_create(versions_objs, batch_size=SYNC_VERSIONS_BATCH_SIZE)
+    return set(slugs)
 
 
 def _set_or_create_version(project, slug, version_id, verbose_name, type_):
@@ -171,7 +209,20 @@ def _set_or_create_version(project, slug, version_id, verbose_name, type_):
     return version, False
 
 
-def _get_deleted_versions_qs(project, tags_data, branches_data):
+def _get_deleted_versions_qs(project, tags_data, branches_data, delta=None):
+    to_delete_qs = (
+        project.versions(manager=INTERNAL)
+        .exclude(uploaded=True)
+        .exclude(slug__in=NON_REPOSITORY_VERSIONS)
+    )
+
+    if delta is not None:
+        # Only the refs removed since the last sync are checked.
+        return to_delete_qs.filter(
+            Q(type=TAG, verbose_name__in=delta.removed_tags)
+            | Q(type=BRANCH, identifier__in=delta.removed_branches),
+        )
+
     # We use verbose_name for tags
     # because several tags can point to the same identifier.
     versions_tags = [
@@ -183,12 +234,6 @@ def _get_deleted_versions_qs(project, tags_data, branches_data):
         for version in branches_data
     ]
 
-    to_delete_qs = (
-        project.versions(manager=INTERNAL)
-        .exclude(uploaded=True)
-        .exclude(slug__in=NON_REPOSITORY_VERSIONS)
-    )
-
     to_delete_qs = to_delete_qs.exclude(
         type=TAG,
         verbose_name__in=versions_tags,
@@ -200,10 +245,12 @@ def _get_deleted_versions_qs(project, tags_data, branches_data):
     return to_delete_qs
 
 
-def delete_versions_from_db(project, tags_data, branches_data):
+def delete_versions_from_db(project, tags_data, branches_data, delta=None):
     """
     Delete all versions not in the current repo.
 
+    :param delta: ``RefsDelta`` with the refs removed since the last sync,
+     if it's given only those versions are deleted.
     :returns: The slug of the deleted versions from the database.
     """
     to_delete_qs = (
@@ -211,6 +258,7 @@ def delete_versions_from_db(project, tags_data, branches_data):
             project=project,
             tags_data=tags_data,
             branches_data=branches_data,
+            delta=delta,
         )
         .exclude(active=True)
     )
@@ -221,13 +269,21 @@ def delete_versions_from_db(project, tags_data, branches_data):
     )
 
 
-def get_deleted_active_versions(project, tags_data, branches_data):
-    """Return the slug of active versions that were deleted from the repository."""
+def get_deleted_active_versions(project, tags_data, branches_data, delta=None):
+    """
+    Return the slug of active versions that were deleted from the repository.
+
+    Active versions aren't deleted from the database.
+    If ``delta`` is given, only the refs removed since the last sync are checked,
+    so a removed active version is only returned by the first sync
+    that sees its ref removed, not by the next syncs.
+    """
     to_delete_qs = (
         _get_deleted_versions_qs(
             project=project,
             tags_data=tags_data,
             branches_data=branches_data,
+            delta=delta,
         )
         .filter(active=True)
     )
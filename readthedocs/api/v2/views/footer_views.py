@@ -7,12 +7,14 @@ import structlog
 from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.template import loader as template_loader
+from django.utils.translation import get_language
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_jsonp.renderers import JSONPRenderer
 
 from readthedocs.api.mixins import CDNCacheTagsMixin
+from readthedocs.api.v2.cache import get_footer, get_footer_cache_key, set_footer
 from readthedocs.api.v2.permissions import IsAuthorizedToViewVersion
 from readthedocs.builds.constants import LATEST, TAG
 from readthedocs.builds.models import Version
@@ -104,6 +106,9 @@ class BaseFooterHTML(CDNCacheTagsMixin, APIView):
 
        The methods `_get_project` and `_get_version`
        are called many times, so a basic cache is implemented.
+
+    The response is cached per project, version, query parameters and user
+    (see ``readthedocs.api.v2.cache``).
     """
 
     http_method_names = ['get']
@@ -205,7 +210,30 @@ class BaseFooterHTML(CDNCacheTagsMixin, APIView):
         }
         return context
 
+    def _get_cache_key(self):
+        """Return the key to cache the response, or ``None`` if caching is disabled."""
+        if not settings.RTD_FOOTER_CACHE_TIMEOUT:
+            return None
+        params = {
+            param: self.request.GET.get(param)
+            for param in ('theme', 'docroot', 'source_suffix', 'page')
+        }
+        # The template is translated to the language of the request.
+        params['language'] = get_language()
+        return get_footer_cache_key(
+            project=self._get_project(),
+            version=self._get_version(),
+            user=self.request.user,
+            params=params,
+        )
+
     def get(self, request, format=None):
+        cache_key = self._get_cache_key()
+        if cache_key:
+            resp_data = get_footer(cache_key)
+            if resp_data is not None:
+                return Response(resp_data)
+
         project = self._get_project()
         version = self._get_version()
         version_compare_data = get_version_compare_data(
@@ -232,6 +260,8 @@ class BaseFooterHTML(CDNCacheTagsMixin, APIView):
             'version_supported': version.supported,
         }
 
+        if cache_key:
+            set_footer(cache_key, resp_data)
         return Response(resp_data)
 
 
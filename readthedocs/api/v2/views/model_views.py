@@ -9,16 +9,17 @@ from django.db.models import BooleanField, Case, Value, When
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from rest_framework import decorators, permissions, status, viewsets
+from rest_framework.exceptions import ParseError
 from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
 
+from readthedocs.builds.cold_storage import get_archived_commands
 from readthedocs.builds.constants import INTERNAL
 from readthedocs.builds.models import Build, BuildCommandResult, Version
 from readthedocs.oauth.models import RemoteOrganization, RemoteRepository
 from readthedocs.oauth.services import GitHubService, registry
 from readthedocs.projects.models import Domain, Project
-from readthedocs.storage import build_commands_storage
 
 from ..permissions import APIPermission, APIRestrictedPermission, IsOwner
 from ..serializers import (
@@ -259,19 +260,9 @@ class BuildViewSet(DisableListEndpoint, UserSelectViewSet):
         serializer = self.get_serializer(instance)
         data = serializer.data
         if instance.cold_storage:
-            storage_path = '{date}/{id}.json'.format(
-                date=str(instance.date.date()),
-                id=instance.id,
-            )
-            if build_commands_storage.exists(storage_path):
-                try:
-                    json_resp = build_commands_storage.open(storage_path).read()
-                    data['commands'] = json.loads(json_resp)
-                except Exception:
-                    log.exception(
-                        'Failed to read build data from storage.',
-                        path=storage_path,
-                    )
+            commands = get_archived_commands(instance)
+            if commands is not None:
+                data['commands'] = commands
         return Response(data)
 
     @decorators.action(
@@ -293,6 +284,33 @@ class BuildCommandViewSet(DisableListEndpoint, UserSelectViewSet):
     serializer_class = BuildCommandSerializer
     model = BuildCommandResult
 
+    @decorators.action(detail=False, methods=['post'])
+    def bulk(self, request, **kwargs):
+        """
+        Create several build commands at once.
+
+        Receives a list of commands, or a ``commands`` field with the list
+        (encoded as JSON when it's sent as a multipart form).
+        """
+        data = request.data
+        if isinstance(data, dict):
+            data = data.get('commands')
+            if isinstance(data, str):
+                try:
+                    data = json.loads(data)
+                except ValueError:
+                    raise ParseError('Invalid commands.')
+        if not isinstance(data, list):
+            raise ParseError('Invalid commands.')
+
+        serializer = self.get_serializer(data=data, many=True)
+        serializer.is_valid(raise_exception=True)
+        commands = BuildCommandResult.objects.bulk_create(
+            BuildCommandResult(**attrs)
+            for attrs in serializer.validated_data
+        )
+        return Response({'count': len(commands)}, status=status.HTTP_201_CREATED)
+
 
 class DomainViewSet(DisableListEndpoint, UserSelectViewSet):
     permission_classes = [APIRestrictedPermission]
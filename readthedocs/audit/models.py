@@ -1,25 +1,35 @@
 """Audit models."""
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_extensions.db.models import TimeStampedModel
 
 from readthedocs.acl.utils import get_auth_backend
 from readthedocs.analytics.utils import get_client_ip
+from readthedocs.audit.queue import audit_log_queue
 from readthedocs.projects.models import Project
 
+# Number of audit logs inserted in each query when saving logs in bulk.
+AUDITLOGS_BULK_CREATE_BATCH_SIZE = 500
+
 
 class AuditLogManager(models.Manager):
 
     """AuditLog manager."""
 
-    def new(self, action, user=None, request=None, **kwargs):
+    def new(self, action, user=None, request=None, defer=False, **kwargs):
         """
         Create an audit log for `action`.
 
         If user or request are given,
         other fields will be auto-populated from that information.
+
+        :param defer: Add the log to the queue of logs saved in bulk
+         if ``RTD_AUDITLOGS_QUEUE`` is enabled (see ``readthedocs.audit.queue``),
+         the log returned isn't saved in that case.
         """
 
         actions_requiring_user = (
@@ -49,12 +59,41 @@ class AuditLogManager(models.Manager):
             if 'project' not in kwargs and project_slug:
                 kwargs['project'] = Project.objects.filter(slug=project_slug).first()
 
+        if defer and settings.RTD_AUDITLOGS_QUEUE:
+            audit_log = self.model(
+                user=user,
+                action=action,
+                created=timezone.now(),
+                **kwargs,
+            )
+            audit_log_queue.add(audit_log)
+            return audit_log
+
         return self.create(
             user=user,
             action=action,
             **kwargs,
         )
 
+    def bulk_create_logs(self, audit_logs):
+        """
+        Save ``audit_logs`` in one query per batch.
+
+        The ``log_*`` fields are filled as when saving each log,
+        and the ``created`` date of the logs is kept.
+        """
+        organizations = {}
+        for audit_log in audit_logs:
+            project_id = audit_log.project_id
+            if project_id and project_id not in organizations:
+                organizations[project_id] = audit_log.project.organizations.first()
+            audit_log.fill_log_fields(organization=organizations.get(project_id))
+            audit_log.modified = audit_log.created
+            # Keep ``modified`` when inserting the log (see ``ModificationDateTimeField``).
+            audit_log.update_modified = False
+
+        self.bulk_create(audit_logs, batch_size=AUDITLOGS_BULK_CREATE_BATCH_SIZE)
+
 
 class AuditLog(TimeStampedModel):
 
@@ -68,6 +107,15 @@ class AuditLog(TimeStampedModel):
 
     # pylint: disable=too-many-instance-attributes
 
+    # Logs saved from the queue keep the date they were created,
+    # the date isn't set when the log is inserted (``auto_now_add``).
+    created = models.DateTimeField(
+        _('created'),
+        default=timezone.now,
+        editable=False,
+        blank=True,
+    )
+
     PAGEVIEW = 'pageview'
     DOWNLOAD = 'download'
     AUTHN = 'authentication'
@@ -186,13 +234,22 @@ class AuditLog(TimeStampedModel):
         ordering = ['-created']
 
     def save(self, **kwargs):
+        organization = self.project.organizations.first() if self.project else None
+        self.fill_log_fields(organization=organization)
+        super().save(**kwargs)
+
+    def fill_log_fields(self, organization=None):
+        """
+        Fill the ``log_*`` fields from the user, project and organization.
+
+        :param organization: Organization of the project.
+        """
         if self.user:
             self.log_user_id = self.user.id
             self.log_user_username = self.user.username
         if self.project:
             self.log_project_id = self.project.id
             self.log_project_slug = self.project.slug
-            organization = self.project.organizations.first()
             if organization:
                 self.organization = organization
         if self.organization:
@@ -201,8 +258,6 @@ class AuditLog(TimeStampedModel):
 
         self._truncate_browser()
 
-        super().save(**kwargs)
-
     def _truncate_browser(self):
         browser_max_length = self._meta.get_field("browser").max_length
         if self.browser and len(self.browser) > browser_max_length:
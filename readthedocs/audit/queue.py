@@ -0,0 +1,124 @@
+"""
+Queue of audit logs.
+
+Audit logs of page views and downloads are created on each request to the documentation,
+saving them while serving the file adds one or more queries to each request.
+When ``RTD_AUDITLOGS_QUEUE`` is enabled, these logs are added to a queue in memory per process,
+and they are sent in batches of ``RTD_AUDITLOGS_QUEUE_BATCH_SIZE`` to a task
+that saves them in bulk (see ``readthedocs.audit.tasks.save_audit_logs``).
+A batch is also sent after ``RTD_AUDITLOGS_QUEUE_INTERVAL`` seconds, or when the process exits.
+
+The queue is bounded to ``RTD_AUDITLOGS_QUEUE_MAX_SIZE`` logs,
+logs stay in the queue if they can't be sent (e.g. the broker is down),
+and new logs are dropped while the queue is full.
+After a failure, logs aren't sent again until ``RTD_AUDITLOGS_QUEUE_INTERVAL`` seconds have passed,
+so requests don't retry the broker while it's down.
+The number of dropped logs is counted per process (``AuditLogQueue.dropped``),
+and the logs dropped since the last flush are reported once per flush.
+"""
+
+import atexit
+import threading
+import time
+
+import structlog
+from django.conf import settings
+
+log = structlog.get_logger(__name__)
+
+
+class AuditLogQueue:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logs = []
+        self._last_flush = time.monotonic()
+        # Logs aren't sent before this time after a failure.
+        self._retry_after = 0
+        # Number of logs dropped by this process, and since the last flush.
+        self.dropped = 0
+        self._dropped_since_flush = 0
+
+    def add(self, audit_log):
+        """
+        Add an unsaved ``AuditLog`` to the queue.
+
+        :returns: ``False`` if the queue is full and the log was dropped.
+        """
+        with self._lock:
+            if len(self._logs) >= int(settings.RTD_AUDITLOGS_QUEUE_MAX_SIZE):
+                dropped = True
+                self._count_dropped(1)
+            else:
+                dropped = False
+                self._logs.append(self._serialize(audit_log))
+            now = time.monotonic()
+            should_flush = now >= self._retry_after and (
+                len(self._logs) >= int(settings.RTD_AUDITLOGS_QUEUE_BATCH_SIZE)
+                or now - self._last_flush >= int(settings.RTD_AUDITLOGS_QUEUE_INTERVAL)
+            )
+
+        if should_flush:
+            self.flush()
+        return not dropped
+
+    def flush(self):
+        """Send the logs in the queue to be saved by a task, in batches."""
+        from readthedocs.audit.tasks import save_audit_logs
+
+        batch_size = int(settings.RTD_AUDITLOGS_QUEUE_BATCH_SIZE)
+        with self._lock:
+            logs = self._logs
+            self._logs = []
+            self._last_flush = time.monotonic()
+
+        while logs:
+            try:
+                save_audit_logs.delay(logs[:batch_size])
+            except Exception:
+                log.exception('Failed to send audit logs.', count=len(logs))
+                # Put back the logs that weren't sent, they are sent with the next batch.
+                with self._lock:
+                    max_size = int(settings.RTD_AUDITLOGS_QUEUE_MAX_SIZE)
+                    self._logs = logs + self._logs
+                    self._count_dropped(len(self._logs) - max_size)
+                    del self._logs[max_size:]
+                    self._retry_after = time.monotonic() + int(settings.RTD_AUDITLOGS_QUEUE_INTERVAL)
+                break
+            del logs[:batch_size]
+
+        with self._lock:
+            dropped = self._dropped_since_flush
+            self._dropped_since_flush = 0
+        if dropped:
+            log.warning(
+                'Audit log queue was full, logs dropped.',
+                count=dropped,
+                total=self.dropped,
+            )
+
+    def _count_dropped(self, count):
+        """Count ``count`` dropped logs, it must be called holding the lock."""
+        if count > 0:
+            self.dropped += count
+            self._dropped_since_flush += count
+
+    def __len__(self):
+        return len(self._logs)
+
+    @staticmethod
+    def _serialize(audit_log):
+        return {
+            'action': audit_log.action,
+            'user_id': audit_log.user_id,
+            'project_id': audit_log.project_id,
+            'auth_backend': audit_log.auth_backend,
+            'ip': audit_log.ip,
+            'browser': audit_log.browser,
+            'resource': audit_log.resource,
+            'created': audit_log.created.isoformat(),
+        }
+
+
+audit_log_queue = AuditLogQueue()
+atexit.register(audit_log_queue.flush)
@@ -0,0 +1,35 @@
+"""Audit tasks."""
+
+from django.contrib.auth.models import User
+from django.utils.dateparse import parse_datetime
+
+from readthedocs.audit.models import AuditLog
+from readthedocs.projects.models import Project
+from readthedocs.worker import app
+
+
+@app.task(queue='web')
+def save_audit_logs(audit_logs):
+    """
+    Save the audit logs sent by ``readthedocs.audit.queue``.
+
+    :param audit_logs: list of dictionaries with the fields of each log.
+    """
+    users = User.objects.in_bulk({data['user_id'] for data in audit_logs if data['user_id']})
+    projects = Project.objects.in_bulk(
+        {data['project_id'] for data in audit_logs if data['project_id']},
+    )
+    AuditLog.objects.bulk_create_logs([
+        AuditLog(
+            action=data['action'],
+            # The user or project could have been deleted.
+            user=users.get(data['user_id']),
+            project=projects.get(data['project_id']),
+            auth_backend=data['auth_backend'],
+            ip=data['ip'],
+            browser=data['browser'],
+            resource=data['resource'],
+            created=parse_datetime(data['created']),
+        )
+        for data in audit_logs
+    ])
@@ -1,8 +1,11 @@
+from unittest import mock
+
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django_dynamic_fixture import get
 
 from readthedocs.audit.models import AuditLog
+from readthedocs.audit.queue import AuditLogQueue
 from readthedocs.organizations.models import Organization, OrganizationOwner
 from readthedocs.projects.models import Project
 
@@ -95,3 +98,83 @@ class TestAuditModels(TestCase):
         )
         self.assertNotEqual(log.browser, text)
         self.assertTrue(log.browser.endswith(" - Truncated"))
+
+    @override_settings(
+        RTD_AUDITLOGS_QUEUE=True,
+        RTD_AUDITLOGS_QUEUE_BATCH_SIZE=2,
+        RTD_AUDITLOGS_QUEUE_INTERVAL=60 * 60,
+    )
+    @mock.patch('readthedocs.audit.models.audit_log_queue', AuditLogQueue())
+    def test_deferred_logs_are_saved_in_bulk(self):
+        AuditLog.objects.all().delete()
+        request = RequestFactory().get('/en/latest/index.html', HTTP_USER_AGENT='Firefox')
+        request.session = {}
+
+        first = AuditLog.objects.new(
+            action=AuditLog.PAGEVIEW,
+            user=self.user,
+            request=request,
+            project=self.project,
+            defer=True,
+        )
+        self.assertIsNone(first.pk)
+        self.assertEqual(AuditLog.objects.count(), 0)
+
+        # The batch is saved when it's full.
+        AuditLog.objects.new(
+            action=AuditLog.DOWNLOAD,
+            user=self.user,
+            request=request,
+            project=self.project,
+            defer=True,
+        )
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+        log = AuditLog.objects.get(action=AuditLog.PAGEVIEW)
+        self.assertEqual(log.created, first.created)
+        self.assertEqual(log.user, self.user)
+        self.assertEqual(log.log_user_username, self.user.username)
+        self.assertEqual(log.log_project_slug, self.project.slug)
+        self.assertEqual(log.organization, self.organization)
+        self.assertEqual(log.log_organization_slug, self.organization.slug)
+        self.assertEqual(log.resource, '/en/latest/index.html')
+        self.assertEqual(log.browser, 'Firefox')
+
+    @override_settings(
+        RTD_AUDITLOGS_QUEUE=True,
+        RTD_AUDITLOGS_QUEUE_BATCH_SIZE=1,
+        RTD_AUDITLOGS_QUEUE_MAX_SIZE=1,
+    )
+    @mock.patch('readthedocs.audit.models.audit_log_queue', new_callable=AuditLogQueue)
+    @mock.patch('readthedocs.audit.tasks.save_audit_logs')
+    @mock.patch('readthedocs.audit.queue.log')
+    def test_deferred_logs_are_dropped_when_queue_is_full(self, log, save_audit_logs, queue):
+        save_audit_logs.delay.side_effect = Exception('Broker is down')
+        request = RequestFactory().get('/en/latest/index.html')
+        request.session = {}
+        for _ in range(3):
+            AuditLog.objects.new(
+                action=AuditLog.PAGEVIEW,
+                user=self.user,
+                request=request,
+                project=self.project,
+                defer=True,
+            )
+
+        # The log that couldn't be sent is kept, and the other logs were dropped.
+        self.assertEqual(len(queue), 1)
+        self.assertEqual(queue.dropped, 2)
+        # The broker isn't retried until the interval has passed.
+        self.assertEqual(save_audit_logs.delay.call_count, 1)
+        # Dropped logs are reported once, on the next flush.
+        log.warning.assert_not_called()
+
+        save_audit_logs.delay.side_effect = None
+        queue.flush()
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(len(save_audit_logs.delay.call_args[0][0]), 1)
+        log.warning.assert_called_once_with(
+            'Audit log queue was full, logs dropped.',
+            count=2,
+            total=2,
+        )
@@ -12,4 +12,5 @@ class Config(AppConfig):
     verbose_name = _("Builds")
 
     def ready(self):
+        import readthedocs.builds.signals  # noqa
         import readthedocs.builds.tasks
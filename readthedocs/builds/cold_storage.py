@@ -0,0 +1,240 @@
+"""
+Archive the commands of old builds to cold storage.
+
+The commands of each build are saved to ``build_commands_storage``
+as a gzip compressed JSON list (``{date}/{id}.json.gz``),
+the format of the list is the same as the ``commands`` field of the build API.
+Builds archived before compression was added use ``{date}/{id}.json``,
+``get_archived_commands`` reads both transparently.
+
+Builds are archived in batches, paginating over the ``(date, id)`` index
+from the position where the previous run stopped (it's kept in Django's cache,
+if it's lost the next run starts from the oldest build).
+The commands of each build are streamed from the database into a compressed file,
+the files are uploaded by a bounded pool of threads,
+and the builds are marked as archived (and their commands deleted) in bulk.
+Builds that fail to be archived are skipped, they are retried
+after all builds are archived, when the position goes back to the oldest build.
+
+The full output of the commands that was saved by the builders when it was truncated
+(``output/{id}/``, see ``BuildCommand.sanitize_output``) is removed when the build is archived.
+"""
+
+import gzip
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import structlog
+from django.core.cache import cache
+from django.db.models import Q
+
+from readthedocs.api.v2.serializers import BuildCommandSerializer
+from readthedocs.builds.constants import MAX_BUILD_COMMAND_SIZE
+from readthedocs.builds.models import Build, BuildCommandResult
+from readthedocs.doc_builder.constants import COMMAND_FULL_OUTPUT_PATH
+from readthedocs.storage import build_commands_storage
+
+log = structlog.get_logger(__name__)
+
+# Number of builds archived together.
+BATCH_SIZE = 100
+# Number of files uploaded to storage at the same time.
+UPLOAD_WORKERS = 8
+# Size of the compressed output kept in memory before using a file on disk.
+SPOOL_MAX_SIZE = 256 * 1024
+
+CURSOR_CACHE_KEY = 'archive-builds:cursor'
+
+
+def get_commands_storage_path(build, compressed=True):
+    path = '{date}/{id}.json'.format(date=str(build.date.date()), id=build.id)
+    if compressed:
+        path += '.gz'
+    return path
+
+
+def get_archived_commands(build):
+    """
+    Return the commands of ``build`` from cold storage.
+
+    :returns: a list of commands or ``None`` if they aren't in storage.
+    """
+    for compressed in (True, False):
+        storage_path = get_commands_storage_path(build, compressed=compressed)
+        if not build_commands_storage.exists(storage_path):
+            continue
+        try:
+            with build_commands_storage.open(storage_path) as file:
+                if compressed:
+                    file = gzip.GzipFile(fileobj=file)
+                return json.load(file)
+        except Exception:
+            log.exception(
+                'Failed to read build data from storage.',
+                path=storage_path,
+            )
+            return None
+    return None
+
+
+def delete_full_output(build_id):
+    """Delete the full output of the commands of a build from storage."""
+    path = COMMAND_FULL_OUTPUT_PATH.format(build_id=build_id)
+    try:
+        _, filenames = build_commands_storage.listdir(path)
+        for filename in filenames:
+            build_commands_storage.delete(f'{path}/{filename}')
+    except FileNotFoundError:
+        # The output of the commands of the build wasn't truncated.
+        pass
+    except Exception:
+        log.exception('Failed to delete the full output of the build.', build_id=build_id)
+
+
+def _serialize_command(command):
+    data = BuildCommandSerializer(command).data
+    if len(data['output']) > MAX_BUILD_COMMAND_SIZE:
+        data['output'] = data['output'][-MAX_BUILD_COMMAND_SIZE:]
+        data['output'] = (
+            "\n\n"
+            "... (truncated) ..."
+            "\n\n"
+            "Command output too long. Truncated to last 1MB."
+            "\n\n" + data['output']
+        )  # noqa
+        log.debug('Truncating build command for build.', build_id=command.build_id)
+    return data
+
+
+def _compress_commands(commands):
+    """
+    Write ``commands`` as a compressed JSON list, one command at a time.
+
+    :returns: the compressed file, or ``None`` if there weren't commands.
+    """
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    count = 0
+    try:
+        with gzip.GzipFile(fileobj=file, mode='wb') as gzip_file:
+            gzip_file.write(b'[')
+            for command in commands:
+                if count:
+                    gzip_file.write(b',')
+                gzip_file.write(json.dumps(_serialize_command(command)).encode('utf8'))
+                count += 1
+            gzip_file.write(b']')
+    except Exception:
+        file.close()
+        raise
+
+    if not count:
+        file.close()
+        return None
+    file.seek(0)
+    return file
+
+
+def _upload(build, file):
+    """
+    Upload the compressed commands of ``build``.
+
+    :returns: ``True`` if the file was saved.
+    """
+    try:
+        build_commands_storage.save(name=get_commands_storage_path(build), content=file)
+        return True
+    except Exception:
+        log.exception('Cold Storage save failure', build_id=build.id)
+        return False
+    finally:
+        file.close()
+
+
+def _archive_batch(builds, delete, pool):
+    """
+    Archive the commands of ``builds``.
+
+    Builds that fail to be archived are logged and skipped.
+
+    :returns: the builds that were archived, in the same order.
+    """
+    uploads = {}
+    for build in builds:
+        commands = (
+            BuildCommandResult.objects
+            .filter(build=build)
+            .order_by('start_time', 'pk')
+        )
+        try:
+            file = _compress_commands(commands.iterator())
+        except Exception:
+            log.exception('Cold Storage compression failure', build_id=build.id)
+            uploads[build.id] = None
+            continue
+        if file:
+            uploads[build.id] = pool.submit(_upload, build, file)
+
+    archived = [
+        build
+        for build in builds
+        if build.id not in uploads or (uploads[build.id] and uploads[build.id].result())
+    ]
+    archived_ids = [build.id for build in archived]
+    if archived_ids:
+        if delete:
+            BuildCommandResult.objects.filter(build__in=archived_ids).delete()
+        Build.objects.filter(pk__in=archived_ids).update(cold_storage=True)
+        for build_id in archived_ids:
+            pool.submit(delete_full_output, build_id)
+    return archived
+
+
+def archive_builds(max_date, limit, delete=False, batch_size=BATCH_SIZE, workers=UPLOAD_WORKERS):
+    """
+    Archive the commands of up to ``limit`` builds older than ``max_date``.
+
+    The run is bounded by the number of builds processed, archived or not,
+    and it stops early if none of the builds of a batch could be archived
+    (e.g. the storage is down).
+
+    :param delete: Delete the commands from the database after archiving them.
+    :returns: the number of builds archived.
+    """
+    queryset = (
+        Build.objects
+        .filter(date__lt=max_date)
+        .exclude(cold_storage=True)
+        .order_by('date', 'id')
+        .only('date', 'cold_storage')
+    )
+    cursor = cache.get(CURSOR_CACHE_KEY)
+
+    count = 0
+    processed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while processed < limit:
+            batch = queryset
+            if cursor:
+                last_date, last_id = cursor
+                batch = batch.filter(
+                    Q(date__gt=last_date) | Q(date=last_date, id__gt=last_id),
+                )
+            builds = list(batch[:min(batch_size, limit - processed)])
+            if not builds:
+                # Start again from the oldest build in the next run,
+                # to retry the builds that failed to be archived.
+                cursor = None
+                break
+
+            archived = _archive_batch(builds, delete, pool)
+            count += len(archived)
+            processed += len(builds)
+            cursor = (builds[-1].date, builds[-1].id)
+            if not archived:
+                log.warning('Cold Storage batch failed, stopping.', count=len(builds))
+                break
+
+    cache.set(CURSOR_CACHE_KEY, cursor, timeout=None)
+    log.info('Builds archived.', count=count, processed=processed)
+    return count
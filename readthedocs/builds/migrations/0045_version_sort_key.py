@@ -0,0 +1,31 @@
+# Generated by Django 3.2.13 on 2026-10-18 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0044_alter_version_documentation_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='sort_key',
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                max_length=255,
+                null=True,
+                verbose_name='Sort key',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='version',
+            index=models.Index(
+                fields=['project', 'sort_key'],
+                name='builds_vers_project_ecb6ca_idx',
+            ),
+        ),
+    ]
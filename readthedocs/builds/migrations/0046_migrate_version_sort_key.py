@@ -0,0 +1,118 @@
+import unicodedata
+
+from django.db import migrations
+from packaging.version import InvalidVersion
+from packaging.version import Version as PackagingVersion
+
+# Frozen copy of ``readthedocs.projects.version_handling.version_sort_key``
+# (without ``repo_type``), so changes to it don't change this migration.
+
+PRE_RELEASE_ORDER = {'a': '0', 'b': '1', 'rc': '2'}
+SORT_KEY_MAX_LENGTH = 255
+HIGHEST_VERSIONS = ['latest', 'stable']
+
+
+def parse_version_failsafe(version_string):
+    final_form = ''
+    try:
+        normalized_version = unicodedata.normalize('NFKD', version_string)
+        final_form = normalized_version.encode('ascii', 'ignore').decode('ascii')
+        return PackagingVersion(final_form)
+    except InvalidVersion:
+        if final_form and '.x' in final_form:
+            return parse_version_failsafe(final_form.replace('.x', '.0'))
+    except UnicodeError:
+        pass
+    return None
+
+
+def encode_number(number):
+    digits = str(number)
+    return f'{len(digits):02d}{digits}'
+
+
+def encode_local_segment(segment):
+    if segment.isdigit():
+        return '2' + encode_number(int(segment))
+    return '1' + ''.join(f'{ord(char):03d}' for char in segment) + '000'
+
+
+def version_sort_key(version_string):
+    parsed = parse_version_failsafe(version_string)
+    comparable = parsed
+    if not comparable:
+        if version_string in HIGHEST_VERSIONS:
+            position = HIGHEST_VERSIONS.index(version_string)
+            comparable = PackagingVersion(str(999999 - position))
+        else:
+            comparable = PackagingVersion('0.01')
+
+    release = list(comparable.release)
+    while release and release[-1] == 0:
+        release.pop()
+
+    key = [encode_number(comparable.epoch)]
+    key.extend('1' + encode_number(number) for number in release)
+    key.append('0')
+
+    if comparable.pre is not None:
+        letter, number = comparable.pre
+        key.append('1' + PRE_RELEASE_ORDER[letter] + encode_number(number))
+    elif comparable.post is None and comparable.dev is not None:
+        key.append('0')
+    else:
+        key.append('2')
+
+    if comparable.post is not None:
+        key.append('1' + encode_number(comparable.post))
+    else:
+        key.append('0')
+
+    if comparable.dev is not None:
+        key.append('0' + encode_number(comparable.dev))
+    else:
+        key.append('1')
+
+    if comparable.local is not None:
+        key.append('1')
+        key.extend(
+            encode_local_segment(segment)
+            for segment in comparable.local.split('.')
+        )
+        key.append('0')
+    else:
+        key.append('0')
+
+    key = ''.join(key)[:SORT_KEY_MAX_LENGTH - 1]
+    return key + ('1' if parsed else '0')
+
+
+def forwards_func(apps, schema_editor):
+    """Compute the sort key of all versions."""
+    Version = apps.get_model('builds', 'Version')
+    step = 5000
+    versions = (
+        Version.objects.filter(sort_key__isnull=True)
+        .only('id', 'verbose_name')
+        .order_by('id')
+    )
+    last_pk = 0
+    while True:
+        chunk = list(versions.filter(pk__gt=last_pk)[:step])
+        if not chunk:
+            break
+        for version in chunk:
+            version.sort_key = version_sort_key(version.verbose_name)
+        Version.objects.bulk_update(chunk, ['sort_key'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('builds', '0045_version_sort_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards_func, migrations.RunPython.noop),
+    ]
@@ -83,7 +83,11 @@ from readthedocs.projects.constants import (
     SPHINX_SINGLEHTML,
 )
 from readthedocs.projects.models import APIProject, Project
-from readthedocs.projects.version_handling import determine_stable_version
+from readthedocs.projects.version_handling import (
+    SORT_KEY_MAX_LENGTH,
+    determine_stable_version,
+    version_sort_key,
+)
 from readthedocs.storage import build_environment_storage
 
 log = structlog.get_logger(__name__)
@@ -142,6 +146,17 @@ class Version(TimeStampedModel):
         populate_from='verbose_name',
     )
 
+    #: Key to sort versions by their version number, computed from ``verbose_name``
+    #: when the version is saved (see
+    #: :py:func:`readthedocs.projects.version_handling.version_sort_key`).
+    sort_key = models.CharField(
+        _('Sort key'),
+        max_length=SORT_KEY_MAX_LENGTH,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
     supported = models.BooleanField(_('Supported'), default=True)
     active = models.BooleanField(_('Active'), default=False)
     state = models.CharField(
@@ -192,6 +207,9 @@ class Version(TimeStampedModel):
     class Meta:
         unique_together = [('project', 'slug')]
         ordering = ['-verbose_name']
+        indexes = [
+            models.Index(fields=['project', 'sort_key']),
+        ]
 
     def __str__(self):
         return gettext(
@@ -202,6 +220,10 @@ class Version(TimeStampedModel):
             ),
         )
 
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        self.sort_key = version_sort_key(self.verbose_name)
+        super().save(*args, **kwargs)
+
     @property
     def is_private(self):
         """
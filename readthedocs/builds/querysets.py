@@ -16,6 +16,7 @@ from readthedocs.core.permissions import AdminPermission
 from readthedocs.core.utils.extend import SettingsOverrideObject
 from readthedocs.projects import constants
 from readthedocs.projects.models import Project
+from readthedocs.projects.version_handling import sort_key_expression
 
 log = structlog.get_logger(__name__)
 
@@ -117,6 +118,20 @@ class VersionQuerySetBase(models.QuerySet):
     def api(self, user=None):
         return self.public(user, only_active=False)
 
+    def order_by_version(self, repo_type=None):
+        """
+        Sort versions by their version number, from the highest to the lowest one.
+
+        This is the same order as ``sort_version_aware``, but done by the database.
+
+        :param repo_type: Repository type of the project of the versions,
+         to sort the default branch (e.g. master) first.
+        """
+        return self.order_by(
+            sort_key_expression(repo_type).desc(nulls_last=True),
+            '-verbose_name',
+        )
+
 
 class VersionQuerySet(SettingsOverrideObject):
     _default_class = VersionQuerySetBase
@@ -0,0 +1,105 @@
+"""
+Snapshot of the refs of the repository of each project.
+
+``sync_versions_task`` receives all the tags and branches of the repository on each sync,
+projects with thousands of refs would update and query all of their versions each time.
+The refs of the last successful sync are stored per project in Django's cache,
+so the next sync only processes the refs that were added, removed or moved since then.
+
+The snapshot is only valid while the refs of the versions of the project aren't changed
+by something else than a sync, it's removed when a version is created or deleted,
+or when any of ``REFS_VERSION_FIELDS`` changes (see ``readthedocs.builds.signals``).
+It expires after ``RTD_REFS_SNAPSHOT_CACHE_TIMEOUT`` seconds, so projects get a full sync
+from time to time (e.g. active versions of removed refs that were deactivated later
+are only deleted by a full sync).
+"""
+
+from collections import namedtuple
+
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+
+from readthedocs.builds.constants import LATEST_VERBOSE_NAME, STABLE_VERBOSE_NAME
+
+log = structlog.get_logger(__name__)
+
+# Fields of ``Version`` compared with the refs of the repository on each sync.
+REFS_VERSION_FIELDS = ('identifier', 'verbose_name', 'type')
+
+RefsDelta = namedtuple(
+    'RefsDelta',
+    [
+        # Tags and branches that were added or moved (same format as ``tags_data``).
+        'tags_data',
+        'branches_data',
+        # Names of the tags and identifiers of the branches that were removed.
+        'removed_tags',
+        'removed_branches',
+    ],
+)
+
+
+def _get_cache_key(project_id):
+    return f'refs-snapshot:{project_id}'
+
+
+def _get_refs(versions_data):
+    return {version['verbose_name']: version['identifier'] for version in versions_data}
+
+
+def get_refs_snapshot(project_id):
+    """
+    Return the refs of the last sync of the project.
+
+    :returns: a dictionary with the ``tags`` and ``branches`` of the repository
+     (verbose name to identifier), or ``None`` if there isn't a snapshot.
+    """
+    return cache.get(_get_cache_key(project_id))
+
+
+def set_refs_snapshot(project_id, tags_data, branches_data):
+    cache.set(
+        _get_cache_key(project_id),
+        {
+            'tags': _get_refs(tags_data),
+            'branches': _get_refs(branches_data),
+        },
+        timeout=settings.RTD_REFS_SNAPSHOT_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_refs_snapshot(project_id):
+    cache.delete(_get_cache_key(project_id))
+
+
+def _get_changed(old_refs, versions_data):
+    return [
+        version
+        for version in versions_data
+        # ``stable`` and ``latest`` are always included,
+        # they replace the versions created by us if they exist in the repository.
+        if version['verbose_name'] in (STABLE_VERBOSE_NAME, LATEST_VERBOSE_NAME)
+        or old_refs.get(version['verbose_name']) != version['identifier']
+    ]
+
+
+def get_refs_delta(snapshot, tags_data, branches_data):
+    """Return the refs that changed between ``snapshot`` and the current refs."""
+    tags = _get_refs(tags_data)
+    branches = _get_refs(branches_data)
+
+    removed_tags = set(snapshot['tags']) - set(tags)
+    # Branches are deleted by identifier.
+    removed_branches = {
+        identifier
+        for name, identifier in snapshot['branches'].items()
+        if name not in branches
+    } - set(branches.values())
+
+    return RefsDelta(
+        tags_data=_get_changed(snapshot['tags'], tags_data),
+        branches_data=_get_changed(snapshot['branches'], branches_data),
+        removed_tags=removed_tags,
+        removed_branches=removed_branches,
+    )
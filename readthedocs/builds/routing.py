@@ -0,0 +1,107 @@
+"""
+Summary of the builds of a version used to route its build tasks.
+
+``TaskRouter`` decides the queue of each build task from the previous builds of the version:
+if they used conda, how many of them succeeded, and which builder built them.
+Instead of querying and parsing the builds each time a task is dispatched,
+a summary is stored per version in Django's cache,
+and it's updated when a build of the version finishes (see ``readthedocs.builds.signals``).
+
+The summary is keyed by the slug of the version,
+so the summary of the default version of a project can be read without querying the version.
+"""
+
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+
+from readthedocs.builds.models import Build
+
+log = structlog.get_logger(__name__)
+
+# Number of previous builds checked to know if the version uses conda.
+N_LAST_BUILDS = 15
+
+# Fields of a build used to generate the summary.
+SUMMARY_BUILD_FIELDS = ('state', 'success', 'builder', '_config')
+
+
+def _get_cache_key(project_id, version_slug):
+    return f'build-routing:{project_id}:{version_slug}'
+
+
+def _uses_conda(build):
+    build_tools_python = ''
+    conda = None
+    if build.config:
+        build_tools_python = (
+            build.config
+            .get('build', {})
+            .get('tools', {})
+            .get('python', {})
+            .get('version', '')
+        )
+        conda = build.config.get('conda', None)
+
+    return any([
+        conda,
+        build_tools_python.startswith('miniconda'),
+    ])
+
+
+def _get_summary_from_db(project_id, version_slug):
+    builds = Build.objects.filter(
+        version__project_id=project_id,
+        version__slug=version_slug,
+    )
+    last_builds = builds.order_by('-date')[:N_LAST_BUILDS]
+    last_build_with_builder = (
+        builds
+        .filter(builder__isnull=False)
+        .order_by('-date')
+        .only('builder')
+        .first()
+    )
+    return {
+        'uses_conda': any(_uses_conda(build) for build in last_builds.iterator()),
+        'successful_builds': builds.filter(success=True).count(),
+        'builder': last_build_with_builder.builder if last_build_with_builder else None,
+    }
+
+
+def get_routing_summary(project_id, version_slug):
+    """
+    Return the routing summary of a version.
+
+    The summary is a dictionary with:
+
+    - ``uses_conda``: if any of the last ``N_LAST_BUILDS`` builds used conda.
+    - ``successful_builds``: number of successful builds.
+    - ``builder``: name of the builder of the last build, or ``None``.
+    """
+    cache_key = _get_cache_key(project_id, version_slug)
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = update_routing_summary(project_id, version_slug)
+    return summary
+
+
+def update_routing_summary(project_id, version_slug):
+    """Generate the routing summary of a version from its builds and store it."""
+    summary = _get_summary_from_db(project_id, version_slug)
+    log.debug(
+        'Updating build routing summary.',
+        project_id=project_id,
+        version_slug=version_slug,
+        summary=summary,
+    )
+    cache.set(
+        _get_cache_key(project_id, version_slug),
+        summary,
+        timeout=settings.RTD_BUILD_ROUTING_CACHE_TIMEOUT,
+    )
+    return summary
+
+
+def invalidate_routing_summary(project_id, version_slug):
+    cache.delete(_get_cache_key(project_id, version_slug))
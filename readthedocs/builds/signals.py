@@ -1,8 +1,108 @@
 """Build signals."""
 
 import django.dispatch
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
 
+from readthedocs.builds.constants import BUILD_STATE_FINISHED
+from readthedocs.builds.models import Build, Version
+from readthedocs.builds.refs import REFS_VERSION_FIELDS, invalidate_refs_snapshot
+from readthedocs.builds.routing import (
+    SUMMARY_BUILD_FIELDS,
+    invalidate_routing_summary,
+    update_routing_summary,
+)
 
 build_complete = django.dispatch.Signal()
 # Useful to know when to purge the footer
 version_changed = django.dispatch.Signal()
+
+
+def _get_summary_values(instance):
+    # Use ``__dict__`` to not fetch deferred fields.
+    return {field: instance.__dict__.get(field) for field in SUMMARY_BUILD_FIELDS}
+
+
+@receiver(post_init, sender=Build)
+def track_build_summary_values(instance, *args, **kwargs):
+    """Keep the values used by the routing summary, to know if they changed when saving."""
+    instance._summary_values = _get_summary_values(instance)
+
+
+@receiver(post_save, sender=Build)
+def update_build_routing_summary(instance, created, update_fields=None, **kwargs):
+    """
+    Update the summary used to route the build tasks of the version when a build finishes.
+
+    Builds are saved several times while they run and after they finish,
+    the summary is only updated when the build is saved as finished
+    and any of the fields used by the summary changed (e.g. the state changed to finished).
+    """
+    values = _get_summary_values(instance)
+    previous_values = instance._summary_values
+    instance._summary_values = values
+
+    if instance.state != BUILD_STATE_FINISHED or not instance.version_id:
+        return
+    if update_fields is not None and not set(update_fields) & set(SUMMARY_BUILD_FIELDS):
+        return
+    if not created and values == previous_values:
+        return
+    update_routing_summary(instance.version.project_id, instance.version.slug)
+
+
+@receiver(post_delete, sender=Build)
+def delete_build_full_output(instance, *args, **kwargs):
+    """
+    Delete the full output of the commands of the build from storage.
+
+    Archived builds don't have it, it's deleted when they are archived.
+    """
+    from readthedocs.builds.tasks import delete_builds_full_output  # noqa
+
+    if not settings.RTD_SAVE_BUILD_COMMANDS_TO_STORAGE or instance.cold_storage:
+        return
+    build_id = instance.pk
+    transaction.on_commit(lambda: delete_builds_full_output.delay([build_id]))
+
+
+@receiver(post_delete, sender=Version)
+def invalidate_version_routing_summary(instance, *args, **kwargs):
+    invalidate_routing_summary(instance.project_id, instance.slug)
+
+
+def _get_refs_values(instance):
+    # Use ``__dict__`` to not fetch deferred fields.
+    return {field: instance.__dict__.get(field) for field in REFS_VERSION_FIELDS}
+
+
+@receiver(post_init, sender=Version)
+def track_version_refs_values(instance, *args, **kwargs):
+    """Keep the values compared with the refs of the repository, to know if they changed."""
+    instance._refs_values = _get_refs_values(instance)
+
+
+@receiver(post_save, sender=Version)
+def invalidate_version_refs_snapshot(instance, created, update_fields=None, **kwargs):
+    """
+    The next sync of versions of the project needs to check all of its refs.
+
+    Only when the version is created or its ref changed,
+    versions are saved by builds many times without changing their ref.
+    """
+    values = _get_refs_values(instance)
+    previous_values = instance._refs_values
+    instance._refs_values = values
+
+    if update_fields is not None and not set(update_fields) & set(REFS_VERSION_FIELDS):
+        return
+    if not created and values == previous_values:
+        return
+    invalidate_refs_snapshot(instance.project_id)
+
+
+@receiver(post_delete, sender=Version)
+def invalidate_deleted_version_refs_snapshot(instance, *args, **kwargs):
+    invalidate_refs_snapshot(instance.project_id)
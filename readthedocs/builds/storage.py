@@ -1,8 +1,13 @@
-import structlog
+import hashlib
+import json
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import structlog
 from django.conf import settings
 from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
 from django.core.files.storage import FileSystemStorage
 from storages.utils import get_available_overwrite_name, safe_join
 
@@ -22,6 +27,12 @@ class BuildMediaStorageMixin:
     See: https://docs.djangoproject.com/en/1.11/ref/files/storage
     """
 
+    # Prefix of the manifests saved by ``sync_directory_incremental``
+    # with the size and checksum of each file uploaded.
+    # Files with this prefix aren't removed when syncing a directory incrementally,
+    # the manifests of other directories can be saved in it.
+    sync_manifest_prefix = '.readthedocs-sync-manifest-'
+
     @staticmethod
     def _dirpath(path):
         """
@@ -134,6 +145,149 @@ class BuildMediaStorageMixin:
                 log.debug('Deleting file from media storage.', filepath=filepath)
                 self.delete(filepath)
 
+    def get_sync_manifest_path(self, directory, name):
+        """Return the path of the manifest ``name`` saved in ``directory``."""
+        return self.join(directory, f'{self.sync_manifest_prefix}{name}.json')
+
+    def sync_directory_incremental(self, source, destination, manifest_path, max_workers=None):
+        """
+        Sync a directory recursively to storage, uploading only the files that changed.
+
+        A manifest with the size and checksum of each file is saved
+        in ``manifest_path`` after each sync (see ``get_sync_manifest_path``),
+        it shouldn't be saved in a path that is served publicly.
+        Files whose size and checksum match the manifest of the previous sync
+        and that are still present in remote storage are skipped.
+        Files are uploaded in parallel using a pool of ``max_workers`` threads.
+        Removes files in remote storage that are not present in ``source``
+        using ``delete_files``.
+
+        :param source: the source path on the local disk
+        :param destination: the destination path in storage
+        :param manifest_path: the path of the manifest in storage
+        :param max_workers: number of threads used to upload files,
+         defaults to ``RTD_BUILD_MEDIA_SYNC_MAX_WORKERS``.
+        :returns: a dictionary with the number of files
+         ``uploaded``, ``skipped`` and ``deleted``,
+         and the number of ``bytes_uploaded``.
+        """
+        if destination in ('', '/'):
+            raise SuspiciousFileOperation('Syncing all storage cannot be right')
+
+        log.debug(
+            'Syncing to media storage incrementally.',
+            source=source,
+            destination=destination,
+        )
+        source = Path(source)
+        previous_manifest = self._read_sync_manifest(manifest_path)
+        remote_files = {
+            relpath
+            for relpath in self._list_files(destination)
+            if not posixpath.basename(relpath).startswith(self.sync_manifest_prefix)
+        }
+
+        def sync_file(filepath):
+            relpath = filepath.relative_to(source).as_posix()
+            entry = {
+                'size': filepath.stat().st_size,
+                'checksum': self._get_file_checksum(filepath),
+            }
+            if relpath in remote_files and previous_manifest.get(relpath) == entry:
+                return relpath, entry, False
+
+            with filepath.open('rb') as fd:
+                self.save(self.join(destination, relpath), fd)
+            return relpath, entry, True
+
+        stats = {
+            'uploaded': 0,
+            'skipped': 0,
+            'deleted': 0,
+            'bytes_uploaded': 0,
+        }
+        manifest = {}
+        max_workers = max_workers or settings.RTD_BUILD_MEDIA_SYNC_MAX_WORKERS
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(sync_file, self._walk_local_files(source))
+            for relpath, entry, uploaded in results:
+                manifest[relpath] = entry
+                if uploaded:
+                    stats['uploaded'] += 1
+                    stats['bytes_uploaded'] += entry['size']
+                else:
+                    stats['skipped'] += 1
+
+        # Remove files that are not present in ``source``
+        files_to_delete = sorted(remote_files - set(manifest))
+        self.delete_files([
+            self.join(destination, relpath)
+            for relpath in files_to_delete
+        ])
+        stats['deleted'] = len(files_to_delete)
+
+        self.save(
+            manifest_path,
+            ContentFile(json.dumps(manifest, sort_keys=True).encode()),
+        )
+        log.debug(
+            'Synced to media storage.',
+            source=str(source),
+            destination=destination,
+            **stats,
+        )
+        return stats
+
+    def delete_files(self, paths):
+        """
+        Delete a list of files from storage.
+
+        Storage backends that support deleting several files
+        in one request should override this method.
+
+        :param paths: the paths of the files to remove
+        """
+        for path in paths:
+            log.debug('Deleting file from media storage.', filepath=path)
+            self.delete(path)
+
+    def _read_sync_manifest(self, path):
+        """Return the manifest saved by ``sync_directory_incremental``, or an empty one."""
+        if not self.exists(path):
+            return {}
+        try:
+            with self.open(path) as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            log.warning('Invalid sync manifest in media storage.', path=path)
+            return {}
+
+    def _list_files(self, path):
+        """Return the paths of all files under ``path``, relative to ``path``."""
+        path = self._dirpath(path)
+        for root, _, files in self.walk(path):
+            root = self._dirpath(root)[len(path):]
+            for filename in files:
+                if filename:
+                    yield root + filename
+
+    @staticmethod
+    def _walk_local_files(source):
+        """Return the paths of all files under ``source`` in the local disk, recursively."""
+        for filepath in source.iterdir():
+            if filepath.is_dir():
+                yield from BuildMediaStorageMixin._walk_local_files(filepath)
+            elif filepath.is_file():
+                yield filepath
+
+    @staticmethod
+    def _get_file_checksum(filepath):
+        md5 = hashlib.md5()
+        with filepath.open('rb') as fd:
+            for chunk in iter(lambda: fd.read(64 * 1024), b''):
+                md5.update(chunk)
+        return md5.hexdigest()
+
     def join(self, directory, filepath):
         return safe_join(directory, filepath)
 
@@ -1,5 +1,4 @@
 import json
-from io import BytesIO
 
 import requests
 import structlog
@@ -9,7 +8,7 @@ from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from readthedocs import __version__
-from readthedocs.api.v2.serializers import BuildCommandSerializer
+from readthedocs.api.v2.cache import invalidate_footer
 from readthedocs.api.v2.utils import (
     delete_versions_from_db,
     get_deleted_active_versions,
@@ -24,10 +23,16 @@ from readthedocs.builds.constants import (
     EXTERNAL,
     EXTERNAL_VERSION_STATE_CLOSED,
     LOCK_EXPIRE,
-    MAX_BUILD_COMMAND_SIZE,
     TAG,
 )
+from readthedocs.builds.cold_storage import archive_builds, delete_full_output
 from readthedocs.builds.models import Build, Version
+from readthedocs.builds.refs import (
+    get_refs_delta,
+    get_refs_snapshot,
+    set_refs_snapshot,
+)
+from readthedocs.builds.routing import get_routing_summary
 from readthedocs.builds.utils import memcache_lock
 from readthedocs.core.permissions import AdminPermission
 from readthedocs.core.utils import send_email, trigger_build
@@ -35,7 +40,7 @@ from readthedocs.integrations.models import HttpExchange
 from readthedocs.oauth.notifications import GitBuildStatusFailureNotification
 from readthedocs.projects.constants import GITHUB_BRAND, GITLAB_BRAND
 from readthedocs.projects.models import Project, WebHookEvent
-from readthedocs.storage import build_commands_storage
+from readthedocs.proxito.cache import invalidate_sitemap
 from readthedocs.worker import app
 
 log = structlog.get_logger(__name__)
@@ -55,12 +60,14 @@ class TaskRouter:
 
     It ignores projects that have already set ``build_queue`` attribute.
 
+    The previous builds of the version are read from its routing summary
+    (see ``readthedocs.builds.routing``), so no builds are queried or parsed here.
+
     https://docs.celeryproject.org/en/stable/userguide/routing.html#manual-routing
     https://docs.celeryproject.org/en/stable/userguide/configuration.html#std:setting-task_routes
     """
 
     MIN_SUCCESSFUL_BUILDS = 5
-    N_LAST_BUILDS = 15
     TIME_AVERAGE = 350
 
     BUILD_DEFAULT_QUEUE = 'build:default'
@@ -95,14 +102,12 @@ class TaskRouter:
         # We always want the same queue as the previous default version,
         # so that users will have the same outcome for PR's as normal builds.
         if version.type == EXTERNAL:
-            last_build_for_default_version = (
-                project.builds
-                .filter(version__slug=project.get_default_version(), builder__isnull=False)
-                .order_by('-date')
-                .first()
+            default_version_summary = get_routing_summary(
+                project.pk,
+                project.get_default_version(),
             )
-            if last_build_for_default_version:
-                if 'default' in last_build_for_default_version.builder:
+            if default_version_summary['builder']:
+                if 'default' in default_version_summary['builder']:
                     routing_queue = self.BUILD_DEFAULT_QUEUE
                 else:
                     routing_queue = self.BUILD_LARGE_QUEUE
@@ -113,41 +118,18 @@ class TaskRouter:
                 )
                 return routing_queue
 
-        last_builds = version.builds.order_by('-date')[:self.N_LAST_BUILDS]
+        summary = get_routing_summary(project.pk, version.slug)
         # Version has used conda in previous builds
-        for build in last_builds.iterator():
-            build_tools_python = ''
-            conda = None
-            if build.config:
-                build_tools_python = (
-                    build.config
-                    .get('build', {})
-                    .get('tools', {})
-                    .get('python', {})
-                    .get('version', '')
-                )
-                conda = build.config.get('conda', None)
-
-            uses_conda = any([
-                conda,
-                build_tools_python.startswith('miniconda'),
-            ])
-            if uses_conda:
-                log.info(
-                    'Routing task because project uses conda.',
-                    project_slug=project.slug,
-                    queue=self.BUILD_LARGE_QUEUE,
-                )
-                return self.BUILD_LARGE_QUEUE
+        if summary['uses_conda']:
+            log.info(
+                'Routing task because project uses conda.',
+                project_slug=project.slug,
+                queue=self.BUILD_LARGE_QUEUE,
+            )
+            return self.BUILD_LARGE_QUEUE
 
-        successful_builds_count = (
-            version.builds
-            .filter(success=True)
-            .order_by('-date')
-            .count()
-        )
         # We do not have enough builds for this version yet
-        if successful_builds_count < self.MIN_SUCCESSFUL_BUILDS:
+        if summary['successful_builds'] < self.MIN_SUCCESSFUL_BUILDS:
             log.info(
                 'Routing task because it does not have enough successful builds yet.',
                 project_slug=project.slug,
@@ -170,7 +152,7 @@ class TaskRouter:
         if task in tasks:
             version_pk = args[0]
             try:
-                version = Version.objects.get(pk=version_pk)
+                version = Version.objects.select_related('project').get(pk=version_pk)
             except Version.DoesNotExist:
                 log.debug(
                     'Version does not exist. Routing task to default queue.',
@@ -185,6 +167,7 @@ def archive_builds_task(self, days=14, limit=200, delete=False):
     Task to archive old builds to cold storage.
 
     :arg days: Find builds older than `days` days.
+    :arg limit: Maximum number of builds archived in each run.
     :arg delete: If True, deletes BuildCommand objects after archiving them
     """
     if not settings.RTD_SAVE_BUILD_COMMANDS_TO_STORAGE:
@@ -197,45 +180,14 @@ def archive_builds_task(self, days=14, limit=200, delete=False):
             return False
 
         max_date = timezone.now() - timezone.timedelta(days=days)
-        queryset = (
-            Build.objects
-            .exclude(cold_storage=True)
-            .filter(date__lt=max_date)
-            .prefetch_related('commands')
-            .only('date', 'cold_storage')
-            [:limit]
-        )
+        archive_builds(max_date=max_date, limit=limit, delete=delete)
 
-        for build in queryset:
-            commands = BuildCommandSerializer(build.commands, many=True).data
-            if commands:
-                for cmd in commands:
-                    if len(cmd["output"]) > MAX_BUILD_COMMAND_SIZE:
-                        cmd["output"] = cmd["output"][-MAX_BUILD_COMMAND_SIZE:]
-                        cmd["output"] = (
-                            "\n\n"
-                            "... (truncated) ..."
-                            "\n\n"
-                            "Command output too long. Truncated to last 1MB."
-                            "\n\n" + cmd["output"]
-                        )  # noqa
-                        log.debug(
-                            "Truncating build command for build.", build_id=build.id
-                        )
-                output = BytesIO(json.dumps(commands).encode("utf8"))
-                filename = "{date}/{id}.json".format(
-                    date=str(build.date.date()), id=build.id
-                )
-                try:
-                    build_commands_storage.save(name=filename, content=output)
-                    if delete:
-                        build.commands.all().delete()
-                except IOError:
-                    log.exception('Cold Storage save failure')
-                    continue
 
-            build.cold_storage = True
-            build.save()
+@app.task(queue='web')
+def delete_builds_full_output(build_ids):
+    """Delete the full output of the commands of deleted builds from storage."""
+    for build_id in build_ids:
+        delete_full_output(build_id)
 
 
 @app.task(queue='web')
@@ -289,6 +241,8 @@ def sync_versions_task(project_pk, tags_data, branches_data, **kwargs):
 
     Creates new Version objects for tags/branches that aren't tracked in the database,
     and deletes Version objects for tags/branches that don't exists in the repository.
+    If there is a snapshot of the refs of the last sync,
+    only the refs that changed since then are processed (see ``readthedocs.builds.refs``).
 
     :param tags_data: List of dictionaries with ``verbose_name`` and ``identifier``.
     :param branches_data: Same as ``tags_data`` but for branches.
@@ -296,6 +250,19 @@ def sync_versions_task(project_pk, tags_data, branches_data, **kwargs):
     """
     project = Project.objects.get(pk=project_pk)
 
+    delta = None
+    snapshot = get_refs_snapshot(project.pk)
+    if snapshot is not None:
+        delta = get_refs_delta(snapshot, tags_data, branches_data)
+        log.info(
+            'Syncing changed refs.',
+            project_slug=project.slug,
+            changed_tags=len(delta.tags_data),
+            changed_branches=len(delta.branches_data),
+            removed_tags=len(delta.removed_tags),
+            removed_branches=len(delta.removed_branches),
+        )
+
     # If the currently highest non-prerelease version is active, then make
     # the new latest version active as well.
     current_stable = project.get_original_stable_version()
@@ -309,14 +276,14 @@ def sync_versions_task(project_pk, tags_data, branches_data, **kwargs):
         added_versions = set()
         result = sync_versions_to_db(
             project=project,
-            versions=tags_data,
+            versions=delta.tags_data if delta else tags_data,
             type=TAG,
         )
         added_versions.update(result)
 
         result = sync_versions_to_db(
             project=project,
-            versions=branches_data,
+            versions=delta.branches_data if delta else branches_data,
             type=BRANCH,
         )
         added_versions.update(result)
@@ -325,11 +292,13 @@ def sync_versions_task(project_pk, tags_data, branches_data, **kwargs):
             project=project,
             tags_data=tags_data,
             branches_data=branches_data,
+            delta=delta,
         )
         deleted_active_versions = get_deleted_active_versions(
             project=project,
             tags_data=tags_data,
             branches_data=branches_data,
+            delta=delta,
         )
     except Exception:
         log.exception('Sync Versions Error')
@@ -369,6 +338,12 @@ def sync_versions_task(project_pk, tags_data, branches_data, **kwargs):
             promoted_version.active = True
             promoted_version.save()
             trigger_build(project=project, version=promoted_version)
+
+    # Versions are updated in bulk, without triggering the signals of each version.
+    invalidate_sitemap(project.pk, project.main_language_project_id)
+    invalidate_footer(project)
+    # Saving versions above removes the snapshot, it's stored once all versions are synced.
+    set_refs_snapshot(project.pk, tags_data, branches_data)
     return True
 
 
@@ -1,9 +1,16 @@
+from unittest import mock
+
 import django_dynamic_fixture as fixture
 from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase
 from django.test.utils import override_settings
 
-from readthedocs.builds.constants import EXTERNAL
+from readthedocs.builds.constants import (
+    BUILD_STATE_FINISHED,
+    BUILD_STATE_TRIGGERED,
+    EXTERNAL,
+)
 from readthedocs.builds.models import Build, Version
 from readthedocs.builds.tasks import TaskRouter
 from readthedocs.projects.models import Project
@@ -12,6 +19,7 @@ from readthedocs.projects.models import Project
 class TaskRouterTests(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.project = fixture.get(
             Project,
             build_queue=None,
@@ -110,3 +118,40 @@ class TaskRouterTests(TestCase):
             self.router.route_for_task(self.task, args, kwargs),
             TaskRouter.BUILD_LARGE_QUEUE,
         )
+
+    def test_routing_summary_is_updated_when_build_finishes(self):
+        self.assertIsNone(
+            self.router.route_for_task(self.task, self.args, self.kwargs),
+        )
+
+        # Only the version (and its project) is queried once the summary exists.
+        with self.assertNumQueries(1):
+            self.assertIsNone(
+                self.router.route_for_task(self.task, self.args, self.kwargs),
+            )
+
+        build = fixture.get(
+            Build,
+            version=self.version,
+            state=BUILD_STATE_TRIGGERED,
+            _config={'build': {'tools': {'python': {'version': 'miniconda3-4.7'}}}},
+        )
+        # The summary isn't updated until the build finishes.
+        self.assertIsNone(
+            self.router.route_for_task(self.task, self.args, self.kwargs),
+        )
+
+        build.state = BUILD_STATE_FINISHED
+        build.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.router.route_for_task(self.task, self.args, self.kwargs),
+                TaskRouter.BUILD_LARGE_QUEUE,
+            )
+
+        # Saving the finished build again doesn't update the summary.
+        with mock.patch('readthedocs.builds.signals.update_routing_summary') as update:
+            build.length = 60
+            build.save()
+            Build.objects.get(pk=build.pk).save()
+        update.assert_not_called()
@@ -1,10 +1,15 @@
+import gzip
+import json
 from datetime import datetime, timedelta
+from io import BytesIO
 from unittest import mock
 
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.utils import timezone
 from django_dynamic_fixture import get
 
+from readthedocs.builds import cold_storage
 from readthedocs.builds.constants import (
     BRANCH,
     EXTERNAL,
@@ -12,6 +17,11 @@ from readthedocs.builds.constants import (
     EXTERNAL_VERSION_STATE_OPEN,
     TAG,
 )
+from readthedocs.builds.cold_storage import (
+    archive_builds,
+    get_archived_commands,
+    get_commands_storage_path,
+)
 from readthedocs.builds.models import Build, BuildCommandResult, Version
 from readthedocs.builds.tasks import (
     archive_builds_task,
@@ -81,8 +91,9 @@ class TestTasks(TestCase):
         self.assertFalse(Version.objects.filter(slug='external-inactive-old').exists())
 
     @override_settings(RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True)
-    @mock.patch('readthedocs.builds.tasks.build_commands_storage')
+    @mock.patch('readthedocs.builds.cold_storage.build_commands_storage')
     def test_archive_builds(self, build_commands_storage):
+        cache.clear()
         project = get(Project)
         version = get(Version, project=project)
         for i in range(10):
@@ -111,3 +122,173 @@ class TestTasks(TestCase):
         self.assertEqual(Build.objects.count(), 10)
         self.assertEqual(Build.objects.filter(cold_storage=True).count(), 5)
         self.assertEqual(BuildCommandResult.objects.count(), 50)
+
+    @override_settings(RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True)
+    def test_archive_builds_compressed(self):
+        cache.clear()
+        project = get(Project)
+        version = get(Version, project=project)
+        builds = []
+        for i in range(5):
+            build = get(
+                Build,
+                project=project,
+                version=version,
+                date=timezone.now() - timezone.timedelta(days=10 - i),
+                cold_storage=False,
+            )
+            for j in range(3):
+                get(
+                    BuildCommandResult,
+                    build=build,
+                    command=f'echo {j}',
+                    output=str(j),
+                    start_time=build.date + timezone.timedelta(seconds=j),
+                )
+            builds.append(build)
+        # A build without commands is marked as archived.
+        builds[2].commands.all().delete()
+
+        storage = {}
+
+        def save(name, content):
+            storage[name] = content.read()
+            return name
+
+        with mock.patch('readthedocs.builds.cold_storage.build_commands_storage') as build_commands_storage:
+            build_commands_storage.save.side_effect = save
+            build_commands_storage.exists.side_effect = lambda name: name in storage
+            build_commands_storage.open.side_effect = lambda name: BytesIO(storage[name])
+
+            # The first run archives 3 builds in two batches.
+            self.assertEqual(archive_builds(max_date=timezone.now(), limit=3, batch_size=2), 3)
+            self.assertEqual(len(storage), 2)
+            self.assertEqual(Build.objects.filter(cold_storage=True).count(), 3)
+            self.assertEqual(BuildCommandResult.objects.count(), 12)
+
+            # The next run continues from the last archived build.
+            with self.assertNumQueries(5):
+                self.assertEqual(archive_builds(max_date=timezone.now(), limit=1, delete=True), 1)
+            self.assertEqual(BuildCommandResult.objects.count(), 9)
+
+            path = get_commands_storage_path(builds[0])
+            self.assertTrue(path.endswith(f'/{builds[0].pk}.json.gz'))
+            commands = json.loads(gzip.decompress(storage[path]))
+            self.assertEqual([command['command'] for command in commands], ['echo 0', 'echo 1', 'echo 2'])
+            self.assertEqual(get_archived_commands(builds[0]), commands)
+
+            # Builds archived before compression are read too.
+            legacy_path = get_commands_storage_path(builds[4], compressed=False)
+            storage[legacy_path] = json.dumps([{'command': 'ls'}]).encode()
+            self.assertEqual(get_archived_commands(builds[4]), [{'command': 'ls'}])
+            self.assertIsNone(get_archived_commands(builds[2]))
+
+    @override_settings(RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True)
+    @mock.patch('readthedocs.builds.cold_storage.build_commands_storage')
+    def test_archive_builds_upload_failure(self, build_commands_storage):
+        cache.clear()
+        project = get(Project)
+        version = get(Version, project=project)
+        builds = []
+        for i in range(3):
+            build = get(
+                Build,
+                project=project,
+                version=version,
+                date=timezone.now() - timezone.timedelta(days=10 - i),
+                cold_storage=False,
+            )
+            get(BuildCommandResult, build=build, command='ls', output='docs')
+            builds.append(build)
+        build_commands_storage.save.side_effect = [None, IOError]
+        serialize_command = cold_storage._serialize_command
+
+        def serialize_command_with_failure(command):
+            if command.build_id == builds[2].pk:
+                raise ValueError
+            return serialize_command(command)
+
+        # The builds that failed are skipped.
+        with mock.patch.object(
+            cold_storage,
+            '_serialize_command',
+            side_effect=serialize_command_with_failure,
+        ):
+            self.assertEqual(archive_builds(max_date=timezone.now(), limit=10, delete=True), 1)
+        self.assertEqual(
+            list(Build.objects.filter(cold_storage=True).values_list('pk', flat=True)),
+            [builds[0].pk],
+        )
+        self.assertEqual(BuildCommandResult.objects.count(), 2)
+
+        # The run reached the newest build,
+        # the next run starts from the oldest one, retrying the builds that failed.
+        build_commands_storage.save.side_effect = None
+        self.assertEqual(archive_builds(max_date=timezone.now(), limit=10, delete=True), 2)
+        self.assertEqual(BuildCommandResult.objects.count(), 0)
+
+    @override_settings(RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True)
+    @mock.patch('readthedocs.builds.cold_storage.build_commands_storage')
+    def test_archive_builds_stops_when_batch_fails(self, build_commands_storage):
+        cache.clear()
+        project = get(Project)
+        version = get(Version, project=project)
+        for i in range(6):
+            build = get(
+                Build,
+                project=project,
+                version=version,
+                date=timezone.now() - timezone.timedelta(days=10 - i),
+                cold_storage=False,
+            )
+            get(BuildCommandResult, build=build, command='ls', output='docs')
+        build_commands_storage.save.side_effect = IOError
+
+        # The storage is down, the run stops after the first batch.
+        self.assertEqual(archive_builds(max_date=timezone.now(), limit=6, batch_size=2), 0)
+        self.assertEqual(len(build_commands_storage.save.mock_calls), 2)
+
+        # Runs are bounded by the builds processed, not by the builds archived.
+        build_commands_storage.save.side_effect = [None, IOError, None, IOError]
+        self.assertEqual(archive_builds(max_date=timezone.now(), limit=4, batch_size=2), 2)
+        self.assertEqual(len(build_commands_storage.save.mock_calls), 6)
+        self.assertEqual(Build.objects.filter(cold_storage=True).count(), 2)
+
+    @override_settings(RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True)
+    @mock.patch('readthedocs.builds.cold_storage.build_commands_storage')
+    def test_archive_builds_deletes_full_output(self, build_commands_storage):
+        cache.clear()
+        project = get(Project)
+        version = get(Version, project=project)
+        builds = [
+            get(
+                Build,
+                project=project,
+                version=version,
+                date=timezone.now() - timezone.timedelta(days=10 - i),
+                cold_storage=False,
+            )
+            for i in range(2)
+        ]
+        build_commands_storage.listdir.side_effect = lambda path: (
+            ([], ['output.log']) if path == f'output/{builds[0].pk}' else ([], [])
+        )
+
+        self.assertEqual(archive_builds(max_date=timezone.now(), limit=10), 2)
+        build_commands_storage.delete.assert_called_once_with(f'output/{builds[0].pk}/output.log')
+
+    @override_settings(RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True)
+    @mock.patch('readthedocs.builds.cold_storage.build_commands_storage')
+    def test_delete_build_deletes_full_output(self, build_commands_storage):
+        project = get(Project)
+        version = get(Version, project=project)
+        build = get(Build, project=project, version=version, cold_storage=False)
+        archived_build = get(Build, project=project, version=version, cold_storage=True)
+        build_commands_storage.listdir.return_value = ([], ['output.log'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            build_id = build.pk
+            build.delete()
+            archived_build.delete()
+        build_commands_storage.listdir.assert_called_once_with(f'output/{build_id}')
+        build_commands_storage.delete.assert_called_once_with(f'output/{build_id}/output.log')
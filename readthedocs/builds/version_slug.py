@@ -160,16 +160,6 @@ class VersionSlugField(models.CharField):
         # get fields to populate from and slug field to set
         slug_field = model_instance._meta.get_field(self.attname)
 
-        slug = self.slugify(getattr(model_instance, self._populate_from))
-        count = 0
-
-        # strip slug depending on max_length attribute of the slug field
-        # and clean-up
-        slug_len = slug_field.max_length
-        if slug_len:
-            slug = slug[:slug_len]
-        original_slug = slug
-
         # exclude the current model instance from the queryset used in finding
         # the next valid slug
         queryset = self.get_queryset(model_instance.__class__, slug_field)
@@ -182,18 +172,60 @@ class VersionSlugField(models.CharField):
             if self.attname in params:
                 for param in params:
                     kwargs[param] = getattr(model_instance, param, None)
-        kwargs[self.attname] = slug
+
+        def is_taken(slug):
+            kwargs[self.attname] = slug
+            return queryset.filter(**kwargs).exists()
+
+        return self.get_unique_slug(
+            getattr(model_instance, self._populate_from),
+            is_taken,
+        )
+
+    def create_slugs(self, contents, existing_slugs):
+        """
+        Generate unique slugs for several ``contents`` without querying the database.
+
+        Used when creating objects in bulk,
+        where the slugs can't be generated by ``pre_save``.
+
+        :param contents: Values to populate the slugs from.
+        :param existing_slugs: Slugs already in use (e.g. by the versions of the project).
+        :returns: A list with the slug of each content, in the same order.
+        """
+        taken = set(existing_slugs)
+        slugs = []
+        for content in contents:
+            slug = self.get_unique_slug(content, taken.__contains__)
+            taken.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    def get_unique_slug(self, content, is_taken):
+        """
+        Generate a slug for ``content`` that isn't taken.
+
+        :param is_taken: Callable that returns ``True`` if the given slug is already in use.
+        """
+        slug = self.slugify(content)
+        count = 0
+
+        # strip slug depending on max_length attribute of the slug field
+        # and clean-up
+        slug_len = self.max_length
+        if slug_len:
+            slug = slug[:slug_len]
+        original_slug = slug
 
         # increases the number while searching for the next valid slug
         # depending on the given slug, clean-up
-        while not slug or queryset.filter(**kwargs).exists():
+        while not slug or is_taken(slug):
             slug = original_slug
             end = self.uniquifying_suffix(count)
             end_len = len(end)
             if slug_len and len(slug) + end_len > slug_len:
                 slug = slug[:slug_len - end_len]
             slug = slug + end
-            kwargs[self.attname] = slug
             count += 1
 
         is_slug_valid = self.test_pattern.match(slug)
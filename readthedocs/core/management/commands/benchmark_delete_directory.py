@@ -0,0 +1,76 @@
+"""
+Benchmark deleting a version's directory from the build media storage.
+
+Uploads ``--files`` small files under a temporary path in ``build_media_storage``
+and deletes them twice:
+walking the directory and deleting one file at a time (the generic implementation),
+and using the ``delete_directory`` method of the configured storage.
+
+Invoked via ``./manage.py benchmark_delete_directory --files 50000``.
+Use it against a test bucket (e.g. the S3 emulator from the docker compose environment),
+never against the production bucket.
+"""
+
+import time
+from collections import Counter
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+
+from readthedocs.storage import build_media_storage
+
+
+class Command(BaseCommand):
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=50000)
+        parser.add_argument('--path', default='html/benchmark-delete-directory/latest')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        requests = self._count_requests()
+
+        for name, delete in (
+            ('walk + delete', self._delete_file_by_file),
+            ('delete_directory', build_media_storage.delete_directory),
+        ):
+            self.stdout.write(f'Uploading {options["files"]} files to {path}...')
+            self._upload_files(path, options['files'])
+
+            requests.clear()
+            start = time.monotonic()
+            delete(path)
+            elapsed = time.monotonic() - start
+
+            self.stdout.write(
+                f'{name}: {elapsed:.2f}s, '
+                f'requests: {dict(requests) if requests else "not available"}',
+            )
+
+    @staticmethod
+    def _upload_files(path, count):
+        for i in range(count):
+            build_media_storage.save(
+                build_media_storage.join(path, f'dir{i % 100}/file{i}.html'),
+                ContentFile(b'<p>Benchmark</p>'),
+            )
+
+    @staticmethod
+    def _delete_file_by_file(path):
+        for root, _, filenames in build_media_storage.walk(path):
+            for filename in filenames:
+                build_media_storage.delete(build_media_storage.join(root, filename))
+
+    @staticmethod
+    def _count_requests():
+        """Count the requests made to S3 by operation name (only for S3 storages)."""
+        requests = Counter()
+        connection = getattr(build_media_storage, 'connection', None)
+        if connection is not None:
+            def count(model, **kwargs):
+                requests[model.name] += 1
+
+            connection.meta.client.meta.events.register('before-call.s3', count)
+        return requests
@@ -0,0 +1,71 @@
+"""
+Benchmark resolving the host of proxito requests to a project.
+
+Creates a project with a custom domain inside a transaction that is rolled back,
+and resolves ``--requests`` requests to its subdomain and to its custom domain,
+reporting the time and the number of queries per request:
+without the host cache (it's invalidated before each request, as the previous implementation),
+and with the host cache (``readthedocs.proxito.cache``).
+
+Invoked via ``./manage.py benchmark_host_resolution --requests 1000``.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.crypto import get_random_string
+
+from readthedocs.projects.models import Domain, Project
+from readthedocs.proxito.cache import invalidate_hosts
+from readthedocs.proxito.middleware import map_host_to_project_slug
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                with override_settings(PUBLIC_DOMAIN=settings.PUBLIC_DOMAIN or 'readthedocs.io'):
+                    self._benchmark(options['requests'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _benchmark(self, requests):
+        slug = f'benchmark-host-resolution-{get_random_string(8).lower()}'
+        project = Project.objects.create(name='Benchmark host resolution', slug=slug)
+        domain = Domain.objects.create(project=project, domain=f'{slug}.example.com')
+        public_domain = settings.PUBLIC_DOMAIN.split(':')[0]
+        factory = RequestFactory()
+
+        for host in (f'{slug}.{public_domain}', domain.domain):
+            for cached in (False, True):
+                invalidate_hosts([host])
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.monotonic()
+                    for _ in range(requests):
+                        if not cached:
+                            invalidate_hosts([host])
+                        request = factory.get('/en/latest/', HTTP_HOST=host)
+                        assert map_host_to_project_slug(request) == slug
+                    elapsed = time.monotonic() - start
+
+                name = 'cached' if cached else 'not cached'
+                self.stdout.write(
+                    f'{host} ({name}): '
+                    f'{elapsed / requests * 1000:.3f} ms/request, '
+                    f'{len(queries) / requests:.2f} queries/request',
+                )
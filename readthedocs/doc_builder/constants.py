@@ -30,3 +30,21 @@ DOCKER_TIMEOUT_EXIT_CODE = 42
 DOCKER_OOM_EXIT_CODE = 137
 
 DOCKER_HOSTNAME_MAX_LEN = 64
+
+# Space left for the rest of the request data when sending the output of a build command
+# over the API, requests can't be bigger than ``DATA_UPLOAD_MAX_MEMORY_SIZE``.
+COMMAND_OUTPUT_REQUEST_THRESHOLD = 512 * 1024  # 512Kb
+
+
+def get_max_command_output_length():
+    """Return the maximum length of the output of build commands sent in a single request."""
+    return settings.DATA_UPLOAD_MAX_MEMORY_SIZE - COMMAND_OUTPUT_REQUEST_THRESHOLD
+
+
+# Size of the chunks read from the output of a build command.
+COMMAND_OUTPUT_CHUNK_SIZE = 64 * 1024
+# The progress of a build command is reported each time this number of bytes are read.
+COMMAND_OUTPUT_PROGRESS_INTERVAL = 10 * 1024 * 1024
+# Directory of ``build_commands_storage`` where the full output of the commands of a build
+# is saved when it's truncated, it's removed when the build is archived or deleted.
+COMMAND_FULL_OUTPUT_PATH = 'output/{build_id}'
@@ -105,6 +105,9 @@ class BuildDirector:
             version=self.data.version,
             build=self.data.build,
             environment=self.get_vcs_env_vars(),
+            # The git mirror is only updated from the VCS environment,
+            # the build environment runs the code of the user and doesn't have it.
+            git_mirror_mode='rw',
             # Force the ``container_image`` to use one that has the latest
             # ca-certificate package which is compatible with Lets Encrypt
             container_image=settings.RTD_DOCKER_BUILD_SETTINGS["os"]["ubuntu-20.04"],
@@ -2,8 +2,10 @@
 
 import os
 import re
+import selectors
 import subprocess
 import sys
+import time
 import uuid
 from datetime import datetime
 
@@ -16,13 +18,20 @@ from docker.errors import DockerException
 from docker.errors import NotFound as DockerNotFoundError
 from requests.exceptions import ConnectionError, ReadTimeout
 from requests_toolbelt.multipart.encoder import MultipartEncoder
+from rest_framework.renderers import JSONRenderer
 
 from readthedocs.api.v2.client import api as api_v2
+from readthedocs.builds.constants import EXTERNAL
 from readthedocs.builds.models import BuildCommandResultMixin
 from readthedocs.core.utils import slugify
 from readthedocs.projects.models import Feature
+from readthedocs.storage import build_commands_storage
+from readthedocs.vcs_support.mirrors import GitMirrorCache, GitMirrorError
 
 from .constants import (
+    COMMAND_FULL_OUTPUT_PATH,
+    COMMAND_OUTPUT_CHUNK_SIZE,
+    COMMAND_OUTPUT_PROGRESS_INTERVAL,
     DOCKER_HOSTNAME_MAX_LEN,
     DOCKER_IMAGE,
     DOCKER_LIMITS,
@@ -30,8 +39,10 @@ from .constants import (
     DOCKER_SOCKET,
     DOCKER_TIMEOUT_EXIT_CODE,
     DOCKER_VERSION,
+    get_max_command_output_length,
 )
 from .exceptions import BuildAppError, BuildUserError
+from .output import CommandOutput
 
 log = structlog.get_logger(__name__)
 
@@ -92,6 +103,9 @@ class BuildCommand(BuildCommandResultMixin):
         self.record_as_success = record_as_success
         self.demux = demux
         self.exit_code = None
+        # Number of bytes read from the output of the command so far,
+        # updated every ``COMMAND_OUTPUT_PROGRESS_INTERVAL`` bytes while the command runs.
+        self.output_length = 0
 
         # NOTE: `self.build_env` is not available when instantiating this class
         # from hacky tests. `Project.vcs_repo` allows not passing an
@@ -160,16 +174,89 @@ class BuildCommand(BuildCommandResultMixin):
                 stderr=stderr,
                 env=environment,
             )
-            cmd_stdout, cmd_stderr = proc.communicate()
-            self.output = self.sanitize_output(cmd_stdout)
-            self.error = self.sanitize_output(cmd_stderr)
-            self.exit_code = proc.returncode
+            cmd_stdout = self.get_output_buffer()
+            cmd_stderr = self.get_output_buffer(report_progress=False) if self.demux else None
+            try:
+                self._read_process_output(proc, cmd_stdout, cmd_stderr)
+                self.exit_code = proc.wait()
+                self.output = self.sanitize_output(cmd_stdout)
+                self.error = self.sanitize_output(cmd_stderr)
+            finally:
+                cmd_stdout.close()
+                if cmd_stderr is not None:
+                    cmd_stderr.close()
         except OSError:
             log.exception("Operating system error.")
             self.exit_code = -1
         finally:
             self.end_time = datetime.utcnow()
 
+    @staticmethod
+    def _read_process_output(proc, cmd_stdout, cmd_stderr=None):
+        """Read the output of ``proc`` in chunks until the process closes its pipes."""
+        if cmd_stderr is None:
+            for chunk in iter(lambda: proc.stdout.read1(COMMAND_OUTPUT_CHUNK_SIZE), b''):
+                cmd_stdout.write(chunk)
+            proc.stdout.close()
+            return
+
+        # Read from both pipes as data is available,
+        # otherwise the process could block writing to a full pipe.
+        with selectors.DefaultSelector() as selector:
+            selector.register(proc.stdout, selectors.EVENT_READ, cmd_stdout)
+            selector.register(proc.stderr, selectors.EVENT_READ, cmd_stderr)
+            while selector.get_map():
+                for key, _ in selector.select():
+                    chunk = os.read(key.fileobj.fileno(), COMMAND_OUTPUT_CHUNK_SIZE)
+                    if chunk:
+                        key.data.write(chunk)
+                    else:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+
+    def get_output_buffer(self, report_progress=True):
+        """
+        Return a buffer to read the output of the command into.
+
+        Only the tail of the output that can be sent over the API is kept in memory.
+        If the output is bigger than that,
+        the full output is saved to ``build_commands_storage`` (see ``sanitize_output``).
+
+        :param report_progress: Update ``output_length`` and log the progress
+            of the command while the output is read.
+        """
+        keep_full_output = bool(
+            settings.RTD_SAVE_BUILD_COMMANDS_TO_STORAGE
+            and self.build_env
+            and self.build_env.build
+        )
+        return CommandOutput(
+            max_length=get_max_command_output_length(),
+            keep_full_output=keep_full_output,
+            progress_callback=self._log_output_progress if report_progress else None,
+            progress_interval=COMMAND_OUTPUT_PROGRESS_INTERVAL,
+        )
+
+    def _log_output_progress(self, output_length):
+        self.output_length = output_length
+        log.info(
+            'Build command output progress.',
+            command=self.get_command(),
+            output_length=output_length,
+        )
+
+    def _save_full_output(self, output):
+        """Save the full ``output`` to storage, and return its path or ``None`` if it fails."""
+        path = '{directory}/{uuid}.log'.format(
+            directory=COMMAND_FULL_OUTPUT_PATH.format(build_id=self.build_env.build.get('id')),
+            uuid=uuid.uuid4().hex,
+        )
+        try:
+            return output.save(build_commands_storage, path)
+        except Exception:
+            log.exception('Failed to save the command output to storage.', path=path)
+            return None
+
     def sanitize_output(self, output):
         r"""
         Sanitize ``output`` to be saved into the DB.
@@ -184,10 +271,18 @@ class BuildCommand(BuildCommandResultMixin):
                over the API call request
 
         :param output: stdout/stderr to be sanitized
-        :type output: bytes
+        :type output: bytes or :py:class:`readthedocs.doc_builder.output.CommandOutput`
 
         :returns: sanitized output as string or ``None`` if it fails
         """
+        output_length = None
+        full_output_path = None
+        if isinstance(output, CommandOutput):
+            output_length = output.length
+            if output.truncated and output.keeps_full_output:
+                full_output_path = self._save_full_output(output)
+            output = output.getvalue()
+
         try:
             sanitized = output.decode('utf-8', 'replace')
             # Replace NULL (\x00) character to avoid PostgreSQL db to fail
@@ -197,19 +292,23 @@ class BuildCommand(BuildCommandResultMixin):
             sanitized = ""
 
         # Chunk the output data to be less than ``DATA_UPLOAD_MAX_MEMORY_SIZE``
-        output_length = len(output) if output else 0
-        # Left some extra space for the rest of the request data
-        threshold = 512 * 1024  # 512Kb
-        allowed_length = settings.DATA_UPLOAD_MAX_MEMORY_SIZE - threshold
+        if output_length is None:
+            output_length = len(output) if output else 0
+        allowed_length = get_max_command_output_length()
         if output_length > allowed_length:
             log.info(
                 'Command output is too big.',
                 command=self.get_command(),
+                output_length=output_length,
             )
             truncated_output = sanitized[-allowed_length:]
+            full_output = ''
+            if full_output_path:
+                full_output = f'Full output saved at {full_output_path}.\n'
             sanitized = (
                 '.. (truncated) ...\n'
-                f'Output is too big. Truncated at {allowed_length} bytes.\n\n\n'
+                f'Output is too big. Truncated at {allowed_length} bytes.\n'
+                f'{full_output}\n\n'
                 f'{truncated_output}'
             )
 
@@ -221,8 +320,8 @@ class BuildCommand(BuildCommandResultMixin):
             return ' '.join(self.command)
         return self.command
 
-    def save(self):
-        """Save this command and result via the API."""
+    def get_api_data(self):
+        """Return the data to save this command via the API."""
         # Force record this command as success to avoid Build reporting errors
         # on commands that are just for checking purposes and do not interferes
         # in the Build
@@ -230,7 +329,7 @@ class BuildCommand(BuildCommandResultMixin):
             log.warning('Recording command exit_code as success')
             self.exit_code = 0
 
-        data = {
+        return {
             'build': self.build_env.build.get('id'),
             'command': self.get_command(),
             'output': self.output,
@@ -239,6 +338,10 @@ class BuildCommand(BuildCommandResultMixin):
             'end_time': self.end_time,
         }
 
+    def save(self):
+        """Save this command and result via the API."""
+        data = self.get_api_data()
+
         if self.build_env.project.has_feature(Feature.API_LARGE_DATA):
             # Don't use slumber directly here. Slumber tries to enforce a string,
             # which will break our multipart encoding here.
@@ -259,6 +362,133 @@ class BuildCommand(BuildCommandResultMixin):
             log.debug('Post response via JSON encoded data.', response=resp)
 
 
+class BuildCommandBuffer:
+
+    """
+    Buffer of build commands that are saved via the API in batches.
+
+    Instead of one request per command, the commands are sent to the bulk endpoint
+    when ``RTD_BUILD_COMMANDS_BATCH_SIZE`` commands were added,
+    ``RTD_BUILD_COMMANDS_BATCH_INTERVAL`` seconds passed since the first one was added,
+    or their output is too big to be sent in the same request.
+
+    If a batch can't be sent because the API can't be reached or it fails (5xx),
+    its commands are kept and sent with the next batch.
+    If the API rejects the batch (4xx), its commands are saved one by one,
+    so an invalid command doesn't make the next batches fail.
+    Other errors (e.g. a timeout reading the response) don't retry the batch,
+    since it may have been saved already.
+    When the buffer is closed, the commands that can't be sent in a batch
+    are saved one by one.
+
+    :param project: Project being built, used to decide how to encode the request.
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.commands = []
+        self.first_added = None
+        self.output_length = 0
+
+    def add(self, command):
+        """Add ``command`` to the buffer, sending the batch if it's needed."""
+        data = command.get_api_data()
+        output_length = len(data['output'] or '')
+        if self.commands and self.output_length + output_length > get_max_command_output_length():
+            self.flush()
+
+        if not self.commands:
+            self.first_added = time.monotonic()
+        self.commands.append((command, data))
+        self.output_length += output_length
+        self.flush_if_needed()
+
+    def flush_if_needed(self):
+        if not self.commands:
+            return
+        if (
+            len(self.commands) >= settings.RTD_BUILD_COMMANDS_BATCH_SIZE or
+            time.monotonic() - self.first_added >= settings.RTD_BUILD_COMMANDS_BATCH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        """
+        Send all commands in the buffer to the bulk endpoint.
+
+        :returns: ``False`` if the commands couldn't be sent
+         and they are kept in the buffer to be retried.
+        """
+        if not self.commands:
+            return True
+
+        commands = [data for _, data in self.commands]
+        try:
+            if self.project.has_feature(Feature.API_LARGE_DATA):
+                encoder = MultipartEncoder({
+                    'commands': JSONRenderer().render(commands).decode(),
+                })
+                resource = api_v2.command.bulk
+                resp = resource._store['session'].post(
+                    resource._store['base_url'] + '/',
+                    data=encoder,
+                    headers={
+                        'Content-Type': encoder.content_type,
+                    }
+                )
+                resp.raise_for_status()
+            else:
+                api_v2.command.bulk.post(commands)
+        except Exception as e:
+            # Slumber and requests errors have the response of the API.
+            status_code = getattr(getattr(e, 'response', None), 'status_code', None) or 0
+            if isinstance(e, ConnectionError) or status_code >= 500:
+                log.exception(
+                    'Failed to save build commands, they will be sent with the next batch.',
+                    count=len(commands),
+                )
+                return False
+            if 400 <= status_code < 500:
+                log.exception(
+                    'Build commands rejected, saving them one by one.',
+                    count=len(commands),
+                    status_code=status_code,
+                )
+                self._save_one_by_one()
+                return True
+            log.exception(
+                'Failed to save build commands, they may have been saved already.',
+                count=len(commands),
+            )
+            self._clear()
+            return True
+
+        log.debug('Build commands saved.', count=len(commands))
+        self._clear()
+        return True
+
+    def close(self):
+        """Send the pending commands, one by one if they can't be sent in a batch."""
+        if not self.flush():
+            self._save_one_by_one()
+
+    def _save_one_by_one(self):
+        for command, _ in self.commands:
+            try:
+                command.save()
+            except Exception:
+                log.exception(
+                    'Failed to save build command.',
+                    command=command.get_command(),
+                )
+        self._clear()
+
+    def _clear(self):
+        self.commands = []
+        self.first_added = None
+        self.output_length = 0
+
+
 class DockerBuildCommand(BuildCommand):
 
     """
@@ -307,16 +537,24 @@ class DockerBuildCommand(BuildCommand):
             )
 
             out = client.exec_start(
-                exec_id=exec_cmd["Id"], stream=False, demux=self.demux
+                exec_id=exec_cmd["Id"], stream=True, demux=self.demux
             )
-            cmd_stdout = ""
-            cmd_stderr = ""
-            if self.demux:
-                cmd_stdout, cmd_stderr = out
-            else:
-                cmd_stdout = out
-            self.output = self.sanitize_output(cmd_stdout)
-            self.error = self.sanitize_output(cmd_stderr)
+            cmd_stdout = self.get_output_buffer()
+            cmd_stderr = self.get_output_buffer(report_progress=False) if self.demux else None
+            try:
+                for chunk in out:
+                    if self.demux:
+                        stdout_chunk, stderr_chunk = chunk
+                        cmd_stdout.write(stdout_chunk)
+                        cmd_stderr.write(stderr_chunk)
+                    else:
+                        cmd_stdout.write(chunk)
+                self.output = self.sanitize_output(cmd_stdout)
+                self.error = self.sanitize_output(cmd_stderr)
+            finally:
+                cmd_stdout.close()
+                if cmd_stderr is not None:
+                    cmd_stderr.close()
             cmd_ret = client.exec_inspect(exec_id=exec_cmd['Id'])
             self.exit_code = cmd_ret['ExitCode']
 
@@ -502,6 +740,11 @@ class BuildEnvironment(BaseEnvironment):
     the API. The only case where we want this to be `False` is when
     instantiating this class from `sync_repository_task` because it's a
     background task that does not expose commands to the user.
+    :param git_mirror_mode: how the git mirror of the repository of the project
+     is available in the environment, ``'rw'`` to update it and clone from it,
+     ``'ro'`` to only clone from it, or ``None`` to not use it.
+     It should only be used in environments that only run VCS commands,
+     never in the environment that builds the docs.
     """
 
     def __init__(
@@ -512,6 +755,7 @@ class BuildEnvironment(BaseEnvironment):
             config=None,
             environment=None,
             record=True,
+            git_mirror_mode=None,
             **kwargs,
     ):
         super().__init__(project, environment)
@@ -519,17 +763,36 @@ class BuildEnvironment(BaseEnvironment):
         self.build = build
         self.config = config
         self.record = record
+        self.git_mirror_mode = git_mirror_mode
+        # Commands are saved in batches while the environment is being used as
+        # a context manager, and saved one by one otherwise.
+        self.command_buffer = None
 
     # TODO: remove these methods, we are not using LocalEnvironment anymore. We
     # need to find a way for tests to not require this anymore
     def __enter__(self):
+        self.open_command_buffer()
         return self
 
     def __exit__(self, exc_type, exc_value, tb):
-        return
+        self.close_command_buffer()
 
-    def record_command(self, command):
+    def open_command_buffer(self):
         if self.record:
+            self.command_buffer = BuildCommandBuffer(self.project)
+
+    def close_command_buffer(self):
+        """Save all the commands that weren't saved yet."""
+        if self.command_buffer:
+            self.command_buffer.close()
+            self.command_buffer = None
+
+    def record_command(self, command):
+        if not self.record:
+            return
+        if self.command_buffer:
+            self.command_buffer.add(command)
+        else:
             command.save()
 
     def run(self, *cmd, **kwargs):
@@ -542,6 +805,10 @@ class BuildEnvironment(BaseEnvironment):
         kwargs.update({
             'build_env': self,
         })
+        # Send the previous commands before running a new one
+        # if they have been waiting for too long.
+        if self.command_buffer:
+            self.command_buffer.flush_if_needed()
         return super().run_command_class(*cmd, **kwargs)
 
 
@@ -654,10 +921,12 @@ class DockerBuildEnvironment(BuildEnvironment):
         except:  # noqa
             self.__exit__(*sys.exc_info())
             raise
+        self.open_command_buffer()
         return self
 
     def __exit__(self, exc_type, exc_value, tb):
         """End of environment context."""
+        self.close_command_buffer()
         client = self.get_client()
         try:
             client.kill(self.container_id)
@@ -742,10 +1011,48 @@ class DockerBuildEnvironment(BuildEnvironment):
                 },
             }
 
+        mirror_path = self._get_git_mirror_path()
+        if mirror_path:
+            # Only the mirror of the repository of this project is available.
+            binds[mirror_path] = {
+                'bind': mirror_path,
+                'mode': self.git_mirror_mode,
+            }
+
         binds.update(settings.RTD_DOCKER_ADDITIONAL_BINDS)
 
         return binds
 
+    def _get_git_mirror_path(self):
+        """
+        Return the path to the git mirror of the repository of the project.
+
+        The mirror is created if it's going to be updated in the environment.
+        Mirrors aren't used for external versions,
+        so a pull request can't change the mirror used by the other versions.
+
+        :returns: the path to the mirror, or ``None`` if the environment doesn't use it,
+         mirrors aren't enabled, the repository can't be mirrored,
+         or the mirror couldn't be created.
+        """
+        if not self.git_mirror_mode or self.version.type == EXTERNAL:
+            return None
+        mirrors = GitMirrorCache.from_settings()
+        if not mirrors or not mirrors.can_mirror(self.project):
+            return None
+        if self.git_mirror_mode == 'ro':
+            path = mirrors.get_path(self.project)
+            return path if os.path.exists(path) else None
+        try:
+            return mirrors.create(self.project)
+        except GitMirrorError:
+            log.warning(
+                'Git mirror creation failed.',
+                project_slug=self.project.slug,
+                exc_info=True,
+            )
+            return None
+
     def get_container_host_config(self):
         """
         Create the ``host_config`` settings for the container.
@@ -0,0 +1,86 @@
+"""
+Output of the build commands.
+
+The output of a build command is read in chunks while the command runs,
+instead of reading it all at once when the command exits.
+Only the last part of the output is kept in memory (it's what is sent to the API),
+the full output can be kept in a temporary file to be saved to storage.
+"""
+
+import tempfile
+from collections import deque
+
+from django.core.files import File
+
+
+class CommandOutput:
+
+    """
+    Bounded tail of the output of a command.
+
+    :param max_length: Number of bytes to keep from the end of the output.
+    :param keep_full_output: Also write the full output to a temporary file,
+        it's kept in memory until it's bigger than ``max_length``.
+    :param progress_callback: Called with the number of bytes read so far,
+        each time another ``progress_interval`` bytes are read.
+    :param progress_interval: Number of bytes between calls to ``progress_callback``.
+    """
+
+    def __init__(
+        self,
+        max_length,
+        keep_full_output=False,
+        progress_callback=None,
+        progress_interval=None,
+    ):
+        self.max_length = max_length
+        self.length = 0
+        self._chunks = deque()
+        self._chunks_length = 0
+        self._file = None
+        if keep_full_output:
+            self._file = tempfile.SpooledTemporaryFile(max_size=max_length)
+        self._progress_callback = progress_callback
+        self._progress_interval = progress_interval
+        self._next_progress = progress_interval
+
+    def write(self, chunk):
+        """Add ``chunk`` to the output, discarding the chunks that are out of the tail."""
+        if not chunk:
+            return
+
+        self.length += len(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+
+        self._chunks.append(chunk)
+        self._chunks_length += len(chunk)
+        while self._chunks_length - len(self._chunks[0]) >= self.max_length:
+            self._chunks_length -= len(self._chunks.popleft())
+
+        if self._progress_callback and self.length >= self._next_progress:
+            self._progress_callback(self.length)
+            while self._next_progress <= self.length:
+                self._next_progress += self._progress_interval
+
+    @property
+    def keeps_full_output(self):
+        return self._file is not None
+
+    @property
+    def truncated(self):
+        return self.length > self.max_length
+
+    def getvalue(self):
+        """Return the last ``max_length`` bytes of the output."""
+        return b''.join(self._chunks)[-self.max_length:]
+
+    def save(self, storage, path):
+        """Save the full output to ``storage``."""
+        self._file.seek(0)
+        return storage.save(path, File(self._file))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,59 @@
+"""
+Cache for the responses of the EmbedAPI.
+
+Themes and extensions that show tooltips (e.g. sphinx-hoverxref) request the same sections
+several times on each page view, and each request reads and parses the page again.
+The final response of internal pages is stored in Django's cache,
+keyed by a hash of the API, the version, its latest successful build, and the section requested.
+
+A new build of the version changes the key, so the responses of the previous build
+are not used anymore and they expire after ``RTD_EMBED_API_RESPONSE_CACHE_TIMEOUT`` seconds.
+"""
+
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def get_embed_cache_key(version, build_id, *, api, path, fragment, doctool=None, url=None):
+    """
+    Return the key to cache the response of a section of ``version``.
+
+    :param api: Version of the API (``v2`` or ``v3``),
+     each version returns a different response for the same section.
+    :param build_id: Latest successful build of the version
+     (see ``readthedocs.embed.utils.get_latest_build_id``).
+    :param url: URL used to make the links of the content absolute.
+    :returns: ``None`` if the version doesn't have a successful build.
+    """
+    if not build_id:
+        return None
+
+    params = [
+        api,
+        version.project_id,
+        version.pk,
+        # Privacy level is checked when reading the content from storage.
+        version.privacy_level,
+        build_id,
+        path,
+        fragment,
+        doctool,
+        url,
+    ]
+    digest = hashlib.sha256(json.dumps(params).encode()).hexdigest()
+    return f'embed-response:{digest}'
+
+
+def get_embed_response(cache_key):
+    if not cache_key:
+        return None
+    return cache.get(cache_key)
+
+
+def set_embed_response(cache_key, response):
+    if not cache_key:
+        return
+    cache.set(cache_key, response, timeout=settings.RTD_EMBED_API_RESPONSE_CACHE_TIMEOUT)
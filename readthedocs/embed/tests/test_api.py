@@ -4,12 +4,14 @@ from pathlib import Path
 from unittest import mock
 
 import pytest
+from django.core.cache import cache
 from django.urls import reverse
 from django_dynamic_fixture import get
 from pyquery import PyQuery
 from rest_framework import status
 
-from readthedocs.builds.constants import LATEST
+from readthedocs.builds.constants import BUILD_STATE_FINISHED, LATEST
+from readthedocs.builds.models import Build
 from readthedocs.projects.constants import MKDOCS, PUBLIC
 from readthedocs.projects.models import Project
 
@@ -315,6 +317,53 @@ class BaseTestEmbedAPI:
         assert response.data == expected
 
 
+    @mock.patch('readthedocs.embed.views.build_media_storage')
+    def test_embed_cached_response(self, storage_mock, client):
+        json_file = data_path / 'sphinx/latest/page.json'
+        html_file = data_path / 'sphinx/latest/page.html'
+        self._patch_sphinx_json_file(
+            storage_mock=storage_mock,
+            json_file=json_file,
+            html_file=html_file,
+        )
+        get(
+            Build,
+            project=self.project,
+            version=self.version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+        cache.clear()
+
+        params = {
+            'project': self.project.slug,
+            'version': self.version.slug,
+            'path': 'index.html',
+            'section': 'title-one',
+        }
+        api_endpoint = reverse('embed_api')
+        response = self.get(client, api_endpoint, params)
+        assert response.status_code == status.HTTP_200_OK
+        assert storage_mock.open.call_count == 1
+
+        # The response is cached until the version gets a new build.
+        cached_response = self.get(client, api_endpoint, params)
+        assert cached_response.status_code == status.HTTP_200_OK
+        assert cached_response.data == response.data
+        assert storage_mock.open.call_count == 1
+
+        get(
+            Build,
+            project=self.project,
+            version=self.version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+        response = self.get(client, api_endpoint, params)
+        assert response.status_code == status.HTTP_200_OK
+        assert storage_mock.open.call_count == 2
+
+
 class TestEmbedAPI(BaseTestEmbedAPI):
 
     pass
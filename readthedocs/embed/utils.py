@@ -4,6 +4,8 @@ from urllib.parse import urlparse
 
 from pyquery import PyQuery as PQ  # noqa
 
+from readthedocs.builds.constants import BUILD_STATE_FINISHED
+
 
 def recurse_while_none(element):
     """Recursively find the leaf node with the ``href`` attribute."""
@@ -68,3 +70,13 @@ def clean_references(obj, url, html_raw_response=False):
         return obj.outerHtml()
 
     return obj
+
+
+def get_latest_build_id(version):
+    """Return the id of the latest successful build of ``version``."""
+    return (
+        version.builds.filter(state=BUILD_STATE_FINISHED, success=True)
+        .order_by('-date')
+        .values_list('id', flat=True)
+        .first()
+    )
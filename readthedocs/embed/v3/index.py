@@ -0,0 +1,252 @@
+"""
+Index of the sections of the pages of a version for the EmbedAPI v3.
+
+Getting a section from a page of our storage requires reading the whole page,
+parsing it and searching for the fragment on each request.
+When the project has the ``embed_api_index`` feature,
+the sections of its pages are indexed from the HTML output on the builder,
+before it's uploaded (see ``UpdateDocsTask.store_build_artifacts``),
+and saved in one ZIP archive per version next to the other JSON artifacts of the version
+(``json/<project>/<version>/readthedocs-embed-index.zip``).
+The archive has one member per page (``<page>.json``),
+and its comment is the ID of the build that created it.
+Getting a section only reads the member of its page, without parsing HTML.
+
+The index of a page is a JSON object::
+
+    {
+        "chunks": [
+            "<section id=\"sub-title\">...</section>",
+            "<section id=\"title\"><h1>Title</h1>\\u00000\\u0000</section>",
+            "<div role=\"main\">\\u00001\\u0000</div>",
+        ],
+        "sections": {
+            "": [2, null, "Title"],
+            "title": [1, null, "Title"],
+            "sub-title": [0, null, "Sub-title"],
+        },
+    }
+
+Each fragment (``""`` for the main section of the page) has the chunk of its content,
+the chunk of its content when ``doctool=sphinx`` if it's different
+(see ``readthedocs.embed.v3.parsers.get_section_node``), and its title.
+Sections contain other sections, the content of each section is stored once,
+chunks reference the chunks of the sections they contain (``\\x00<chunk>\\x00``).
+
+Sanitizing the content is deferred to the request:
+links are made absolute relative to the URL requested,
+since the same page is served from several domains (e.g. subdomain and custom domains).
+
+The index is only used if it was created by the latest build of the version.
+"""
+
+import json
+import os
+import re
+import tempfile
+import zipfile
+
+import structlog
+from selectolax.parser import HTMLParser
+
+from readthedocs.embed.v3.parsers import (
+    find_main_node,
+    get_section_node,
+    get_section_title,
+)
+from readthedocs.projects.models import Feature
+from readthedocs.storage import build_media_storage
+
+log = structlog.get_logger(__name__)
+
+EMBED_INDEX_FILENAME = 'readthedocs-embed-index.zip'
+
+# HTML serialized by the parser doesn't contain null characters.
+CHUNK_REFERENCE = '\x00{}\x00'
+CHUNK_REFERENCE_RE = re.compile('\x00([0-9]+)\x00')
+
+
+def get_embed_index_path(version):
+    """Return the path to the index of ``version`` in the storage."""
+    storage_path = version.project.get_storage_path(
+        type_='json',
+        version_slug=version.slug,
+        include_file=False,
+        version_type=version.type,
+    )
+    return build_media_storage.join(storage_path, EMBED_INDEX_FILENAME)
+
+
+class PageIndex:
+
+    """Sections of an HTML page, with the content of each section stored once."""
+
+    def __init__(self, content):
+        self.html = HTMLParser(content)
+        self.chunks = []
+        self.sections = {}
+        # Nodes with an ``id``, and chunk of each node stored (by ``Node.mem_id``).
+        self._indexed_nodes = set()
+        # The nodes are kept, so the ``mem_id`` of the nodes of other trees
+        # (see ``get_section_node``) isn't reused while the page is indexed.
+        self._node_chunks = {}
+
+    def create(self):
+        nodes = self.html.css('[id]')
+        self._indexed_nodes = {node.mem_id for node in nodes}
+
+        main_node = find_main_node(self.html)
+        if main_node:
+            self.sections[''] = [self._add_node(main_node), None, get_section_title(main_node)]
+
+        for node in nodes:
+            fragment = node.attributes.get('id')
+            if not fragment or fragment in self.sections:
+                continue
+            # The content is ``node`` itself if a doctool isn't given.
+            chunk = self._add_node(node)
+            sphinx_node = get_section_node(node, doctool='sphinx')
+            sphinx_chunk = self._add_node(sphinx_node)
+            self.sections[fragment] = [
+                chunk,
+                sphinx_chunk if sphinx_chunk != chunk else None,
+                get_section_title(sphinx_node),
+            ]
+        return {'chunks': self.chunks, 'sections': self.sections}
+
+    def _add_node(self, node):
+        """
+        Store the content of ``node``, referencing the nodes with an ``id`` it contains.
+
+        :returns: the chunk with the content of the node.
+        """
+        if node.mem_id in self._node_chunks:
+            return self._node_chunks[node.mem_id][0]
+
+        html = node.html
+        parts = []
+        position = 0
+        # Nodes are in the same order as in the HTML of their parent.
+        for child in self._get_indexed_descendants(node):
+            child_html = child.html
+            start = html.find(child_html, position)
+            if start == -1:
+                continue
+            parts.append(html[position:start])
+            parts.append(CHUNK_REFERENCE.format(self._add_node(child)))
+            position = start + len(child_html)
+        parts.append(html[position:])
+
+        self.chunks.append(''.join(parts))
+        chunk = len(self.chunks) - 1
+        self._node_chunks[node.mem_id] = (chunk, node)
+        return chunk
+
+    def _get_indexed_descendants(self, node):
+        """Return the outermost nodes with an ``id`` inside ``node``, in document order."""
+        descendants = []
+        stack = list(reversed(list(node.iter())))
+        while stack:
+            child = stack.pop()
+            if child.mem_id in self._indexed_nodes:
+                descendants.append(child)
+            else:
+                stack.extend(reversed(list(child.iter())))
+        return descendants
+
+
+def get_page_index(content):
+    """Return the index of the sections of an HTML page."""
+    return PageIndex(content).create()
+
+
+def create_embed_index(version, build_id, html_path):
+    """
+    Create the index of the sections of all the HTML pages of ``version``.
+
+    :param build_id: Build that created the pages.
+    :param html_path: Local directory with the HTML output of the build.
+    :returns: the number of pages indexed.
+    """
+    pages = 0
+    with tempfile.TemporaryFile() as archive_file:
+        with zipfile.ZipFile(archive_file, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.comment = str(build_id).encode()
+            for root, __, filenames in os.walk(html_path):
+                for filename in filenames:
+                    if not filename.endswith('.html'):
+                        continue
+                    full_path = os.path.join(root, filename)
+                    relpath = os.path.relpath(full_path, html_path)
+                    try:
+                        with open(full_path, 'rb') as fd:  # pylint: disable=invalid-name
+                            page_index = get_page_index(fd.read())
+                    except Exception:
+                        log.warning('Unable to index file.', file_path=full_path)
+                        continue
+                    archive.writestr(f'{relpath}.json', json.dumps(page_index))
+                    pages += 1
+
+        archive_file.seek(0)
+        index_path = get_embed_index_path(version)
+        # Storages don't overwrite files, the index of the previous build is removed first.
+        build_media_storage.delete(index_path)
+        build_media_storage.save(index_path, archive_file)
+
+    log.info(
+        'Embed index created.',
+        project_slug=version.project.slug,
+        version_slug=version.slug,
+        pages=pages,
+    )
+    return pages
+
+
+def _read_page_index(version, build_id, filename):
+    """
+    Return the index of the page ``filename`` from the archive of ``version``.
+
+    :returns: ``None`` if the archive doesn't exist, it's from another build,
+     or it doesn't have the page.
+    """
+    index_path = get_embed_index_path(version)
+    try:
+        with build_media_storage.open(index_path) as fd:  # pylint: disable=invalid-name
+            with zipfile.ZipFile(fd) as archive:
+                if archive.comment != str(build_id).encode():
+                    return None
+                return json.loads(archive.read(f'{filename.lstrip("/")}.json'))
+    except Exception:
+        log.debug('Unable to read embed index.', index_path=index_path, filename=filename)
+    return None
+
+
+def _get_chunk_content(chunks, chunk):
+    return CHUNK_REFERENCE_RE.sub(
+        lambda match: _get_chunk_content(chunks, int(match.group(1))),
+        chunks[chunk],
+    )
+
+
+def get_section_from_index(version, build_id, filename, fragment, doctool):
+    """
+    Return the content of a section from the index of the latest build of ``version``.
+
+    :param build_id: Latest successful build of the version
+     (see ``readthedocs.embed.utils.get_latest_build_id``).
+    :returns: the HTML content of the section, ``None`` if the section doesn't exist,
+     or ``False`` if there isn't an index of the page for the latest build of the version.
+    """
+    if not build_id or not version.project.has_feature(Feature.EMBED_API_INDEX):
+        return False
+    page_index = _read_page_index(version, build_id, filename)
+    if page_index is None:
+        return False
+
+    section = page_index['sections'].get(fragment or '')
+    if not section:
+        return None
+    content_chunk, sphinx_chunk, _ = section
+    if doctool == 'sphinx' and sphinx_chunk is not None:
+        return _get_chunk_content(page_index['chunks'], sphinx_chunk)
+    return _get_chunk_content(page_index['chunks'], content_chunk)
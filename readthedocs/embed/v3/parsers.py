@@ -0,0 +1,162 @@
+"""Find the sections of a page used by the EmbedAPI v3."""
+
+from html import escape
+
+import structlog
+from selectolax.parser import HTMLParser
+
+log = structlog.get_logger(__name__)
+
+HEADINGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+
+def find_main_node(html):
+    main_node = html.css_first('[role=main]')
+    if main_node:
+        log.debug('Main node found. selector=[role=main]')
+        return main_node
+
+    main_node = html.css_first('main')
+    if main_node:
+        log.debug('Main node found. selector=main')
+        return main_node
+
+    first_header = html.body.css_first('h1')
+    if first_header:
+        log.debug('Main node found. selector=h1')
+        return first_header.parent
+
+
+def get_section_node(node, doctool):
+    """
+    Return the node with the content of the section of ``node``.
+
+    ``node`` is the node with the ``id`` of the fragment requested,
+    some tools put this ``id`` in an element that doesn't contain the whole section.
+    The tree of ``node`` isn't modified, the same tree can be used to get other sections.
+    """
+    if doctool == 'sphinx':
+        # Handle manual reference special cases
+        # See https://github.com/readthedocs/sphinx-hoverxref/issues/199
+        if node.tag == "span" and not node.text():
+            if any(
+                [
+                    # docutils <0.18
+                    all(
+                        [
+                            node.parent.tag == "div",
+                            "section" in node.parent.attributes.get("class", []),
+                        ]
+                    ),
+                    # docutils >=0.18
+                    all(
+                        [
+                            node.parent.tag == "section",
+                            node.parent.attributes.get("id", None),
+                        ]
+                    ),
+                ]
+            ):
+                # Sphinx adds an empty ``<span id="my-reference"></span>``
+                # HTML tag when using manual references (``..
+                # _my-reference:``). Then, when users refer to it via
+                # ``:ref:`my-referece``` the API will return the empty
+                # span. If the parent node is a section, we have to return
+                # the parent node that will have the content expected.
+
+                # Structure:
+                # <section id="ref-section">
+                # <span id="ref-manual"></span>
+                # <h2>Ref Section<a class="headerlink" href="#ref-section">¶</a></h2>
+                # <p>This is a reference to
+                # <a class="reference internal" href="#ref-manual"><span>Ref Section</span></a>.
+                # </p>
+                # </section>
+                node = node.parent
+
+        # Handle ``dt`` special cases
+        if node.tag == 'dt':
+            if any([
+                    'glossary' in node.parent.attributes.get('class'),
+                    'citation' in node.parent.attributes.get('class'),
+            ]):
+                # Sphinx HTML structure for term glossary puts the ``id`` in the
+                # ``dt`` element with the title of the term. In this case, we
+                # return the parent node which contains the definition list
+                # and remove all ``dt/dd`` that are not the requested one
+
+                # Structure:
+                # <dl class="glossary docutils">
+                # <dt id="term-definition">definition</dt>
+                # <dd>Text definition for the term</dd>
+                # ...
+                # </dl>
+
+                if 'glossary' in node.parent.attributes.get('class'):
+                    next_node = node.next
+
+                elif 'citation' in node.parent.attributes.get('class'):
+                    next_node = node.next.next
+
+                # Return a copy of the parent node with only the ``dt`` and ``dd``
+                # we are looking for, and the whitespace around them.
+                # The copy is created from the HTML of these nodes only,
+                # parsing the whole parent node again for each term of big glossaries is slow.
+                node = _copy_parent_node(node, next_node)
+
+            else:
+                # Sphinx HTML structure for definition list puts the ``id``
+                # the ``dt`` element, instead of the ``dl``. This makes
+                # the backend to return just the title of the definition. If we
+                # detect this case, we return the parent with the whole ``dl`` tag
+
+                # Structure:
+                # <dl class="confval">
+                # <dt id="confval-config">
+                # <code class="descname">config</code>
+                # <a class="headerlink" href="#confval-config">¶</a></dt>
+                # <dd><p>Text with a description</p></dd>
+                # </dl>
+                node = node.parent
+
+    return node
+
+
+def get_section_title(node):
+    """Return the text of the heading (or glossary term) of the section of ``node``, if any."""
+    # ``traverse`` starts with ``node`` itself.
+    heading = next(
+        (child for child in node.traverse() if child.tag in HEADINGS or child.tag == 'dt'),
+        None,
+    )
+    if heading is None:
+        return None
+    # Remove the permalink (``¶``) added to headings.
+    return heading.text(deep=True).strip().rstrip('¶#').strip() or None
+
+
+def _copy_parent_node(first, last):
+    """
+    Return a copy of the parent of ``first`` with only the siblings from ``first`` to ``last``.
+
+    The text around them (e.g. whitespace) is kept.
+    """
+    parent = first.parent
+    nodes = []
+    if first.prev is not None and first.prev.tag == '-text':
+        nodes.append(first.prev)
+    node = first
+    while node is not None:
+        nodes.append(node)
+        if node.mem_id == last.mem_id:
+            break
+        node = node.next
+    if last.next is not None and last.next.tag == '-text':
+        nodes.append(last.next)
+
+    attributes = ''.join(
+        f' {name}="{escape(value or "")}"'
+        for name, value in parent.attributes.items()
+    )
+    content = ''.join(node.html for node in nodes)
+    return HTMLParser(f'<{parent.tag}{attributes}>{content}</{parent.tag}>').css_first(parent.tag)
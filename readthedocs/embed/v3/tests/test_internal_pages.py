@@ -9,7 +9,17 @@ from django.core.cache import cache
 from django.urls import reverse
 from packaging.version import Version
 
-from readthedocs.projects.models import Project
+from readthedocs.builds.constants import BUILD_STATE_FINISHED
+from readthedocs.builds.models import Build
+from readthedocs.embed.utils import get_latest_build_id
+from readthedocs.embed.v3.index import (
+    create_embed_index,
+    get_embed_index_path,
+    get_page_index,
+    get_section_from_index,
+)
+from readthedocs.projects.models import Feature, Project
+from readthedocs.storage import build_media_storage
 
 from .utils import srcdir
 
@@ -79,3 +89,224 @@ class TestEmbedAPIv3InternalPages:
             'content': content,
             'external': False,
         }
+
+    @mock.patch('readthedocs.embed.v3.index.build_media_storage')
+    @mock.patch('readthedocs.embed.v3.views.build_media_storage')
+    def test_cached_response(self, build_media_storage, index_storage, client):
+        # There isn't an embed index.
+        index_storage.open.side_effect = FileNotFoundError
+        content = (
+            '<html><body><div role="main">'
+            '<section id="title"><h1>Title</h1><p>Content</p></section>'
+            '</div></body></html>'
+        )
+        self._patch_storage_open(build_media_storage, content)
+        version = self.project.versions.get(slug='latest')
+        fixture.get(
+            Build,
+            project=self.project,
+            version=version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+
+        url = 'https://project.readthedocs.io/en/latest/#title'
+        response = client.get(self.api_url, {'url': url})
+        assert response.status_code == 200
+        assert build_media_storage.open.call_count == 1
+
+        # The response is cached until the version gets a new build.
+        other_url = 'https://project.readthedocs.io/en/latest/?foo=bar#title'
+        cached_response = client.get(self.api_url, {'url': other_url})
+        assert cached_response.status_code == 200
+        assert cached_response.json() == {**response.json(), 'url': other_url}
+        assert build_media_storage.open.call_count == 1
+
+        # Other doctools aren't cached with the same key.
+        with mock.patch(
+            'readthedocs.embed.v3.views.get_latest_build_id',
+            wraps=get_latest_build_id,
+        ) as latest_build_id:
+            response = client.get(self.api_url, {'url': url, 'doctool': 'sphinx'})
+        assert response.status_code == 200
+        assert build_media_storage.open.call_count == 2
+        # The latest build is queried once for the cache and the index.
+        latest_build_id.assert_called_once()
+
+        fixture.get(
+            Build,
+            project=self.project,
+            version=version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+        response = client.get(self.api_url, {'url': url})
+        assert response.status_code == 200
+        assert build_media_storage.open.call_count == 3
+
+    @mock.patch('readthedocs.embed.views.do_embed')
+    @mock.patch('readthedocs.embed.v3.index.build_media_storage')
+    @mock.patch('readthedocs.embed.v3.views.build_media_storage')
+    def test_cached_response_per_api(self, build_media_storage, index_storage, do_embed, client):
+        index_storage.open.side_effect = FileNotFoundError
+        content = (
+            '<html><body><div role="main">'
+            '<section id="title"><h1>Title</h1><p>Content</p></section>'
+            '</div></body></html>'
+        )
+        self._patch_storage_open(build_media_storage, content)
+        version = self.project.versions.get(slug='latest')
+        fixture.get(
+            Build,
+            project=self.project,
+            version=version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+        url = 'https://project.readthedocs.io/en/latest/'
+        v2_response = {
+            'content': ['<p>Content</p>'],
+            'headers': [{'Title': 'title'}],
+            'url': url,
+            'meta': {},
+        }
+        do_embed.return_value = v2_response
+
+        # The same page is requested from both APIs, with the same parameters.
+        response = client.get(reverse('embed_api'), {'url': url})
+        assert response.status_code == 200
+        assert response.json() == v2_response
+
+        response = client.get(self.api_url, {'url': url})
+        assert response.status_code == 200
+        assert 'headers' not in response.json()
+        assert response.json()['external'] is False
+        assert build_media_storage.open.call_count == 1
+
+    @pytest.mark.sphinx('html', srcdir=srcdir, freshenv=True)
+    def test_sections_from_embed_index(self, app, client):
+        app.build()
+        version = self.project.versions.get(slug='latest')
+        storage_path = self.project.get_storage_path(
+            'html',
+            version_slug=version.slug,
+            include_file=False,
+        )
+        for filename in ('index.html', 'glossary.html'):
+            with open(app.outdir / filename, 'rb') as fd:
+                build_media_storage.save(
+                    build_media_storage.join(storage_path, filename),
+                    fd,
+                )
+
+        urls = [
+            ('https://project.readthedocs.io/en/latest/', None),
+            ('https://project.readthedocs.io/en/latest/#sub-title', None),
+            ('https://project.readthedocs.io/en/latest/#manual-reference', 'sphinx'),
+            ('https://project.readthedocs.io/en/latest/#manual-reference', None),
+            ('https://project.readthedocs.io/en/latest/glossary.html#term-Read-the-Docs', 'sphinx'),
+            ('https://project.readthedocs.io/en/latest/#not-found', 'sphinx'),
+        ]
+        # Without an index, the sections are parsed from the pages.
+        expected = []
+        for url, doctool in urls:
+            params = {'url': url, 'doctool': doctool} if doctool else {'url': url}
+            response = client.get(self.api_url, params)
+            expected.append((response.status_code, response.json()))
+        assert expected[0][0] == 200
+        assert expected[-1][0] == 404
+
+        build = fixture.get(
+            Build,
+            project=self.project,
+            version=version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+        assert create_embed_index(version, build.pk, app.outdir) > 0
+        assert build_media_storage.exists(get_embed_index_path(version))
+        # The index is only used if the project has the feature.
+        assert get_section_from_index(version, build.pk, 'index.html', 'sub-title', None) is False
+        fixture.get(
+            Feature,
+            feature_id=Feature.EMBED_API_INDEX,
+            projects=[self.project],
+        )
+
+        # With an index, the pages aren't read.
+        with mock.patch('readthedocs.embed.v3.views.build_media_storage') as storage:
+            for (url, doctool), result in zip(urls, expected):
+                cache.clear()
+                params = {'url': url, 'doctool': doctool} if doctool else {'url': url}
+                response = client.get(self.api_url, params)
+                assert (response.status_code, response.json()) == result
+            storage.open.assert_not_called()
+
+        # The index of a previous build isn't used.
+        new_build = fixture.get(
+            Build,
+            project=self.project,
+            version=version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+        assert get_section_from_index(version, new_build.pk, 'index.html', 'sub-title', None) is False
+
+        build_media_storage.delete_directory(storage_path)
+        build_media_storage.delete(get_embed_index_path(version))
+
+    def test_page_index(self):
+        content = (
+            '<html><body><div role="main">'
+            '<section id="title"><h1>Title</h1>'
+            '<section id="sub-title"><span id="manual-reference"></span><h2>Sub-title</h2></section>'
+            '<dl class="glossary">\n<dt id="term-a">A</dt><dd>Term A</dd>\n'
+            '<dt id="term-b">B</dt><dd>Term B</dd>\n</dl>'
+            '</section>'
+            '</div></body></html>'
+        )
+        page_index = get_page_index(content)
+        fixture.get(
+            Feature,
+            feature_id=Feature.EMBED_API_INDEX,
+            projects=[self.project],
+        )
+
+        # Each section is stored once.
+        sub_title = '<section id="sub-title"><span id="manual-reference"></span><h2>Sub-title</h2></section>'
+        assert sum(chunk.count('<h2>Sub-title') for chunk in page_index['chunks']) == 1
+        assert set(page_index['sections']) == {
+            '', 'title', 'sub-title', 'manual-reference', 'term-a', 'term-b',
+        }
+        assert page_index['sections']['title'][2] == 'Title'
+        assert page_index['sections']['manual-reference'][2] == 'Sub-title'
+        assert page_index['sections']['term-b'][2] == 'B'
+
+        version = self.project.versions.get(slug='latest')
+        build = fixture.get(
+            Build,
+            project=self.project,
+            version=version,
+            state=BUILD_STATE_FINISHED,
+            success=True,
+        )
+        with mock.patch('readthedocs.embed.v3.index.build_media_storage') as storage:
+            storage.open.side_effect = FileNotFoundError
+            # There isn't an index of the page.
+            assert get_section_from_index(version, build.pk, 'index.html', 'title', None) is False
+
+            with mock.patch('readthedocs.embed.v3.index._read_page_index', return_value=page_index):
+                assert get_section_from_index(version, build.pk, 'index.html', 'sub-title', None) == sub_title
+                assert get_section_from_index(version, build.pk, 'index.html', 'manual-reference', 'sphinx') == sub_title
+                assert get_section_from_index(
+                    version, build.pk, 'index.html', 'manual-reference', None,
+                ) == '<span id="manual-reference"></span>'
+                assert get_section_from_index(version, build.pk, 'index.html', 'term-b', 'sphinx') == (
+                    '<dl class="glossary">\n<dt id="term-b">B</dt><dd>Term B</dd>\n</dl>'
+                )
+                assert get_section_from_index(version, build.pk, 'index.html', 'not-found', None) is None
+                assert get_section_from_index(version, build.pk, '/index.html', '', None) == (
+                    f'<div role="main"><section id="title"><h1>Title</h1>{sub_title}'
+                    '<dl class="glossary">\n<dt id="term-a">A</dt><dd>Term A</dd>\n'
+                    '<dt id="term-b">B</dt><dd>Term B</dd>\n</dl></section></div>'
+                )
@@ -1,5 +1,6 @@
 """Views for the EmbedAPI v3 app."""
 
+import hashlib
 import re
 from urllib.parse import urlparse
 
@@ -17,7 +18,14 @@ from selectolax.parser import HTMLParser
 
 from readthedocs.api.mixins import CDNCacheTagsMixin, EmbedAPIMixin
 from readthedocs.core.utils.extend import SettingsOverrideObject
-from readthedocs.embed.utils import clean_references
+from readthedocs.embed.cache import (
+    get_embed_cache_key,
+    get_embed_response,
+    set_embed_response,
+)
+from readthedocs.embed.v3.index import get_section_from_index
+from readthedocs.embed.v3.parsers import find_main_node, get_section_node
+from readthedocs.embed.utils import clean_references, get_latest_build_id
 from readthedocs.projects.constants import PUBLIC
 from readthedocs.storage import build_media_storage
 
@@ -57,8 +65,8 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
         # Sanitize the URL before requesting it
         url = urlparse(url)._replace(fragment='', query='').geturl()
 
-        # TODO: sanitize the cache key just in case, maybe by hashing it
-        cache_key = f'embed-api-{url}'
+        # Hash the URL, cache keys have a limited length and set of characters
+        cache_key = f'embed-api-{hashlib.sha256(url.encode()).hexdigest()}'
         cached_response = cache.get(cache_key)
         if cached_response:
             log.debug('Cached response.', url=url)
@@ -76,15 +84,17 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
             )
             return response.content
 
-    def _get_page_content_from_storage(self, project, version_slug, filename):
-        version = get_object_or_404(
+    def _get_public_version(self, project, version_slug):
+        return get_object_or_404(
             project.versions,
             slug=version_slug,
             # Only allow PUBLIC versions when getting the content from our
             # storage for privacy/security reasons
             privacy_level=PUBLIC,
         )
-        storage_path = project.get_storage_path(
+
+    def _get_page_content_from_storage(self, version, filename):
+        storage_path = version.project.get_storage_path(
             'html',
             version_slug=version.slug,
             include_file=False,
@@ -102,32 +112,25 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
 
         return None
 
-    def _get_content_by_fragment(self, url, fragment, doctool, doctoolversion):
+    def _get_content_by_fragment(self, url, fragment, doctool, doctoolversion, build_id=None):
         if self.external:
             page_content = self._download_page_content(url)
         else:
             project = self.unresolved_url.project
-            version_slug = self.unresolved_url.version_slug
+            version = self._get_public_version(project, self.unresolved_url.version_slug)
             filename = self.unresolved_url.filename
-            page_content = self._get_page_content_from_storage(project, version_slug, filename)
+
+            # Get the section from the index created at build time,
+            # parse the page if the version doesn't have an index.
+            content = get_section_from_index(version, build_id, filename, fragment, doctool)
+            if content is not False:
+                return content
+            page_content = self._get_page_content_from_storage(version, filename)
 
         return self._parse_based_on_doctool(page_content, fragment, doctool, doctoolversion)
 
     def _find_main_node(self, html):
-        main_node = html.css_first('[role=main]')
-        if main_node:
-            log.debug('Main node found. selector=[role=main]')
-            return main_node
-
-        main_node = html.css_first('main')
-        if main_node:
-            log.debug('Main node found. selector=main')
-            return main_node
-
-        first_header = html.body.css_first('h1')
-        if first_header:
-            log.debug('Main node found. selector=h1')
-            return first_header.parent
+        return find_main_node(html)
 
     def _parse_based_on_doctool(self, page_content, fragment, doctool, doctoolversion):
         # pylint: disable=unused-argument
@@ -142,6 +145,8 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
             # https://www.w3.org/TR/CSS21/syndata.html#value-def-identifier
             selector = f'[id="{fragment}"]'
             node = HTMLParser(page_content).css_first(selector)
+            if node:
+                node = get_section_node(node, doctool)
         else:
             html = HTMLParser(page_content)
             node = self._find_main_node(html)
@@ -149,99 +154,6 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
         if not node:
             return
 
-        if doctool == 'sphinx':
-            # Handle manual reference special cases
-            # See https://github.com/readthedocs/sphinx-hoverxref/issues/199
-            if node.tag == "span" and not node.text():
-                if any(
-                    [
-                        # docutils <0.18
-                        all(
-                            [
-                                node.parent.tag == "div",
-                                "section" in node.parent.attributes.get("class", []),
-                            ]
-                        ),
-                        # docutils >=0.18
-                        all(
-                            [
-                                node.parent.tag == "section",
-                                node.parent.attributes.get("id", None),
-                            ]
-                        ),
-                    ]
-                ):
-                    # Sphinx adds an empty ``<span id="my-reference"></span>``
-                    # HTML tag when using manual references (``..
-                    # _my-reference:``). Then, when users refer to it via
-                    # ``:ref:`my-referece``` the API will return the empty
-                    # span. If the parent node is a section, we have to return
-                    # the parent node that will have the content expected.
-
-                    # Structure:
-                    # <section id="ref-section">
-                    # <span id="ref-manual"></span>
-                    # <h2>Ref Section<a class="headerlink" href="#ref-section">¶</a></h2>
-                    # <p>This is a reference to
-                    # <a class="reference internal" href="#ref-manual"><span>Ref Section</span></a>.
-                    # </p>
-                    # </section>
-                    node = node.parent
-
-            # Handle ``dt`` special cases
-            if node.tag == 'dt':
-                if any([
-                        'glossary' in node.parent.attributes.get('class'),
-                        'citation' in node.parent.attributes.get('class'),
-                ]):
-                    # Sphinx HTML structure for term glossary puts the ``id`` in the
-                    # ``dt`` element with the title of the term. In this case, we
-                    # return the parent node which contains the definition list
-                    # and remove all ``dt/dd`` that are not the requested one
-
-                    # Structure:
-                    # <dl class="glossary docutils">
-                    # <dt id="term-definition">definition</dt>
-                    # <dd>Text definition for the term</dd>
-                    # ...
-                    # </dl>
-
-                    parent_node = node.parent
-                    if 'glossary' in node.parent.attributes.get('class'):
-                        next_node = node.next
-
-                    elif 'citation' in node.parent.attributes.get('class'):
-                        next_node = node.next.next
-
-                    # Iterate over all the siblings (``.iter()``) of the parent
-                    # node and remove ``dt`` and ``dd`` that are not the ones
-                    # we are looking for. Then return the parent node as
-                    # result.
-                    #
-                    # Note that ``.iter()`` returns a generator and we modify
-                    # the HTML in-place, so we have to convert it to a list
-                    # before removing elements. Otherwise we break the
-                    # iteration before completing it
-                    for n in list(parent_node.iter()):  # pylint: disable=invalid-name
-                        if n not in (node, next_node):
-                            n.remove()
-                    node = parent_node
-
-                else:
-                    # Sphinx HTML structure for definition list puts the ``id``
-                    # the ``dt`` element, instead of the ``dl``. This makes
-                    # the backend to return just the title of the definition. If we
-                    # detect this case, we return the parent with the whole ``dl`` tag
-
-                    # Structure:
-                    # <dl class="confval">
-                    # <dt id="confval-config">
-                    # <code class="descname">config</code>
-                    # <a class="headerlink" href="#confval-config">¶</a></dt>
-                    # <dd><p>Text with a description</p></dd>
-                    # </dl>
-                    node = node.parent
-
         return node.html
 
     def get(self, request):  # noqa
@@ -310,13 +222,35 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
         # whitespaces (spaces, tabs, etc.).
         fragment = parsed_url.fragment
 
+        # Sanitize the URL before requesting it
+        sanitized_url = urlparse(url)._replace(fragment='', query='').geturl()
+
+        cache_key = None
+        response = None
+        build_id = None
         try:
-            content_requested = self._get_content_by_fragment(
-                url,
-                fragment,
-                doctool,
-                doctoolversion,
-            )
+            if not self.external:
+                version = self._get_version()
+                # The latest build is used by the cache and the index of the sections.
+                build_id = get_latest_build_id(version)
+                cache_key = get_embed_cache_key(
+                    version,
+                    build_id,
+                    api='v3',
+                    path=self.unresolved_url.filename,
+                    fragment=fragment,
+                    doctool=doctool,
+                    url=sanitized_url,
+                )
+                response = get_embed_response(cache_key)
+            if not response:
+                content_requested = self._get_content_by_fragment(
+                    url,
+                    fragment,
+                    doctool,
+                    doctoolversion,
+                    build_id=build_id,
+                )
         except requests.exceptions.TooManyRedirects:
             log.exception('Too many redirects.', url=url)
             return Response(
@@ -344,33 +278,37 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if not content_requested:
-            log.warning('Identifier not found.', url=url, fragment=fragment)
-            return Response(
-                {
-                    'error': (
-                        "Can't find content for section: "
-                        f"url={url} fragment={fragment}"
-                    )
-                },
-                status=status.HTTP_404_NOT_FOUND
+        if not response:
+            if not content_requested:
+                log.warning('Identifier not found.', url=url, fragment=fragment)
+                return Response(
+                    {
+                        'error': (
+                            "Can't find content for section: "
+                            f"url={url} fragment={fragment}"
+                        )
+                    },
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            # Make links from the content to be absolute
+            content = clean_references(
+                content_requested,
+                sanitized_url,
+                html_raw_response=True,
             )
 
-        # Sanitize the URL before requesting it
-        sanitized_url = urlparse(url)._replace(fragment='', query='').geturl()
-        # Make links from the content to be absolute
-        content = clean_references(
-            content_requested,
-            sanitized_url,
-            html_raw_response=True,
-        )
+            response = {
+                "url": url,
+                "fragment": fragment if fragment else None,
+                "content": content,
+                "external": self.external,
+            }
+            set_embed_response(cache_key, response)
+        else:
+            # The cached response can be from a URL with another query string.
+            response["url"] = url
 
-        response = {
-            "url": url,
-            "fragment": fragment if fragment else None,
-            "content": content,
-            "external": self.external,
-        }
         log.info(
             "EmbedAPI successful response.",
             project_slug=self.unresolved_url.project.slug
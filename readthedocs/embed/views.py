@@ -17,7 +17,16 @@ from readthedocs.api.v2.permissions import IsAuthorizedToViewVersion
 from readthedocs.builds.constants import EXTERNAL
 from readthedocs.core.resolver import resolve
 from readthedocs.core.utils.extend import SettingsOverrideObject
-from readthedocs.embed.utils import clean_references, recurse_while_none
+from readthedocs.embed.cache import (
+    get_embed_cache_key,
+    get_embed_response,
+    set_embed_response,
+)
+from readthedocs.embed.utils import (
+    clean_references,
+    get_latest_build_id,
+    recurse_while_none,
+)
 from readthedocs.storage import build_media_storage
 
 log = structlog.get_logger(__name__)
@@ -98,14 +107,26 @@ class EmbedAPIBase(EmbedAPIMixin, CDNCacheTagsMixin, APIView):
         if path:
             doc = re.sub(r'(.+)\.html$', r'\1', path.strip('/'))
 
-        response = do_embed(
-            project=project,
-            version=version,
-            doc=doc,
-            section=section,
-            path=path,
+        cache_key = get_embed_cache_key(
+            version,
+            get_latest_build_id(version),
+            api='v2',
+            path=path or doc,
+            fragment=section,
             url=url,
         )
+        response = get_embed_response(cache_key)
+        if not response:
+            response = do_embed(
+                project=project,
+                version=version,
+                doc=doc,
+                section=section,
+                path=path,
+                url=url,
+            )
+            if response:
+                set_embed_response(cache_key, response)
 
         if not response:
             return Response(
@@ -8,6 +8,9 @@ class ProjectsConfig(AppConfig):
     name = 'readthedocs.projects'
 
     def ready(self):
+        import readthedocs.api.v2.signals  # noqa
+        import readthedocs.projects.signals  # noqa
         import readthedocs.projects.tasks.builds
         import readthedocs.projects.tasks.search
         import readthedocs.projects.tasks.utils
+        import readthedocs.proxito.signals  # noqa
@@ -28,7 +28,6 @@ from readthedocs.projects.models import (
     ProjectRelationship,
     WebHook,
 )
-from readthedocs.projects.templatetags.projects_tags import sort_version_aware
 from readthedocs.redirects.models import Redirect
 
 
@@ -365,7 +364,7 @@ class ProjectAdvancedForm(ProjectTriggerBuildMixin, ProjectForm):
         """
         version_qs = self.instance.all_active_versions()
         if version_qs.exists():
-            version_qs = sort_version_aware(version_qs)
+            version_qs = version_qs.order_by_version(self.instance.repo_type)
             all_versions = [(version.slug, version.verbose_name) for version in version_qs]
             return all_versions
         return None
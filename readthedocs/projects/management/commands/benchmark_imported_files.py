@@ -0,0 +1,131 @@
+"""
+Benchmark creating the imported files of a version.
+
+Creates a synthetic version with ``--sections`` directories of ``--pages`` HTML pages
+in a temporary build media storage, and a project inside a transaction that is rolled back.
+Reports the time and the number of queries spent creating its ``HTMLFile`` objects:
+one ``INSERT`` and one ``fnmatch`` loop per page (the previous implementation),
+and ``_create_imported_files``, which compiles the patterns once and inserts in batches.
+
+Invoked via ``./manage.py benchmark_imported_files --sections 20 --pages 1000``.
+"""
+
+import os
+import tempfile
+import time
+from fnmatch import fnmatch
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils.crypto import get_random_string
+
+from readthedocs.builds.storage import BuildMediaFileSystemStorage
+from readthedocs.projects.models import HTMLFile, Project
+from readthedocs.projects.tasks import search
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=20)
+        parser.add_argument('--pages', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        sections = options['sections']
+        search_ranking = {f'section{section}/*': section % 10 for section in range(sections)}
+        search_ignore = [f'section{section}/page1*.html' for section in range(sections)]
+
+        with tempfile.TemporaryDirectory() as location:
+            storage = BuildMediaFileSystemStorage(location=location)
+            for name, function in (
+                ('per file', self._create_imported_files_per_file),
+                ('_create_imported_files', search._create_imported_files),
+            ):
+                try:
+                    with transaction.atomic():
+                        project = Project.objects.create(
+                            name='Benchmark imported files',
+                            slug=f'benchmark-imported-files-{get_random_string(8).lower()}',
+                        )
+                        version = project.versions.first()
+                        self._create_pages(storage, version, sections, options['pages'])
+
+                        with mock.patch.object(search, 'build_media_storage', storage):
+                            with CaptureQueriesContext(connection) as queries:
+                                start = time.monotonic()
+                                function(
+                                    version=version,
+                                    commit='benchmark',
+                                    build=1,
+                                    search_ranking=search_ranking,
+                                    search_ignore=search_ignore,
+                                )
+                                elapsed = time.monotonic() - start
+
+                        count = HTMLFile.objects.filter(version=version).count()
+                        self.stdout.write(
+                            f'{name}: {elapsed * 1000:.1f} ms, '
+                            f'{len(queries)} queries, {count} files created',
+                        )
+                        raise Rollback
+                except Rollback:
+                    pass
+
+    @staticmethod
+    def _create_pages(storage, version, sections, pages):
+        storage_path = version.project.get_storage_path(
+            type_='html',
+            version_slug=version.slug,
+            include_file=False,
+        )
+        for section in range(sections):
+            path = os.path.join(storage.location, storage_path, f'section{section}')
+            os.makedirs(path)
+            for page in [f'page{page}.html' for page in range(pages)] + ['objects.inv']:
+                with open(os.path.join(path, page), 'w'):
+                    pass
+
+    @staticmethod
+    def _create_imported_files_per_file(*, version, commit, build, search_ranking, search_ignore):
+        storage_path = version.project.get_storage_path(
+            type_='html', version_slug=version.slug, include_file=False
+        )
+        storage = search.build_media_storage
+        for root, __, filenames in storage.walk(storage_path):
+            for filename in filenames:
+                if not filename.endswith('.html'):
+                    continue
+
+                full_path = storage.join(root, filename)
+                relpath = full_path.replace(storage_path, '', 1).lstrip('/')
+
+                page_rank = 0
+                for pattern, rank in reversed(list(search_ranking.items())):
+                    if fnmatch(relpath, pattern):
+                        page_rank = rank
+                        break
+
+                ignore = False
+                for pattern in search_ignore:
+                    if fnmatch(relpath, pattern):
+                        ignore = True
+                        break
+
+                HTMLFile.objects.create(
+                    project=version.project,
+                    version=version,
+                    path=relpath,
+                    name=filename,
+                    rank=page_rank,
+                    commit=commit,
+                    build=build,
+                    ignore=ignore,
+                )
@@ -0,0 +1,102 @@
+"""
+Benchmark sorting the versions of a project with a lot of tags.
+
+Creates a project with ``--tags`` tags inside a transaction that is rolled back,
+and reports the time spent sorting its versions and finding the highest version:
+parsing every version name at request time (the previous implementation),
+and using the sort key stored in each version.
+
+Invoked via ``./manage.py benchmark_version_sorting --tags 5000``.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.crypto import get_random_string
+
+from readthedocs.builds.constants import TAG
+from readthedocs.builds.models import Version
+from readthedocs.projects.models import Project
+from readthedocs.projects.templatetags.projects_tags import sort_version_aware
+from readthedocs.projects.version_handling import (
+    comparable_version,
+    highest_version,
+    parse_version_failsafe,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._benchmark(options['tags'], options['iterations'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _benchmark(self, tags, iterations):
+        project = Project.objects.create(
+            name='Benchmark version sorting',
+            slug=f'benchmark-version-sorting-{get_random_string(8).lower()}',
+            repo_type='git',
+        )
+        self.stdout.write(f'Creating {tags} tags...')
+        for i in range(tags):
+            Version.objects.create(
+                project=project,
+                type=TAG,
+                identifier=f'{i:040x}',
+                verbose_name=f'{i // 1000}.{i // 10 % 100}.{i % 10}',
+                active=True,
+            )
+        versions = Version.internal.public(project=project, only_active=True)
+
+        # ``.all()`` is used so each run fetches the versions from the database again.
+        for name, function in (
+            ('sort (parse names)', lambda: self._sort_parsing(versions.all(), project)),
+            ('sort (sort_version_aware)', lambda: sort_version_aware(list(versions.all()))),
+            (
+                'sort (order_by_version)',
+                lambda: list(versions.all().order_by_version(project.repo_type)),
+            ),
+            ('highest (parse names)', lambda: self._highest_parsing(versions.all())),
+            ('highest (highest_version)', lambda: highest_version(versions.all())),
+        ):
+            start = time.monotonic()
+            for _ in range(iterations):
+                function()
+            elapsed = (time.monotonic() - start) / iterations
+            self.stdout.write(f'{name}: {elapsed * 1000:.1f} ms')
+
+    @staticmethod
+    def _sort_parsing(versions, project):
+        return sorted(
+            versions,
+            key=lambda version: comparable_version(
+                version.verbose_name,
+                repo_type=project.repo_type,
+            ),
+            reverse=True,
+        )
+
+    @staticmethod
+    def _highest_parsing(versions):
+        parsed = [
+            (version, parse_version_failsafe(version.verbose_name))
+            for version in versions.iterator()
+        ]
+        parsed = [(version, comparable) for version, comparable in parsed if comparable]
+        parsed.sort(key=lambda version_info: version_info[1], reverse=True)
+        return parsed[0] if parsed else (None, None)
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.13 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0090_dont_allow_ips_on_domains'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importedfile',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='Hash of the indexed content of the file, used to skip re-indexing it', max_length=64, null=True, verbose_name='Content hash'),
+        ),
+    ]
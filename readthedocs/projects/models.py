@@ -2,6 +2,7 @@
 import fnmatch
 import hashlib
 import hmac
+import json
 import os
 import re
 from shlex import quote
@@ -13,6 +14,7 @@ from django.conf import settings
 from django.conf.urls import include
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericRelation
+from django.core.cache import cache
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import Prefetch
@@ -1068,8 +1070,9 @@ class Project(models.Model):
                     to_attr='_canonical_domains',
                 ),
             )
+            .order_by_version(self.repo_type)
         )
-        return sort_version_aware(versions)
+        return list(versions)
 
     def all_active_versions(self):
         """
@@ -1233,7 +1236,39 @@ class Project(models.Model):
         we consider the project to have the flag. This is used for deprecating a
         feature or changing behavior for new projects
         """
-        return self.features.filter(feature_id=feature_id).exists()
+        return feature_id in self.get_feature_ids()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Reload the features on the next call of ``get_feature_ids``.
+        self._feature_ids = None
+
+    def get_feature_ids(self):
+        """
+        Return the IDs of all the features enabled for this project.
+
+        The features are loaded once per instance (call ``refresh_from_db`` to reload them),
+        and they are also stored in the cache for
+        ``RTD_PROJECT_FEATURES_CACHE_TIMEOUT`` seconds to share them across requests.
+        The cache is invalidated when any ``Feature`` changes.
+
+        :rtype: frozenset
+        """
+        if getattr(self, '_feature_ids', None) is not None:
+            return self._feature_ids
+
+        timeout = settings.RTD_PROJECT_FEATURES_CACHE_TIMEOUT
+        cache_key = get_features_cache_key(self) if timeout and self.pk else None
+        feature_ids = cache.get(cache_key) if cache_key else None
+        if feature_ids is None:
+            feature_ids = frozenset(
+                self.features.values_list('feature_id', flat=True)
+            )
+            if cache_key:
+                cache.set(cache_key, feature_ids, timeout=timeout)
+
+        self._feature_ids = feature_ids
+        return feature_ids
 
     def get_feature_value(self, feature, positive, negative):
         """
@@ -1414,6 +1449,13 @@ class ImportedFile(models.Model):
         # TODO: remove after migration
         null=True,
     )
+    content_hash = models.CharField(
+        _('Content hash'),
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text=_('Hash of the indexed content of the file, used to skip re-indexing it'),
+    )
 
     def get_absolute_url(self):
         return resolve(
@@ -1466,6 +1508,16 @@ class HTMLFile(ImportedFile):
     def processed_json(self):
         return self.get_processed_json()
 
+    def get_content_hash(self):
+        """
+        Return a hash of the content indexed from this file.
+
+        It's computed from the parsed output of the file and its rank,
+        if the hash didn't change between builds, its search document doesn't need to be updated.
+        """
+        content = json.dumps([self.processed_json, self.rank], sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
 
 class Notification(TimeStampedModel):
     # TODO: Overridden from TimeStampedModel just to allow null values,
@@ -1767,6 +1819,30 @@ class HTTPHeader(TimeStampedModel, models.Model):
         return f"HttpHeader: {self.name} on {self.domain.domain}"
 
 
+FEATURES_CACHE_VERSION_KEY = 'project-features-version'
+
+
+def get_features_cache_key(project):
+    """
+    Return the cache key used to store the features of ``project``.
+
+    The key includes a version shared by all projects,
+    any change to a ``Feature`` generates a new version,
+    so all the cached features are invalidated at once.
+    """
+    version = cache.get(FEATURES_CACHE_VERSION_KEY)
+    if version is None:
+        version = invalidate_features_cache()
+    return f'project-features:{version}:{project.pk}'
+
+
+def invalidate_features_cache():
+    """Invalidate the cached features of all projects."""
+    version = get_random_string(12)
+    cache.set(FEATURES_CACHE_VERSION_KEY, version, timeout=None)
+    return version
+
+
 class Feature(models.Model):
 
     """
@@ -1823,6 +1899,7 @@ class Feature(models.Model):
     ENABLE_MKDOCS_SERVER_SIDE_SEARCH = 'enable_mkdocs_server_side_search'
     DEFAULT_TO_FUZZY_SEARCH = 'default_to_fuzzy_search'
     INDEX_FROM_HTML_FILES = 'index_from_html_files'
+    INCREMENTAL_SEARCH_INDEXING = 'incremental_search_indexing'
 
     LIST_PACKAGES_INSTALLED_ENV = 'list_packages_installed_env'
     VCS_REMOTE_LISTING = 'vcs_remote_listing'
@@ -1830,6 +1907,8 @@ class Feature(models.Model):
     USE_SPHINX_BUILDERS = 'use_sphinx_builders'
     DEDUPLICATE_BUILDS = 'deduplicate_builds'
     DONT_CREATE_INDEX = 'dont_create_index'
+    INCREMENTAL_STORAGE_SYNC = 'incremental_storage_sync'
+    EMBED_API_INDEX = 'embed_api_index'
 
     FEATURES = (
         (ALLOW_DEPRECATED_WEBHOOKS, _('Allow deprecated webhook views')),
@@ -1956,6 +2035,10 @@ class Feature(models.Model):
             INDEX_FROM_HTML_FILES,
             _('Index content directly from html files instead or relying in other sources'),
         ),
+        (
+            INCREMENTAL_SEARCH_INDEXING,
+            _('Re-index only the pages that changed since the previous build'),
+        ),
 
         (
             LIST_PACKAGES_INSTALLED_ENV,
@@ -1984,6 +2067,14 @@ class Feature(models.Model):
             DONT_CREATE_INDEX,
             _('Do not create index.md or README.rst if the project does not have one.'),
         ),
+        (
+            INCREMENTAL_STORAGE_SYNC,
+            _('Upload only changed build artifacts to storage, using parallel uploads'),
+        ),
+        (
+            EMBED_API_INDEX,
+            _('Index the sections of the HTML pages for the EmbedAPI'),
+        ),
     )
 
     projects = models.ManyToManyField(
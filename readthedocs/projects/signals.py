@@ -1,6 +1,10 @@
 """Project signals."""
 
 import django.dispatch
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from readthedocs.projects.models import Feature, invalidate_features_cache
 
 before_vcs = django.dispatch.Signal()
 
@@ -11,3 +15,11 @@ project_import = django.dispatch.Signal()
 
 # Used to purge files from the CDN
 files_changed = django.dispatch.Signal()
+
+
+@receiver(post_save, sender=Feature)
+@receiver(post_delete, sender=Feature)
+@receiver(m2m_changed, sender=Feature.projects.through)
+def invalidate_project_features(*args, **kwargs):
+    """Invalidate the cached features of all projects when a feature changes."""
+    invalidate_features_cache()
@@ -49,6 +49,7 @@ from readthedocs.doc_builder.exceptions import (
     ProjectBuildsSkippedError,
     YAMLParseError,
 )
+from readthedocs.embed.v3.index import create_embed_index
 from readthedocs.storage import build_media_storage
 from readthedocs.telemetry.collectors import BuildDataCollector
 from readthedocs.telemetry.tasks import save_build_data
@@ -204,6 +205,8 @@ class SyncRepositoryTask(SyncRepositoryMixin, Task):
             # Do not try to save commands on the db because they are just for
             # sync repository
             record=False,
+            # The git mirror is only updated by builds.
+            git_mirror_mode='ro',
         )
 
         with environment:
@@ -813,6 +816,7 @@ class UpdateDocsTask(SyncRepositoryMixin, Task):
         else:
             types_to_delete.append('epub')
 
+        incremental_sync = self.data.project.has_feature(Feature.INCREMENTAL_STORAGE_SYNC)
         for media_type, build_type in types_to_copy:
             from_path = self.data.version.project.artifact_path(
                 version=self.data.version.slug,
@@ -825,7 +829,32 @@ class UpdateDocsTask(SyncRepositoryMixin, Task):
                 version_type=self.data.version.type,
             )
             try:
-                build_media_storage.sync_directory(from_path, to_path)
+                if incremental_sync:
+                    # The manifests are saved with the JSON media, it isn't served publicly.
+                    manifest_path = build_media_storage.get_sync_manifest_path(
+                        self.data.version.project.get_storage_path(
+                            type_='json',
+                            version_slug=self.data.version.slug,
+                            include_file=False,
+                            version_type=self.data.version.type,
+                        ),
+                        media_type,
+                    )
+                    stats = build_media_storage.sync_directory_incremental(
+                        from_path,
+                        to_path,
+                        manifest_path=manifest_path,
+                    )
+                    log.info(
+                        'Build artifacts synced to storage.',
+                        media_type=media_type,
+                        uploaded=stats['uploaded'],
+                        skipped=stats['skipped'],
+                        deleted=stats['deleted'],
+                        bytes_uploaded=stats['bytes_uploaded'],
+                    )
+                else:
+                    build_media_storage.sync_directory(from_path, to_path)
             except Exception:
                 # Ideally this should just be an IOError
                 # but some storage backends unfortunately throw other errors
@@ -836,6 +865,25 @@ class UpdateDocsTask(SyncRepositoryMixin, Task):
                     to_path=to_path,
                 )
 
+        # The index is saved with the JSON media, after it's synced,
+        # so it isn't removed when syncing the JSON output of the build.
+        if (
+            html
+            and self.data.version.type != EXTERNAL
+            and self.data.project.has_feature(Feature.EMBED_API_INDEX)
+        ):
+            try:
+                create_embed_index(
+                    version=self.data.version,
+                    build_id=self.data.build['id'],
+                    html_path=self.data.version.project.artifact_path(
+                        version=self.data.version.slug,
+                        type_=self.data.config.doctype,
+                    ),
+                )
+            except Exception:
+                log.exception('Failed during embed index creation (not failing build)')
+
         for media_type in types_to_delete:
             media_path = self.data.version.project.get_storage_path(
                 type_=media_type,
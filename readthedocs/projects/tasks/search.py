@@ -1,21 +1,44 @@
 import json
-from fnmatch import fnmatch
+import posixpath
+import re
+from fnmatch import translate
 
 import structlog
 from django.conf import settings
-from sphinx.ext import intersphinx
+from django.core.cache import cache
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+from django_elasticsearch_dsl.apps import DEDConfig
+from sphinx.util.inventory import InventoryFile
 
 from readthedocs.builds.constants import EXTERNAL
 from readthedocs.builds.models import Version
 from readthedocs.projects.models import Feature, HTMLFile, ImportedFile, Project
 from readthedocs.projects.signals import files_changed
-from readthedocs.search.utils import index_new_files, remove_indexed_files
+from readthedocs.search.utils import (
+    index_files,
+    index_new_files,
+    remove_indexed_files,
+    update_indexed_files_build,
+)
 from readthedocs.sphinx_domains.models import SphinxDomain
 from readthedocs.storage import build_media_storage
 from readthedocs.worker import app
 
 log = structlog.get_logger(__name__)
 
+# Number of ``HTMLFile`` objects inserted per query.
+HTML_FILES_BATCH_SIZE = 1000
+
+# Number of ``SphinxDomain`` objects inserted per query.
+SPHINX_DOMAINS_BATCH_SIZE = 1000
+
+# Number of ``HTMLFile`` objects parsed and indexed at once.
+SEARCH_INDEX_BATCH_SIZE = 100
+
+# Time (in seconds) to wait for the ``index_build_files`` tasks of a build to finish.
+PENDING_CHUNKS_TIMEOUT = 60 * 60 * 24
+
 
 @app.task(queue='reindex')
 def fileify(version_pk, commit, build, search_ranking, search_ignore):
@@ -72,13 +95,132 @@ def _sync_imported_files(version, build):
     """
     Sync/Update/Delete ImportedFiles objects of this version.
 
+    The files from ``build`` are indexed in chunks of ``ES_TASK_CHUNK_SIZE`` files,
+    each chunk is parsed and indexed by an ``index_build_files`` task,
+    so the pages of big versions are parsed in parallel by the workers of the queue.
+    The files from the previous build are removed after all the chunks are indexed.
+
+    :param version: Version instance
+    :param build: Build id
+    """
+    html_files_id = list(
+        HTMLFile.objects.filter(project=version.project, version=version, build=build)
+        .exclude(ignore=True)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    chunk_size = settings.ES_TASK_CHUNK_SIZE
+    chunks = [
+        html_files_id[i:i + chunk_size]
+        for i in range(0, len(html_files_id), chunk_size)
+    ]
+    if len(chunks) <= 1:
+        _index_build_files(version, build, html_files_id)
+        _remove_previous_files(version, build)
+        return
+
+    log.info(
+        'Indexing files in chunks.',
+        project_slug=version.project.slug,
+        version_slug=version.slug,
+        chunks=len(chunks),
+    )
+    cache.set(
+        _get_pending_chunks_cache_key(version.pk, build),
+        len(chunks),
+        timeout=PENDING_CHUNKS_TIMEOUT,
+    )
+    for chunk in chunks:
+        index_build_files.delay(
+            version_pk=version.pk,
+            build=build,
+            html_files_id=chunk,
+        )
+
+
+@app.task(queue='reindex')
+def index_build_files(version_pk, build, html_files_id):
+    """
+    Index a chunk of the files from ``build``.
+
+    The last chunk to finish removes the files from the previous build of the version.
+
+    :param html_files_id: List of IDs of the ``HTMLFile`` objects to index.
+    """
+    version = Version.objects.get_object_or_log(pk=version_pk)
+    if not version:
+        return
+
+    try:
+        _index_build_files(version, build, html_files_id)
+    except Exception:
+        log.exception('Failed during ImportedFile syncing')
+
+    # Count the chunks that failed too,
+    # otherwise the files from the previous build would never be removed.
+    try:
+        pending_chunks = cache.decr(_get_pending_chunks_cache_key(version_pk, build))
+    except ValueError:
+        # The counter expired or was evicted, we can't know if this is the last chunk.
+        # Only files from older builds are removed, so removing them early is safe.
+        log.warning(
+            'Pending chunks not found, removing the files from the previous build.',
+            project_slug=version.project.slug,
+            version_slug=version.slug,
+            build_id=build,
+        )
+        pending_chunks = 0
+
+    if pending_chunks > 0:
+        return
+
+    cache.delete(_get_pending_chunks_cache_key(version_pk, build))
+    try:
+        _remove_previous_files(version, build)
+    except Exception:
+        log.exception('Failed during ImportedFile syncing')
+
+
+def _get_pending_chunks_cache_key(version_pk, build):
+    return f'search-index-pending-chunks:{version_pk}:{build}'
+
+
+def _index_build_files(version, build, html_files_id):
+    """Index the files with ``html_files_id`` from ``build`` to ElasticSearch."""
+    if version.project.has_feature(Feature.INCREMENTAL_SEARCH_INDEXING):
+        # Index only new and changed HTMLFiles
+        _index_changed_files(version, build, html_files_id)
+    else:
+        # Index new HTMLFiles
+        index_new_files(
+            model=HTMLFile,
+            version=version,
+            build=build,
+            objects_id=html_files_id,
+        )
+
+
+def _remove_previous_files(version, build):
+    """
+    Delete the ImportedFiles objects from the previous builds of this version.
+
+    Only objects from builds older than ``build`` are deleted.
+    If a newer build already created its files, nothing is deleted,
+    the newer build removes the files from the older builds when it's indexed.
+
     :param version: Version instance
     :param build: Build id
     """
     project = version.project
 
-    # Index new HTMLFiles to ElasticSearch
-    index_new_files(model=HTMLFile, version=version, build=build)
+    if ImportedFile.objects.filter(project=project, version=version, build__gt=build).exists():
+        log.info(
+            'Files from a newer build found, skipping removal of previous files.',
+            project_slug=project.slug,
+            version_slug=version.slug,
+            build_id=build,
+        )
+        return
 
     # Remove old HTMLFiles from ElasticSearch
     remove_indexed_files(
@@ -88,6 +230,8 @@ def _sync_imported_files(version, build):
         build_id=build,
     )
 
+    previous_builds = Q(build__lt=build) | Q(build=None)
+
     # Delete SphinxDomain objects from previous versions
     # This has to be done before deleting ImportedFiles and not with a cascade,
     # because multiple Domain's can reference a specific HTMLFile.
@@ -96,19 +240,139 @@ def _sync_imported_files(version, build):
     if not project.has_feature(Feature.DISABLE_SPHINX_DOMAINS):
         (
             SphinxDomain.objects.filter(project=project, version=version)
-            .exclude(build=build)
+            .filter(previous_builds)
             .delete()
         )
 
     # Delete ImportedFiles objects (including HTMLFiles)
-    # from the previous build of the version.
+    # from the previous builds of the version.
     (
         ImportedFile.objects.filter(project=project, version=version)
-        .exclude(build=build)
+        .filter(previous_builds)
         .delete()
     )
 
 
+def _index_changed_files(version, build, html_files_id):
+    """
+    Index only the HTMLFiles from ``build`` that changed since the previous build.
+
+    The content hash of each file is compared with the one from the previous build,
+    files that didn't change keep the object (and search document) from the previous build,
+    only their build and commit are updated.
+    New and changed files are indexed and their content hash is saved,
+    the documents of the files that were removed are deleted by ``remove_indexed_files``.
+
+    :param version: Version instance
+    :param build: Build id
+    :param html_files_id: List of IDs of the HTMLFiles from ``build`` to index
+    """
+    if not DEDConfig.autosync_enabled():
+        log.info('Autosync disabled. Skipping indexing into the search index.')
+        return
+
+    project = version.project
+    queryset = (
+        HTMLFile.objects.filter(
+            project=project,
+            version=version,
+            build=build,
+            pk__in=html_files_id,
+        )
+        .exclude(ignore=True)
+        .select_related('project', 'version')
+    )
+    # Only files with a content hash were indexed by a previous build.
+    previous_files = {
+        path: (html_file_id, content_hash)
+        for path, html_file_id, content_hash in (
+            HTMLFile.objects.filter(
+                project=project,
+                version=version,
+                path__in=list(queryset.values_list('path', flat=True)),
+            )
+            .exclude(build=build)
+            .exclude(ignore=True)
+            .exclude(content_hash=None)
+            .order_by('build')
+            .values_list('path', 'pk', 'content_hash')
+        )
+    }
+
+    commit = None
+    changed_count = 0
+    changed_files = []
+    # Maps the ID of the HTMLFile from this build to the ID from the previous build.
+    unchanged_files = {}
+    for html_file in queryset.iterator():
+        commit = html_file.commit
+        html_file.content_hash = html_file.get_content_hash()
+        previous_id, previous_hash = previous_files.get(html_file.path, (None, None))
+        if previous_hash == html_file.content_hash:
+            unchanged_files[html_file.pk] = previous_id
+            continue
+
+        changed_count += 1
+        changed_files.append(html_file)
+        if len(changed_files) >= SEARCH_INDEX_BATCH_SIZE:
+            _index_html_files(changed_files)
+            changed_files = []
+
+    if changed_files:
+        _index_html_files(changed_files)
+
+    log.info(
+        'Incremental search indexing.',
+        project_slug=project.slug,
+        version_slug=version.slug,
+        changed_files=changed_count,
+        unchanged_files=len(unchanged_files),
+    )
+
+    if not unchanged_files:
+        return
+
+    if not update_indexed_files_build(
+        model=HTMLFile,
+        objects_id=list(unchanged_files.values()),
+        build=build,
+        commit=commit,
+    ):
+        # Index the files from this build,
+        # so they aren't removed from the search index.
+        index_files(model=HTMLFile, files=queryset.filter(pk__in=list(unchanged_files)))
+        return
+
+    # Keep the HTMLFile objects from the previous build,
+    # moving the objects that reference the ones from this build.
+    items = list(unchanged_files.items())
+    for i in range(0, len(items), HTML_FILES_BATCH_SIZE):
+        batch = dict(items[i:i + HTML_FILES_BATCH_SIZE])
+        # XXX: Don't access the sphinx domains table while we migrate the ID type
+        # https://github.com/readthedocs/readthedocs.org/pull/9482.
+        if not project.has_feature(Feature.DISABLE_SPHINX_DOMAINS):
+            SphinxDomain.objects.filter(html_file_id__in=list(batch)).update(
+                html_file_id=Case(
+                    *[
+                        When(html_file_id=html_file_id, then=Value(previous_id))
+                        for html_file_id, previous_id in batch.items()
+                    ]
+                ),
+            )
+        HTMLFile.objects.filter(pk__in=list(batch)).delete()
+        HTMLFile.objects.filter(pk__in=list(batch.values())).update(
+            build=build,
+            commit=commit,
+            modified_date=timezone.now(),
+        )
+
+
+def _index_html_files(html_files):
+    """Index ``html_files`` and save their content hash."""
+    index_files(model=HTMLFile, files=html_files)
+    HTMLFile.objects.bulk_update(html_files, ['content_hash'])
+
+
 @app.task(queue='web')
 def remove_search_indexes(project_slug, version_slug=None):
     """Wrapper around ``remove_indexed_files`` to make it a task."""
@@ -123,6 +387,8 @@ def _create_intersphinx_data(version, commit, build):
     """
     Create intersphinx data for this version.
 
+    Objects are inserted in batches of ``SPHINX_DOMAINS_BATCH_SIZE``.
+
     :param version: Version instance
     :param commit: Commit that updated path
     :param build: Build id
@@ -153,28 +419,23 @@ def _create_intersphinx_data(version, commit, build):
         except Exception:
             log.exception('Exception parsing readthedocs-sphinx-domain-names.json')
 
-    # These classes are copied from Sphinx
-    # https://github.com/sphinx-doc/sphinx/blob/d79d041f4f90818e0b495523fdcc28db12783caf/sphinx/ext/intersphinx.py#L400-L403  # noqa
-    class MockConfig:
-        intersphinx_timeout = None
-        tls_verify = False
-        user_agent = None
-
-    class MockApp:
-        srcdir = ''
-        config = MockConfig()
-
-        def warn(self, msg):
-            log.warning('Sphinx MockApp.', msg=msg)
-
+    # Read the inventory directly from storage,
+    # the same way ``sphinx.ext.intersphinx.fetch_inventory`` does after fetching it.
+    with build_media_storage.open(object_file, 'rb') as fd:
+        invdata = InventoryFile.load(fd, '', posixpath.join)
+
+    # Load all the HTMLFile objects of this build once,
+    # instead of querying the database for each entry of the inventory.
+    html_files = {}
+    for path, html_file_id in (
+        HTMLFile.objects.filter(project=version.project, version=version, build=build)
+        .order_by('pk')
+        .values_list('path', 'pk')
+    ):
+        html_files.setdefault(path, html_file_id)
+
+    sphinx_domains = []
     # Re-create all objects from the new build of the version
-    object_file_url = build_media_storage.url(object_file)
-    if object_file_url.startswith('/'):
-        # Filesystem backed storage simply prepends MEDIA_URL to the path to get the URL
-        # This can cause an issue if MEDIA_URL is not fully qualified
-        object_file_url = settings.RTD_INTERSPHINX_URL + object_file_url
-
-    invdata = intersphinx.fetch_inventory(MockApp(), '', object_file_url)
     for key, value in sorted(invdata.items() or {}):
         domain, _type = key.split(':', 1)
         for name, einfo in sorted(value.items()):
@@ -210,12 +471,8 @@ def _create_intersphinx_data(version, commit, build):
             if doc_name.endswith('/'):
                 doc_name += 'index.html'
 
-            html_file = HTMLFile.objects.filter(
-                project=version.project, version=version,
-                path=doc_name, build=build,
-            ).first()
-
-            if not html_file:
+            html_file_id = html_files.get(doc_name)
+            if not html_file_id:
                 log.debug(
                     'HTMLFile object not found.',
                     project_slug=version.project.slug,
@@ -228,31 +485,49 @@ def _create_intersphinx_data(version, commit, build):
                 # if the HTMLFile object is not found.
                 continue
 
-            SphinxDomain.objects.create(
-                project=version.project,
-                version=version,
-                html_file=html_file,
-                domain=domain,
-                name=name,
-                display_name=display_name,
-                type=_type,
-                type_display=types.get(f'{domain}:{_type}', ''),
-                doc_name=doc_name,
-                doc_display=titles.get(doc_name, ''),
-                anchor=anchor,
-                commit=commit,
-                build=build,
+            sphinx_domains.append(
+                SphinxDomain(
+                    project=version.project,
+                    version=version,
+                    html_file_id=html_file_id,
+                    domain=domain,
+                    name=name,
+                    display_name=display_name,
+                    type=_type,
+                    type_display=types.get(f'{domain}:{_type}', ''),
+                    doc_name=doc_name,
+                    doc_display=titles.get(doc_name, ''),
+                    anchor=anchor,
+                    commit=commit,
+                    build=build,
+                )
             )
+            if len(sphinx_domains) >= SPHINX_DOMAINS_BATCH_SIZE:
+                SphinxDomain.objects.bulk_create(sphinx_domains)
+                sphinx_domains = []
+
+    if sphinx_domains:
+        SphinxDomain.objects.bulk_create(sphinx_domains)
 
 
 def _create_imported_files(*, version, commit, build, search_ranking, search_ignore):
     """
     Create imported files for version.
 
+    Objects are inserted in batches of ``HTML_FILES_BATCH_SIZE``.
+
     :param version: Version instance
     :param commit: Commit that updated path
     :param build: Build id
     """
+    # Last pattern to match takes precedence
+    # XXX: see if we can implement another type of precedence,
+    # like the longest pattern.
+    rankings = list(reversed(list(search_ranking.items())))
+    ranking_matcher = _compile_patterns([pattern for pattern, _ in rankings])
+    ignore_matcher = _compile_patterns(search_ignore)
+
+    html_files = []
     # Re-create all objects from the new build of the version
     storage_path = version.project.get_storage_path(
         type_='html', version_slug=version.slug, include_file=False
@@ -269,32 +544,31 @@ def _create_imported_files(*, version, commit, build, search_ranking, search_ign
             relpath = full_path.replace(storage_path, '', 1).lstrip('/')
 
             page_rank = 0
-            # Last pattern to match takes precedence
-            # XXX: see if we can implement another type of precedence,
-            # like the longest pattern.
-            reverse_rankings = reversed(list(search_ranking.items()))
-            for pattern, rank in reverse_rankings:
-                if fnmatch(relpath, pattern):
-                    page_rank = rank
-                    break
-
-            ignore = False
-            for pattern in search_ignore:
-                if fnmatch(relpath, pattern):
-                    ignore = True
-                    break
+            match = ranking_matcher.match(relpath) if ranking_matcher else None
+            if match:
+                page_rank = rankings[_get_pattern_index(match)][1]
+
+            ignore = bool(ignore_matcher and ignore_matcher.match(relpath))
 
             # Create imported files from new build
-            HTMLFile.objects.create(
-                project=version.project,
-                version=version,
-                path=relpath,
-                name=filename,
-                rank=page_rank,
-                commit=commit,
-                build=build,
-                ignore=ignore,
+            html_files.append(
+                HTMLFile(
+                    project=version.project,
+                    version=version,
+                    path=relpath,
+                    name=filename,
+                    rank=page_rank,
+                    commit=commit,
+                    build=build,
+                    ignore=ignore,
+                )
             )
+            if len(html_files) >= HTML_FILES_BATCH_SIZE:
+                HTMLFile.objects.bulk_create(html_files)
+                html_files = []
+
+    if html_files:
+        HTMLFile.objects.bulk_create(html_files)
 
     # This signal is used for purging the CDN.
     files_changed.send(
@@ -302,3 +576,28 @@ def _create_imported_files(*, version, commit, build, search_ranking, search_ign
         project=version.project,
         version=version,
     )
+
+
+def _compile_patterns(patterns):
+    """
+    Compile a list of ``fnmatch`` patterns into a single regular expression.
+
+    Each pattern is wrapped in a named group (``pattern_<index>``),
+    when several patterns match a path, the first one from the list is the one matched,
+    use ``_get_pattern_index`` to get its index.
+
+    :returns: the compiled regular expression, or ``None`` if there aren't patterns.
+    """
+    if not patterns:
+        return None
+    return re.compile(
+        '|'.join(
+            f'(?P<pattern_{index}>{translate(pattern)})'
+            for index, pattern in enumerate(patterns)
+        )
+    )
+
+
+def _get_pattern_index(match):
+    """Return the index of the pattern that matched from a ``_compile_patterns`` regex."""
+    return int(match.lastgroup.rsplit('_', 1)[1])
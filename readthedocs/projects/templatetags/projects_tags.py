@@ -3,20 +3,25 @@
 from django import template
 
 from readthedocs.core.permissions import AdminPermission
-from readthedocs.projects.version_handling import comparable_version
+from readthedocs.projects.version_handling import get_sort_key
 
 register = template.Library()
 
 
 @register.filter
 def sort_version_aware(versions):
-    """Takes a list of versions objects and sort them using version schemes."""
+    """
+    Takes a list of versions objects and sort them using version schemes.
+
+    Versions are compared using their stored sort key,
+    use ``VersionQuerySet.order_by_version`` to sort them in the database instead.
+    """
     repo_type = None
     if versions:
         repo_type = versions[0].project.repo_type
     return sorted(
         versions,
-        key=lambda version: comparable_version(version.verbose_name, repo_type=repo_type),
+        key=lambda version: get_sort_key(version, repo_type=repo_type),
         reverse=True,
     )
 
@@ -180,6 +180,9 @@ class BuildEnvironmentMocker:
         self.patches['build_media_storage'] = mock.patch(
             'readthedocs.projects.tasks.builds.build_media_storage',
         )
+        self.patches['create_embed_index'] = mock.patch(
+            'readthedocs.projects.tasks.builds.create_embed_index',
+        )
 
     def _mock_api(self):
         headers = {'Content-Type': 'application/json'}
@@ -210,6 +213,11 @@ class BuildEnvironmentMocker:
             status_code=201,
         )
 
+        self.requestsmock.post(
+            f'{settings.SLUMBER_API_HOST}/api/v2/command/bulk/',
+            status_code=201,
+        )
+
         self.requestsmock.patch(
             f'{settings.SLUMBER_API_HOST}/api/v2/build/{self.build.pk}/',
             status_code=201,
@@ -1,6 +1,7 @@
 """Project version handling."""
 import unicodedata
 
+from django.db.models import Case, F, Value, When
 from packaging.version import InvalidVersion, Version
 
 from readthedocs.builds.constants import (
@@ -10,6 +11,12 @@ from readthedocs.builds.constants import (
 )
 from readthedocs.vcs_support.backends import backend_cls
 
+# Order of the pre release letters, as normalized by ``packaging``.
+PRE_RELEASE_ORDER = {'a': '0', 'b': '1', 'rc': '2'}
+
+# Max length of ``Version.sort_key``.
+SORT_KEY_MAX_LENGTH = 255
+
 
 def parse_version_failsafe(version_string):
     """
@@ -48,6 +55,29 @@ def parse_version_failsafe(version_string):
     return None
 
 
+def get_fallback_branch(repo_type):
+    """Return the default branch of the VCS of ``repo_type`` (master, default, trunk)."""
+    if repo_type:
+        backend = backend_cls.get(repo_type)
+        if backend and backend.fallback_branch:
+            return backend.fallback_branch
+    return None
+
+
+def get_highest_versions(repo_type=None):
+    """
+    Return the names of the versions sorted above all other versions, from the highest one.
+
+    These are the default branch of the VCS of ``repo_type`` (if given), LATEST and STABLE.
+    """
+    highest_versions = []
+    fallback_branch = get_fallback_branch(repo_type)
+    if fallback_branch:
+        highest_versions.append(fallback_branch)
+    highest_versions.extend([LATEST_VERBOSE_NAME, STABLE_VERBOSE_NAME])
+    return highest_versions
+
+
 def comparable_version(version_string, repo_type=None):
     """
     Can be used as ``key`` argument to ``sorted``.
@@ -69,12 +99,7 @@ def comparable_version(version_string, repo_type=None):
 
     :rtype: packaging.version.Version
     """
-    highest_versions = []
-    if repo_type:
-        backend = backend_cls.get(repo_type)
-        if backend and backend.fallback_branch:
-            highest_versions.append(backend.fallback_branch)
-    highest_versions.extend([LATEST_VERBOSE_NAME, STABLE_VERBOSE_NAME])
+    highest_versions = get_highest_versions(repo_type)
 
     comparable = parse_version_failsafe(version_string)
     if not comparable:
@@ -87,47 +112,163 @@ def comparable_version(version_string, repo_type=None):
     return comparable
 
 
+def _encode_number(number):
+    """Encode a number as a string that sorts like the number (prefixed by its length)."""
+    digits = str(number)
+    return f'{len(digits):02d}{digits}'
+
+
+def _encode_local_segment(segment):
+    """Encode a segment of the local version label, numbers sort after strings."""
+    if segment.isdigit():
+        return '2' + _encode_number(int(segment))
+    return '1' + ''.join(f'{ord(char):03d}' for char in segment) + '000'
+
+
+def version_sort_key(version_string, repo_type=None):
+    """
+    Return a key that sorts in the same order as ``comparable_version``.
+
+    Keys are compared as plain strings,
+    so they can be stored in the database and used to sort versions with ``ORDER BY``.
+    Keys contain only digits, so their order doesn't depend on the collation of the database.
+
+    Each part of the version (epoch, release, pre, post, dev and local)
+    is encoded following the same rules ``packaging`` uses to compare versions.
+    The last digit is ``1`` if ``version_string`` is a valid version number
+    (see ``parse_version_failsafe``), ``0`` otherwise.
+
+    :param version_string: version as string object (e.g. '3.10.1' or 'latest')
+    :param repo_type: Repository type from which the versions are generated.
+
+    :rtype: str
+    """
+    parsed = parse_version_failsafe(version_string)
+    comparable = parsed or comparable_version(version_string, repo_type=repo_type)
+
+    release = list(comparable.release)
+    # Trailing zeros don't change the version, 1.0 == 1.0.0.
+    while release and release[-1] == 0:
+        release.pop()
+
+    key = [_encode_number(comparable.epoch)]
+    key.extend('1' + _encode_number(number) for number in release)
+    key.append('0')
+
+    # A dev release without a pre or post release (1.0.dev1) sorts before all pre releases,
+    # and a final release sorts after all pre releases.
+    if comparable.pre is not None:
+        letter, number = comparable.pre
+        key.append('1' + PRE_RELEASE_ORDER[letter] + _encode_number(number))
+    elif comparable.post is None and comparable.dev is not None:
+        key.append('0')
+    else:
+        key.append('2')
+
+    if comparable.post is not None:
+        key.append('1' + _encode_number(comparable.post))
+    else:
+        key.append('0')
+
+    if comparable.dev is not None:
+        key.append('0' + _encode_number(comparable.dev))
+    else:
+        key.append('1')
+
+    if comparable.local is not None:
+        key.append('1')
+        key.extend(
+            _encode_local_segment(segment)
+            for segment in comparable.local.split('.')
+        )
+        key.append('0')
+    else:
+        key.append('0')
+
+    key = ''.join(key)[:SORT_KEY_MAX_LENGTH - 1]
+    return key + ('1' if parsed else '0')
+
+
+def get_sort_key(version, repo_type=None):
+    """
+    Return the sort key of a ``Version`` object.
+
+    The key stored in the version is used if available,
+    it's computed without ``repo_type``, so it's computed again for the fallback branch,
+    LATEST and STABLE (the fallback branch is sorted above them).
+    """
+    if get_fallback_branch(repo_type) and version.verbose_name in get_highest_versions(repo_type):
+        return version_sort_key(version.verbose_name, repo_type=repo_type)
+    return version.sort_key or version_sort_key(version.verbose_name)
+
+
+def sort_key_expression(repo_type=None):
+    """
+    Return an expression with the sort key of each version, to be used in ``order_by``.
+
+    This is the same as ``get_sort_key``, but computed by the database.
+    """
+    if not get_fallback_branch(repo_type):
+        return F('sort_key')
+    return Case(
+        *[
+            When(
+                verbose_name=verbose_name,
+                then=Value(version_sort_key(verbose_name, repo_type=repo_type)),
+            )
+            for verbose_name in get_highest_versions(repo_type)
+        ],
+        default=F('sort_key'),
+    )
+
+
+def _sorted_versions_queryset(version_list):
+    """Return the versions with a valid version number, sorted in descending order."""
+    return (
+        version_list
+        .filter(sort_key__endswith='1')
+        .order_by('-sort_key', '-verbose_name')
+    )
+
+
+def _iter_sorted_versions(version_list):
+    # use ``.iterator()`` to avoid fetching all the versions at once (this may
+    # have an impact when the project has lot of tags)
+    for version_obj in _sorted_versions_queryset(version_list).iterator():
+        yield version_obj, parse_version_failsafe(version_obj.verbose_name)
+
+
 def sort_versions(version_list):
     """
-    Take a list of Version models and return a sorted list.
+    Take a queryset of Version models and return a sorted list.
 
     This only considers versions with comparable version numbers.
     It excludes versions like "latest" and "stable".
 
-    :param version_list: list of Version models
-    :type version_list: list(readthedocs.builds.models.Version)
+    Versions are sorted by the database using their ``sort_key``.
+
+    :param version_list: queryset of Version models
+    :type version_list: django.db.models.QuerySet
 
     :returns: sorted list in descending order (latest version first) of versions
 
     :rtype: list(tupe(readthedocs.builds.models.Version,
             packaging.version.Version))
     """
-    versions = []
-    # use ``.iterator()`` to avoid fetching all the versions at once (this may
-    # have an impact when the project has lot of tags)
-    for version_obj in version_list.iterator():
-        version_slug = version_obj.verbose_name
-        comparable_version = parse_version_failsafe(version_slug)
-        if comparable_version:
-            versions.append((version_obj, comparable_version))
-
-    # sort in-place to avoid leaking memory on projects with lot of versions
-    versions.sort(
-        key=lambda version_info: version_info[1],
-        reverse=True,
-    )
-    return versions
+    return list(_iter_sorted_versions(version_list))
 
 
 def highest_version(version_list):
     """
     Return the highest version for a given ``version_list``.
 
+    Only the highest version is fetched from the database.
+
     :rtype: tupe(readthedocs.builds.models.Version, packaging.version.Version)
     """
-    versions = sort_versions(version_list)
-    if versions:
-        return versions[0]
+    version_obj = _sorted_versions_queryset(version_list).first()
+    if version_obj:
+        return (version_obj, parse_version_failsafe(version_obj.verbose_name))
     return (None, None)
 
 
@@ -135,28 +276,26 @@ def determine_stable_version(version_list):
     """
     Determine a stable version for version list.
 
-    :param version_list: list of versions
-    :type version_list: list(readthedocs.builds.models.Version)
+    Versions are fetched from the highest one,
+    and only until the first tag that isn't a pre release is found.
+
+    :param version_list: queryset of versions
+    :type version_list: django.db.models.QuerySet
 
     :returns: version considered the most recent stable one or ``None`` if there
               is no stable version in the list
 
     :rtype: readthedocs.builds.models.Version
     """
-    versions = sort_versions(version_list)
-    versions = [
-        (version_obj, comparable)
-        for version_obj, comparable in versions
-        if not comparable.is_prerelease
-    ]
+    first_stable = None
+    for version_obj, comparable in _iter_sorted_versions(version_list):
+        if comparable.is_prerelease:
+            continue
 
-    if versions:
         # We take preference for tags over branches. If we don't find any tag,
         # we just return the first branch found.
-        for version_obj, comparable in versions:
-            if version_obj.type == TAG:
-                return version_obj
-
-        version_obj, comparable = versions[0]
-        return version_obj
-    return None
+        if version_obj.type == TAG:
+            return version_obj
+        if first_stable is None:
+            first_stable = version_obj
+    return first_stable
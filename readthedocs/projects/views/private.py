@@ -1,10 +1,12 @@
 """Project views for authenticated users."""
 
+import itertools
+
 import structlog
 from allauth.socialaccount.models import SocialAccount
 from django.conf import settings
 from django.contrib import messages
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
 from django.http import (
     Http404,
     HttpResponse,
@@ -29,7 +31,12 @@ from vanilla import (
     UpdateView,
 )
 
-from readthedocs.analytics.models import PageView
+from readthedocs.analytics.models import (
+    PageView,
+    PageViewDailyTotal,
+    PageViewTopPage,
+)
+from readthedocs.api.v2.cache import invalidate_footer
 from readthedocs.builds.forms import RegexAutomationRuleForm, VersionForm
 from readthedocs.builds.models import (
     AutomationRuleMatch,
@@ -78,6 +85,7 @@ from readthedocs.projects.views.mixins import (
     ProjectImportMixin,
     ProjectRelationListMixin,
 )
+from readthedocs.proxito.cache import invalidate_sitemap
 from readthedocs.search.models import SearchQuery
 
 log = structlog.get_logger(__name__)
@@ -685,6 +693,9 @@ class ProjectTranslationsDelete(ProjectTranslationsMixin, GenericView):
         project = self.get_project()
         translation = self.get_translation(kwargs['child_slug'])
         project.translations.remove(translation)
+        # Removing a translation updates it in bulk, without triggering its signals.
+        invalidate_footer(project)
+        invalidate_sitemap(project.pk)
         return HttpResponseRedirect(self.get_success_url())
 
     def get_translation(self, slug):
@@ -1164,6 +1175,8 @@ class TrafficAnalyticsViewBase(ProjectAdminMixin, PrivateViewMixin, TemplateView
 
     def get(self, request, *args, **kwargs):
         download_data = request.GET.get('download', False)
+        if download_data == 'daily':
+            return self._get_daily_csv_data()
         if download_data:
             return self._get_csv_data()
         return super().get(request, *args, **kwargs)
@@ -1176,12 +1189,17 @@ class TrafficAnalyticsViewBase(ProjectAdminMixin, PrivateViewMixin, TemplateView
         if not enabled:
             return context
 
-        # Count of views for top pages over the month
-        top_pages_200 = PageView.top_viewed_pages(project, limit=25)
+        # Count of views for top pages over the month,
+        # these are updated periodically by ``update_page_view_rollups``.
+        # Projects without rollups (e.g. before they are created for the first time)
+        # read the page views directly.
+        use_rollups = self._has_rollups(project)
+        top_pages_model = PageViewTopPage if use_rollups else PageView
+        top_pages_200 = top_pages_model.top_viewed_pages(project, limit=25)
         track_404 = project.has_feature(Feature.RECORD_404_PAGE_VIEWS)
         top_pages_404 = []
         if track_404:
-            top_pages_404 = PageView.top_viewed_pages(
+            top_pages_404 = top_pages_model.top_viewed_pages(
                 project,
                 limit=25,
                 status=404,
@@ -1189,9 +1207,10 @@ class TrafficAnalyticsViewBase(ProjectAdminMixin, PrivateViewMixin, TemplateView
             )
 
         # Aggregate pageviews grouped by day
-        page_data = PageView.page_views_by_date(
-            project_slug=project.slug,
-        )
+        if use_rollups:
+            page_data = PageViewDailyTotal.page_views_by_date(project)
+        else:
+            page_data = PageView.page_views_by_date(project_slug=project.slug)
 
         context.update(
             {
@@ -1206,6 +1225,54 @@ class TrafficAnalyticsViewBase(ProjectAdminMixin, PrivateViewMixin, TemplateView
 
     def _get_csv_data(self):
         project = self.get_project()
+        values = [
+            ('Date', 'date'),
+            ('Version', 'version__slug'),
+            ('Path', 'path'),
+            ('Views', 'view_count'),
+        ]
+        return self._get_csv_file(
+            project=project,
+            queryset=PageView.objects.filter(project=project, status=200),
+            values=values,
+            filename='readthedocs_traffic_analytics_{project_slug}_{start}_{end}.csv',
+        )
+
+    def _get_daily_csv_data(self):
+        """Export the total page views per day, from the rollups if the project has them."""
+        project = self.get_project()
+        if self._has_rollups(project):
+            queryset = PageViewDailyTotal.objects.filter(project=project, status=200)
+            views = 'view_count'
+        else:
+            queryset = (
+                PageView.objects.filter(project=project, status=200)
+                .values('date')
+                .annotate(total_views=Sum('view_count'))
+            )
+            views = 'total_views'
+        values = [
+            ('Date', 'date'),
+            ('Views', views),
+        ]
+        return self._get_csv_file(
+            project=project,
+            queryset=queryset,
+            values=values,
+            filename='readthedocs_traffic_analytics_daily_{project_slug}_{start}_{end}.csv',
+        )
+
+    @staticmethod
+    def _has_rollups(project):
+        """Whether the page views of ``project`` were rolled up (see ``update_page_view_rollups``)."""
+        return PageViewDailyTotal.objects.filter(project=project).exists()
+
+    def _get_csv_file(self, project, queryset, values, filename):
+        """
+        Stream the rows of ``queryset`` in the retention period as a CSV file.
+
+        :param values: list of (header, field) of each column, the first field is the date.
+        """
         now = timezone.now().date()
         retention_limit = self._get_retention_days_limit(project)
         if retention_limit in [None, -1]:
@@ -1214,34 +1281,27 @@ class TrafficAnalyticsViewBase(ProjectAdminMixin, PrivateViewMixin, TemplateView
         else:
             days_ago = now - timezone.timedelta(days=retention_limit)
 
-        values = [
-            ('Date', 'date'),
-            ('Version', 'version__slug'),
-            ('Path', 'path'),
-            ('Views', 'view_count'),
-        ]
         data = []
         if self._is_enabled(project):
             data = (
-                PageView.objects.filter(
-                    project=project,
-                    date__gte=days_ago,
-                    status=200,
-                )
+                queryset.filter(date__gte=days_ago)
                 .order_by('-date')
                 .values_list(*[value for _, value in values])
+                .iterator()
             )
 
-        filename = 'readthedocs_traffic_analytics_{project_slug}_{start}_{end}.csv'.format(
+        filename = filename.format(
             project_slug=project.slug,
             start=timezone.datetime.strftime(days_ago, '%Y-%m-%d'),
             end=timezone.datetime.strftime(now, '%Y-%m-%d'),
         )
-        csv_data = [
-            [timezone.datetime.strftime(date, '%Y-%m-%d %H:%M:%S'), *rest]
-            for date, *rest in data
-        ]
-        csv_data.insert(0, [header for header, _ in values])
+        csv_data = itertools.chain(
+            [[header for header, _ in values]],
+            (
+                [timezone.datetime.strftime(date, '%Y-%m-%d %H:%M:%S'), *rest]
+                for date, *rest in data
+            ),
+        )
         return get_csv_file(filename=filename, csv_data=csv_data)
 
     def _get_retention_days_limit(self, project):
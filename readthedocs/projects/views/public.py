@@ -29,7 +29,6 @@ from readthedocs.core.permissions import AdminPermission
 from readthedocs.core.utils.extend import SettingsOverrideObject
 from readthedocs.projects.filters import ProjectVersionListFilterSet
 from readthedocs.projects.models import Project
-from readthedocs.projects.templatetags.projects_tags import sort_version_aware
 from readthedocs.projects.views.mixins import ProjectRelationListMixin
 from readthedocs.proxito.views.mixins import ServeDocsMixin
 from readthedocs.proxito.views.utils import _get_project_data_from_request
@@ -288,8 +287,10 @@ def project_downloads(request, project_slug):
         Project.objects.public(request.user),
         slug=project_slug,
     )
-    versions = Version.internal.public(user=request.user, project=project)
-    versions = sort_version_aware(versions)
+    versions = (
+        Version.internal.public(user=request.user, project=project)
+        .order_by_version(project.repo_type)
+    )
     version_data = OrderedDict()
     for version in versions:
         data = version.get_downloads()
@@ -0,0 +1,168 @@
+"""
+Cache for the host to project resolution done by the proxito middleware.
+
+Every request served by proxito needs to map its host to a project,
+which requires a couple of queries to the database.
+The result of this resolution rarely changes,
+so we store it in Django's cache keyed by host,
+and invalidate it when a ``Domain``, ``Project`` or ``ProjectRelationship`` changes
+(see ``readthedocs.proxito.signals``).
+Hosts that don't map to any project are only cached for ``RTD_PROXITO_HOST_NEGATIVE_CACHE_TIMEOUT``,
+so requests with random hosts don't fill the cache and evict the other entries.
+
+The rendered ``sitemap.xml`` of each project is also stored here,
+it's invalidated when a build finishes or the versions of the project change.
+"""
+
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+
+log = structlog.get_logger(__name__)  # noqa
+
+HOST_CACHE_KEY_PREFIX = 'proxito-host'
+SLUG_CACHE_KEY_PREFIX = 'proxito-slug'
+SITEMAP_CACHE_KEY_PREFIX = 'proxito-sitemap'
+
+
+def get_host_cache_key(host):
+    return f'{HOST_CACHE_KEY_PREFIX}:{host.lower()}'
+
+
+def get_slug_cache_key(project_slug):
+    return f'{SLUG_CACHE_KEY_PREFIX}:{project_slug.lower()}'
+
+
+def get_sitemap_cache_key(project_id):
+    return f'{SITEMAP_CACHE_KEY_PREFIX}:{project_id}'
+
+
+def get_public_domain_host(project_slug):
+    """
+    Return the host used to serve ``project_slug`` from the ``PUBLIC_DOMAIN``.
+
+    :returns: the host or ``None`` if ``PUBLIC_DOMAIN`` isn't set.
+    """
+    if not settings.PUBLIC_DOMAIN or not project_slug:
+        return None
+    public_domain = settings.PUBLIC_DOMAIN.lower().split(':')[0]
+    return f'{project_slug}.{public_domain}'
+
+
+def get_host_resolution(host):
+    """
+    Return the cached resolution for ``host``.
+
+    The resolution is a dictionary with the following keys:
+
+    - ``project_slug``: slug of the project served from this host,
+      ``None`` if the host doesn't map to any project.
+    - ``subdomain``: the host is a subdomain of the ``PUBLIC_DOMAIN``.
+    - ``cname``: the host is a custom domain.
+    - ``canonicalize``: reason to redirect to the canonical domain, if any.
+    - ``domain_id``: ID of the ``Domain`` object (only for custom domains).
+    - ``domain_https``: the custom domain should be served over HTTPS.
+
+    :returns: the resolution or ``None`` if it isn't cached.
+    """
+    return cache.get(get_host_cache_key(host))
+
+
+def set_host_resolution(host, resolution, found=True):
+    """
+    Cache the resolution of ``host``.
+
+    :param found: ``False`` if the host doesn't map to an existing project.
+    """
+    cache.set(
+        get_host_cache_key(host),
+        resolution,
+        timeout=_get_timeout(found=found),
+    )
+
+
+def get_project_slug_exists(project_slug):
+    """
+    Return if a project with ``project_slug`` exists, as stored in the cache.
+
+    :returns: ``True``/``False``, or ``None`` if it isn't cached.
+    """
+    return cache.get(get_slug_cache_key(project_slug))
+
+
+def set_project_slug_exists(project_slug, exists):
+    cache.set(
+        get_slug_cache_key(project_slug),
+        exists,
+        timeout=_get_timeout(found=exists),
+    )
+
+
+def _get_timeout(found):
+    if found:
+        return settings.RTD_PROXITO_HOST_CACHE_TIMEOUT
+    return settings.RTD_PROXITO_HOST_NEGATIVE_CACHE_TIMEOUT
+
+
+def invalidate_hosts(hosts):
+    """Remove the cached resolution of all ``hosts``."""
+    hosts = [host for host in hosts if host]
+    keys = [get_host_cache_key(host) for host in hosts]
+    if keys:
+        log.debug('Invalidating proxito host cache.', hosts=hosts)
+        cache.delete_many(keys)
+
+
+def invalidate_project(project):
+    """
+    Remove all cached resolutions that depend on ``project``.
+
+    This includes the project slug, its subdomain on the ``PUBLIC_DOMAIN``,
+    and all of its custom domains.
+    """
+    hosts = []
+    if project.pk:
+        hosts.extend(project.domains.values_list('domain', flat=True))
+    invalidate_hosts(hosts)
+    invalidate_project_slug(project.slug)
+
+
+def invalidate_project_slug(project_slug):
+    """Remove the cached resolutions of ``project_slug`` and its subdomain."""
+    invalidate_hosts([get_public_domain_host(project_slug)])
+    if project_slug:
+        cache.delete(get_slug_cache_key(project_slug))
+
+
+def get_sitemap(project):
+    """
+    Return the cached ``sitemap.xml`` of ``project``.
+
+    :returns: the content of the sitemap as bytes or ``None`` if it isn't cached.
+    """
+    return cache.get(get_sitemap_cache_key(project.pk))
+
+
+def set_sitemap(project, content):
+    cache.set(
+        get_sitemap_cache_key(project.pk),
+        content,
+        timeout=settings.RTD_SITEMAP_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_sitemap(*project_ids):
+    """
+    Remove the cached ``sitemap.xml`` of all ``project_ids``.
+
+    Callers should include the main language project of a translation,
+    since the sitemap of the main project lists the versions of its translations.
+    """
+    keys = [
+        get_sitemap_cache_key(project_id)
+        for project_id in project_ids
+        if project_id
+    ]
+    if keys:
+        log.debug('Invalidating sitemap cache.', project_ids=project_ids)
+        cache.delete_many(keys)
@@ -11,13 +11,15 @@ from urllib.parse import urlparse
 
 import structlog
 from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
 
 from readthedocs.core.utils import get_cache_tag
 from readthedocs.projects.models import Domain, Project, ProjectRelationship
-from readthedocs.proxito import constants
+from readthedocs.proxito import cache, constants
 
 log = structlog.get_logger(__name__)  # noqa
 
@@ -51,7 +53,7 @@ def map_host_to_project_slug(request):  # pylint: disable=too-many-return-statem
     # Explicit Project slug being passed in
     if 'HTTP_X_RTD_SLUG' in request.META:
         project_slug = request.META['HTTP_X_RTD_SLUG'].lower()
-        if Project.objects.filter(slug=project_slug).exists():
+        if _project_slug_exists(project_slug):
             request.rtdheader = True
             log.info('Setting project based on X_RTD_SLUG header.', project_slug=project_slug)
             return project_slug
@@ -59,21 +61,16 @@ def map_host_to_project_slug(request):  # pylint: disable=too-many-return-statem
     if public_domain in host or host == 'proxito':
         # Serve from the PUBLIC_DOMAIN, ensuring it looks like `foo.PUBLIC_DOMAIN`
         if public_domain_parts == host_parts[1:]:
-            project_slug = host_parts[0]
+            resolution = _resolve_public_domain_host(host, project_slug=host_parts[0])
+            project_slug = resolution['project_slug']
             request.subdomain = True
             log.debug('Proxito Public Domain.', host=host)
-            if Domain.objects.filter(project__slug=project_slug).filter(
-                canonical=True,
-                https=True,
-            ).exists():
+            if resolution['canonicalize'] == constants.REDIRECT_CANONICAL_CNAME:
                 log.debug('Proxito Public Domain -> Canonical Domain Redirect.', host=host)
-                request.canonicalize = constants.REDIRECT_CANONICAL_CNAME
-            elif (
-                ProjectRelationship.objects.
-                filter(child__slug=project_slug).exists()
-            ):
+                request.canonicalize = resolution['canonicalize']
+            elif resolution['canonicalize'] == constants.REDIRECT_SUBPROJECT_MAIN_DOMAIN:
                 log.debug('Proxito Public Domain -> Subproject Main Domain Redirect.', host=host)
-                request.canonicalize = constants.REDIRECT_SUBPROJECT_MAIN_DOMAIN
+                request.canonicalize = resolution['canonicalize']
             return project_slug
 
         # TODO: This can catch some possibly valid domains (docs.readthedocs.io.com) for example
@@ -99,14 +96,14 @@ def map_host_to_project_slug(request):  # pylint: disable=too-many-return-statem
                 )
 
     # Serve CNAMEs
-    domain = Domain.objects.filter(domain=host).first()
-    if domain:
-        project_slug = domain.project.slug
+    resolution = _resolve_custom_domain_host(host)
+    if resolution['cname']:
+        project_slug = resolution['project_slug']
         request.cname = True
-        request.domain = domain
+        request.domain = _get_lazy_domain(resolution['domain_id'])
         log.debug('Proxito CNAME.', host=host)
 
-        if domain.https and not request.is_secure():
+        if resolution['domain_https'] and not request.is_secure():
             # Redirect HTTP -> HTTPS (302) for this custom domain
             log.debug('Proxito CNAME HTTPS Redirect.', host=host)
             request.canonicalize = constants.REDIRECT_HTTPS
@@ -123,6 +120,96 @@ def map_host_to_project_slug(request):  # pylint: disable=too-many-return-statem
     )
 
 
+def _project_slug_exists(project_slug):
+    exists = cache.get_project_slug_exists(project_slug)
+    if exists is None:
+        exists = Project.objects.filter(slug=project_slug).exists()
+        cache.set_project_slug_exists(project_slug, exists)
+    return exists
+
+
+def _resolve_public_domain_host(host, project_slug):
+    """
+    Resolve a host from the ``PUBLIC_DOMAIN`` (``project.PUBLIC_DOMAIN``).
+
+    The result is cached, see ``readthedocs.proxito.cache.get_host_resolution``.
+    """
+    resolution = cache.get_host_resolution(host)
+    if resolution is not None:
+        return resolution
+
+    # A single query tells if the project exists and how to canonicalize its host.
+    project = (
+        Project.objects.filter(slug=project_slug)
+        .annotate(
+            has_canonical_domain=Exists(
+                Domain.objects.filter(project=OuterRef('pk'), canonical=True, https=True),
+            ),
+            is_subproject=Exists(
+                ProjectRelationship.objects.filter(child=OuterRef('pk')),
+            ),
+        )
+        .values('has_canonical_domain', 'is_subproject')
+        .first()
+    )
+    canonicalize = None
+    if project and project['has_canonical_domain']:
+        canonicalize = constants.REDIRECT_CANONICAL_CNAME
+    elif project and project['is_subproject']:
+        canonicalize = constants.REDIRECT_SUBPROJECT_MAIN_DOMAIN
+
+    resolution = {
+        'project_slug': project_slug,
+        'subdomain': True,
+        'cname': False,
+        'canonicalize': canonicalize,
+        'domain_id': None,
+        'domain_https': False,
+    }
+    cache.set_host_resolution(host, resolution, found=bool(project))
+    return resolution
+
+
+def _resolve_custom_domain_host(host):
+    """
+    Resolve a host that could be a custom domain.
+
+    Hosts that don't match any domain are cached as well,
+    so we don't hit the database for every request of a misconfigured CNAME.
+    The result is cached, see ``readthedocs.proxito.cache.get_host_resolution``.
+    """
+    resolution = cache.get_host_resolution(host)
+    if resolution is not None:
+        return resolution
+
+    domain = (
+        Domain.objects.filter(domain=host)
+        .select_related('project')
+        .only('id', 'https', 'project__slug')
+        .first()
+    )
+    resolution = {
+        'project_slug': domain.project.slug if domain else None,
+        'subdomain': False,
+        'cname': bool(domain),
+        'canonicalize': None,
+        'domain_id': domain.pk if domain else None,
+        'domain_https': domain.https if domain else False,
+    }
+    cache.set_host_resolution(host, resolution, found=bool(domain))
+    return resolution
+
+
+def _get_lazy_domain(domain_id):
+    """
+    Return the ``Domain`` object with ``domain_id``, fetched from the DB only when used.
+
+    Most requests don't need to access the domain object (only its ID was cached),
+    it's only required when adding the HSTS and custom HTTP headers to the response.
+    """
+    return SimpleLazyObject(lambda: Domain.objects.get(pk=domain_id))
+
+
 class ProxitoMiddleware(MiddlewareMixin):
 
     """The actual middleware we'll be using in prod."""
@@ -0,0 +1,90 @@
+"""Invalidate the proxito caches when their inputs change."""
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from readthedocs.builds.constants import BUILD_STATE_FINISHED
+from readthedocs.builds.models import Build, Version
+from readthedocs.projects.models import Domain, Project, ProjectRelationship
+from readthedocs.proxito.cache import (
+    get_public_domain_host,
+    invalidate_hosts,
+    invalidate_project,
+    invalidate_project_slug,
+    invalidate_sitemap,
+)
+
+
+def _get_previous_value(instance, field):
+    """Return the value of ``field`` stored in the database, ``None`` for new objects."""
+    if not instance.pk:
+        return None
+    return (
+        type(instance).objects.filter(pk=instance.pk)
+        .values_list(field, flat=True)
+        .first()
+    )
+
+
+@receiver(pre_save, sender=Domain)
+def track_previous_domain(instance, *args, **kwargs):
+    """Keep the previous domain, its cached resolution is invalidated after saving."""
+    instance._previous_domain = _get_previous_value(instance, 'domain')
+
+
+@receiver(pre_save, sender=Project)
+def track_previous_project_slug(instance, *args, **kwargs):
+    """Keep the previous slug, its cached resolutions are invalidated after saving."""
+    instance._previous_slug = _get_previous_value(instance, 'slug')
+
+
+@receiver(post_save, sender=Domain)
+@receiver(pre_delete, sender=Domain)
+def invalidate_domain_hosts(instance, *args, **kwargs):
+    """
+    Invalidate the custom domain and the subdomain of its project.
+
+    The subdomain depends on the domain since a canonical domain
+    makes the subdomain redirect to it.
+    """
+    hosts = [instance.domain, getattr(instance, '_previous_domain', None)]
+    if instance.project_id:
+        hosts.append(get_public_domain_host(instance.project.slug))
+    invalidate_hosts(hosts)
+    # The URLs of the sitemap use the canonical domain.
+    invalidate_sitemap(instance.project_id)
+
+
+@receiver(post_save, sender=Project)
+@receiver(pre_delete, sender=Project)
+def invalidate_project_hosts(instance, *args, **kwargs):
+    invalidate_project(instance)
+    previous_slug = getattr(instance, '_previous_slug', None)
+    if previous_slug and previous_slug != instance.slug:
+        invalidate_project_slug(previous_slug)
+    invalidate_sitemap(instance.pk, instance.main_language_project_id)
+
+
+@receiver(post_save, sender=ProjectRelationship)
+@receiver(pre_delete, sender=ProjectRelationship)
+def invalidate_subproject_hosts(instance, *args, **kwargs):
+    """Invalidate the subdomain of the child, it redirects to the main domain if it's a subproject."""
+    if instance.child_id:
+        invalidate_hosts([get_public_domain_host(instance.child.slug)])
+
+
+@receiver(post_save, sender=Version)
+@receiver(post_delete, sender=Version)
+def invalidate_version_sitemap(instance, *args, **kwargs):
+    """Invalidate the sitemap of the project and of its main project if it's a translation."""
+    invalidate_sitemap(
+        instance.project_id,
+        instance.project.main_language_project_id,
+    )
+
+
+@receiver(post_save, sender=Build)
+def invalidate_build_sitemap(instance, *args, **kwargs):
+    """Invalidate the sitemap when a build finishes, it includes the date of the last build."""
+    if instance.state == BUILD_STATE_FINISHED:
+        invalidate_sitemap(instance.project_id)
@@ -1,5 +1,6 @@
 import os
 from textwrap import dedent
+from xml.etree import ElementTree
 from unittest import mock
 
 import django_dynamic_fixture as fixture
@@ -13,7 +14,7 @@ from django_dynamic_fixture import get
 from readthedocs.analytics.models import PageView
 from readthedocs.audit.models import AuditLog
 from readthedocs.builds.constants import EXTERNAL, INTERNAL, LATEST
-from readthedocs.builds.models import Version
+from readthedocs.builds.models import Build, Version
 from readthedocs.organizations.models import Organization
 from readthedocs.projects import constants
 from readthedocs.projects.constants import (
@@ -1070,66 +1071,126 @@ class TestAdditionalDocViews(BaseDocServing):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/xml')
+        content = b''.join(response.streaming_content).decode()
         for version in self.project.versions(manager=INTERNAL).filter(privacy_level=constants.PUBLIC):
-            self.assertContains(
-                response,
+            self.assertIn(
                 self.project.get_docs_url(
                     version_slug=version.slug,
                     lang_slug=self.project.language,
                 ),
+                content,
             )
 
         # PRIVATE version should not appear here
-        self.assertNotContains(
-            response,
+        self.assertNotIn(
             self.project.get_docs_url(
                 version_slug=private_version.slug,
                 lang_slug=self.project.language,
             ),
+            content,
         )
         # The `translation` project doesn't have a version named `not-translated-version`
         # so, the sitemap should not have a doc url for
         # `not-translated-version` with `translation-es` language.
         # ie: http://project.readthedocs.io/translation-es/not-translated-version/
-        self.assertNotContains(
-            response,
+        self.assertNotIn(
             self.project.get_docs_url(
                 version_slug=not_translated_public_version.slug,
                 lang_slug=translation.language,
             ),
+            content,
         )
         # hreflang should use hyphen instead of underscore
         # in language and country value. (zh_CN should be zh-CN)
-        self.assertContains(response, 'zh-CN')
+        self.assertIn('zh-CN', content)
 
         # External Versions should not be in the sitemap_xml.
-        self.assertNotContains(
-            response,
+        self.assertNotIn(
             self.project.get_docs_url(
                 version_slug=external_version.slug,
                 lang_slug=self.project.language,
             ),
+            content,
         )
 
+        namespaces = {'sitemap': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
+        urls = ElementTree.fromstring(content).findall('sitemap:url', namespaces)
+
         # Check if STABLE version has 'priority of 1 and changefreq of weekly.
         self.assertEqual(
-            response.context['versions'][0]['loc'],
+            urls[0].find('sitemap:loc', namespaces).text,
             self.project.get_docs_url(
                 version_slug=stable_version.slug,
                 lang_slug=self.project.language,
             ),)
-        self.assertEqual(response.context['versions'][0]['priority'], 1)
-        self.assertEqual(response.context['versions'][0]['changefreq'], 'weekly')
+        self.assertEqual(urls[0].find('sitemap:priority', namespaces).text, '1')
+        self.assertEqual(urls[0].find('sitemap:changefreq', namespaces).text, 'weekly')
 
         # Check if LATEST version has priority of 0.9 and changefreq of daily.
         self.assertEqual(
-            response.context['versions'][1]['loc'],
+            urls[1].find('sitemap:loc', namespaces).text,
             self.project.get_docs_url(
                 version_slug='latest',
                 lang_slug=self.project.language,
             ),)
-        self.assertEqual(response.context['versions'][1]['priority'], 0.9)
-        self.assertEqual(response.context['versions'][1]['changefreq'], 'daily')
+        self.assertEqual(urls[1].find('sitemap:priority', namespaces).text, '0.9')
+        self.assertEqual(urls[1].find('sitemap:changefreq', namespaces).text, 'daily')
+
+    def test_sitemap_xml_queries_and_cache(self):
+        self.project.versions.update(active=True)
+        for i in range(10):
+            version = fixture.get(
+                Version,
+                slug=f'1.{i}',
+                verbose_name=f'1.{i}',
+                privacy_level=constants.PUBLIC,
+                project=self.project,
+                active=True,
+            )
+            fixture.get(Build, version=version, project=self.project)
+        for language in ('es', 'de'):
+            fixture.get(
+                Project,
+                main_language_project=self.project,
+                language=language,
+                privacy_level=constants.PUBLIC,
+            ).versions.update(privacy_level=constants.PUBLIC)
+
+        # The number of queries doesn't depend on the number of versions and translations.
+        with self.assertNumQueries(8):
+            response = self.client.get(
+                reverse('sitemap_xml'),
+                HTTP_HOST='project.readthedocs.io',
+            )
+            content = b''.join(response.streaming_content)
+        self.assertEqual(content.count(b'<url>'), 11)
+        self.assertEqual(content.count(b'<lastmod>'), 10)
+        self.assertIn(b'hreflang="de"', content)
+
+        # The second response is served from the cache,
+        # only the project is fetched from the database.
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('sitemap_xml'),
+                HTTP_HOST='project.readthedocs.io',
+            )
+        self.assertEqual(response.content, content)
+        self.assertEqual(response['Content-Type'], 'application/xml')
+
+        # A new version invalidates the cache.
+        fixture.get(
+            Version,
+            slug='2.0',
+            verbose_name='2.0',
+            privacy_level=constants.PUBLIC,
+            project=self.project,
+            active=True,
+        )
+        response = self.client.get(
+            reverse('sitemap_xml'),
+            HTTP_HOST='project.readthedocs.io',
+        )
+        self.assertIn(b'/en/2.0/', b''.join(response.streaming_content))
 
     def test_sitemap_all_private_versions(self):
         self.project.versions.update(active=True, built=True, privacy_level=constants.PRIVATE)
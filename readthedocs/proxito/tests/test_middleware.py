@@ -1,5 +1,7 @@
 # Copied from test_middleware.py
 
+from unittest import mock
+
 import pytest
 from django.http import HttpRequest
 from django.test import TestCase
@@ -9,7 +11,7 @@ from django_dynamic_fixture import get
 from readthedocs.builds.models import Version
 from readthedocs.projects.constants import PUBLIC
 from readthedocs.projects.models import Domain, Project, ProjectRelationship
-from readthedocs.proxito.middleware import ProxitoMiddleware
+from readthedocs.proxito.middleware import ProxitoMiddleware, map_host_to_project_slug
 from readthedocs.rtd_tests.base import RequestFactoryTestMixin
 from readthedocs.rtd_tests.utils import create_user
 
@@ -395,3 +397,164 @@ class MiddlewareURLConfSubprojectTests(TestCase):
             resp['X-Accel-Redirect'],
             '/proxito/media/html/subproject/testing/foodex.html',
         )
+
+
+@pytest.mark.proxito
+@override_settings(PUBLIC_DOMAIN='dev.readthedocs.io')
+class MiddlewareHostCacheTests(RequestFactoryTestMixin, TestCase):
+
+    def setUp(self):
+        self.owner = create_user(username='owner', password='test')
+        self.pip = get(
+            Project,
+            slug='pip',
+            users=[self.owner],
+            privacy_level=PUBLIC,
+        )
+
+    def resolve(self, host, num_queries=None, **kwargs):
+        request = self.request(method='get', path='/', HTTP_HOST=host, **kwargs)
+        if num_queries is None:
+            return request, map_host_to_project_slug(request)
+        with self.assertNumQueries(num_queries):
+            return request, map_host_to_project_slug(request)
+
+    def test_subdomain_queries_are_cached(self):
+        # Without cache: one query for the project, its canonical domain,
+        # and its subproject relationship.
+        request, slug = self.resolve('pip.dev.readthedocs.io', num_queries=1)
+        self.assertEqual(slug, 'pip')
+        self.assertTrue(request.subdomain)
+
+        request, slug = self.resolve('pip.dev.readthedocs.io', num_queries=0)
+        self.assertEqual(slug, 'pip')
+        self.assertTrue(request.subdomain)
+        self.assertFalse(hasattr(request, 'canonicalize'))
+
+    def test_cname_queries_are_cached(self):
+        domain = get(Domain, project=self.pip, domain='docs.random.com', https=True)
+
+        request, slug = self.resolve('docs.random.com', num_queries=1)
+        self.assertEqual(slug, 'pip')
+        self.assertEqual(request.canonicalize, 'https')
+
+        request, slug = self.resolve('docs.random.com', num_queries=0)
+        self.assertEqual(slug, 'pip')
+        self.assertTrue(request.cname)
+        self.assertEqual(request.canonicalize, 'https')
+
+        # The domain object is only fetched when it's used.
+        with self.assertNumQueries(1):
+            self.assertEqual(request.domain.pk, domain.pk)
+
+        # The redirect to HTTPS depends on the request, not on the cache.
+        request, slug = self.resolve('docs.random.com', secure=True, num_queries=0)
+        self.assertFalse(hasattr(request, 'canonicalize'))
+
+    def test_unknown_cname_is_cached(self):
+        _, response = self.resolve('docs.random.com', num_queries=1)
+        self.assertEqual(response.status_code, 404)
+
+        _, response = self.resolve('docs.random.com', num_queries=0)
+        self.assertEqual(response.status_code, 404)
+
+        # Creating the domain invalidates the cache.
+        get(Domain, project=self.pip, domain='docs.random.com')
+        request, slug = self.resolve('docs.random.com', num_queries=1)
+        self.assertEqual(slug, 'pip')
+        self.assertTrue(request.cname)
+
+    @mock.patch('readthedocs.proxito.cache.cache')
+    @override_settings(
+        RTD_PROXITO_HOST_CACHE_TIMEOUT=60 * 60,
+        RTD_PROXITO_HOST_NEGATIVE_CACHE_TIMEOUT=60,
+    )
+    def test_unknown_hosts_are_cached_for_a_short_time(self, cache):
+        cache.get.return_value = None
+        get(Domain, project=self.pip, domain='docs.random.com')
+
+        self.resolve('docs.random.com')
+        self.assertEqual(cache.set.call_args[1]['timeout'], 60 * 60)
+
+        self.resolve('unknown.random.com')
+        self.assertEqual(cache.set.call_args[1]['timeout'], 60)
+
+        self.resolve('unknown.dev.readthedocs.io')
+        self.assertEqual(cache.set.call_args[1]['timeout'], 60)
+
+    def test_rtd_slug_header_is_cached(self):
+        request, slug = self.resolve('proxito', HTTP_X_RTD_SLUG='pip', num_queries=1)
+        self.assertEqual(slug, 'pip')
+        self.assertTrue(request.rtdheader)
+
+        request, slug = self.resolve('proxito', HTTP_X_RTD_SLUG='pip', num_queries=0)
+        self.assertEqual(slug, 'pip')
+        self.assertTrue(request.rtdheader)
+
+    def test_invalidate_on_domain_change(self):
+        domain = get(Domain, project=self.pip, domain='docs.random.com')
+        request, _ = self.resolve('pip.dev.readthedocs.io')
+        self.assertFalse(hasattr(request, 'canonicalize'))
+        request, _ = self.resolve('docs.random.com')
+        self.assertFalse(hasattr(request, 'canonicalize'))
+
+        domain.canonical = True
+        domain.https = True
+        domain.save()
+
+        request, _ = self.resolve('pip.dev.readthedocs.io')
+        self.assertEqual(request.canonicalize, 'canonical-cname')
+        request, _ = self.resolve('docs.random.com')
+        self.assertEqual(request.canonicalize, 'https')
+
+        domain.delete()
+        request, _ = self.resolve('pip.dev.readthedocs.io')
+        self.assertFalse(hasattr(request, 'canonicalize'))
+        _, response = self.resolve('docs.random.com')
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalidate_on_project_relationship_change(self):
+        subproject = get(Project, slug='subproject', users=[self.owner])
+        request, _ = self.resolve('subproject.dev.readthedocs.io')
+        self.assertFalse(hasattr(request, 'canonicalize'))
+
+        relationship = get(ProjectRelationship, parent=self.pip, child=subproject)
+        request, _ = self.resolve('subproject.dev.readthedocs.io')
+        self.assertEqual(request.canonicalize, 'subproject-main-domain')
+
+        relationship.delete()
+        request, _ = self.resolve('subproject.dev.readthedocs.io')
+        self.assertFalse(hasattr(request, 'canonicalize'))
+
+    def test_invalidate_on_project_delete(self):
+        get(Domain, project=self.pip, domain='docs.random.com')
+        request, slug = self.resolve('docs.random.com')
+        self.assertEqual(slug, 'pip')
+        request, _ = self.resolve('proxito', HTTP_X_RTD_SLUG='pip')
+        self.assertTrue(request.rtdheader)
+
+        self.pip.delete()
+
+        _, response = self.resolve('docs.random.com')
+        self.assertEqual(response.status_code, 404)
+        request, _ = self.resolve('proxito', HTTP_X_RTD_SLUG='pip')
+        self.assertFalse(hasattr(request, 'rtdheader'))
+
+    def test_invalidate_previous_values_on_rename(self):
+        domain = get(Domain, project=self.pip, domain='docs.random.com')
+        request, slug = self.resolve('docs.random.com')
+        self.assertEqual(slug, 'pip')
+        request, _ = self.resolve('proxito', HTTP_X_RTD_SLUG='pip')
+        self.assertTrue(request.rtdheader)
+
+        domain.domain = 'docs.other.com'
+        domain.save()
+        _, response = self.resolve('docs.random.com')
+        self.assertEqual(response.status_code, 404)
+
+        self.pip.slug = 'pip-renamed'
+        self.pip.save()
+        request, _ = self.resolve('proxito', HTTP_X_RTD_SLUG='pip')
+        self.assertFalse(hasattr(request, 'rtdheader'))
+        request, _ = self.resolve('proxito', HTTP_X_RTD_SLUG='pip-renamed')
+        self.assertTrue(request.rtdheader)
@@ -19,6 +19,7 @@ from readthedocs.builds.constants import EXTERNAL, INTERNAL
 from readthedocs.core.resolver import resolve
 from readthedocs.proxito.constants import REDIRECT_CANONICAL_CNAME, REDIRECT_HTTPS
 from readthedocs.redirects.exceptions import InfiniteRedirectException
+from readthedocs.redirects.matcher import get_redirect_matcher
 from readthedocs.storage import build_media_storage, staticfiles_storage
 
 log = structlog.get_logger(__name__)  # noqa
@@ -89,6 +90,7 @@ class ServeDocsMixin:
                 user=request.user,
                 request=request,
                 project=project,
+                defer=True,
             )
 
     def _is_audit_enabled(self, project):
@@ -269,12 +271,13 @@ class ServeRedirectMixin:
         :returns: the path to redirect the request and its status code
         :rtype: tuple
         """
-        redirect_path, http_status = project.redirects.get_redirect_path_with_status(
+        redirect_path, http_status = get_redirect_matcher(project).get_redirect_path_with_status(
             language=lang_slug,
             version_slug=version_slug,
             path=filename,
             full_path=full_path,
             forced_only=forced_only,
+            project=project,
         )
         return redirect_path, http_status
 
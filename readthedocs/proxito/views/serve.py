@@ -1,12 +1,21 @@
 """Views for doc serving."""
 import itertools
+from collections import defaultdict
 from urllib.parse import urlparse
 
 import structlog
 from django.conf import settings
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.db.models import Max, Prefetch, prefetch_related_objects
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
+from django.template.loader import get_template
 from django.urls import resolve as url_resolve
+from django.utils.cache import patch_response_headers
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.cache import cache_page
@@ -20,8 +29,8 @@ from readthedocs.core.resolver import resolve_path
 from readthedocs.core.utils.extend import SettingsOverrideObject
 from readthedocs.projects import constants
 from readthedocs.projects.constants import SPHINX_HTMLDIR
-from readthedocs.projects.models import Feature
-from readthedocs.projects.templatetags.projects_tags import sort_version_aware
+from readthedocs.projects.models import Domain, Feature, ProjectRelationship
+from readthedocs.proxito.cache import get_sitemap, set_sitemap
 from readthedocs.redirects.exceptions import InfiniteRedirectException
 from readthedocs.storage import build_media_storage, staticfiles_storage
 
@@ -31,6 +40,13 @@ from .utils import _get_project_data_from_request
 
 log = structlog.get_logger(__name__)  # noqa
 
+SITEMAP_HEADER = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"\n'
+    b'        xmlns:xhtml="http://www.w3.org/1999/xhtml">\n'
+)
+SITEMAP_FOOTER = b'</urlset>\n'
+
 
 class ServePageRedirect(CDNCacheControlMixin, ServeRedirectMixin, ServeDocsMixin, View):
 
@@ -531,7 +547,6 @@ class ServeRobotsTXT(SettingsOverrideObject):
 class ServeSitemapXMLBase(View):
 
     @method_decorator(map_project_slug)
-    @method_decorator(cache_page(60 * 60 * 12))  # 12 hours
     def get(self, request, project):
         """
         Generate and serve a ``sitemap.xml`` for a particular ``project``.
@@ -549,9 +564,13 @@ class ServeSitemapXMLBase(View):
         :param request: Django request object
         :param project: Project instance to generate the sitemap
 
-        :returns: response with the ``sitemap.xml`` template rendered
+        The sitemap is streamed as it's rendered, and cached per project
+        until a build finishes or the versions of the project change
+        (see ``readthedocs.proxito.signals``).
+
+        :returns: response with the ``sitemap.xml`` rendered
 
-        :rtype: django.http.HttpResponse
+        :rtype: django.http.StreamingHttpResponse
         """
         # pylint: disable=too-many-locals
 
@@ -590,15 +609,28 @@ class ServeSitemapXMLBase(View):
             changefreqs = ['weekly', 'daily']
             yield from itertools.chain(changefreqs, itertools.repeat('monthly'))
 
-        public_versions = Version.internal.public(
-            project=project,
-            only_active=True,
+        cached_sitemap = get_sitemap(project)
+        if cached_sitemap is not None:
+            response = HttpResponse(cached_sitemap, content_type='application/xml')
+            patch_response_headers(response, cache_timeout=settings.RTD_SITEMAP_CACHE_TIMEOUT)
+            return response
+
+        # The date of the last build of each version is annotated,
+        # instead of querying the builds of each version.
+        public_versions = (
+            Version.internal.public(
+                project=project,
+                only_active=True,
+            )
+            .annotate(last_build_date=Max('builds__date'))
+            .order_by_version(project.repo_type)
         )
-        if not public_versions.exists():
+        sorted_versions = list(public_versions)
+        for version in sorted_versions:
+            version.project = project
+        if not sorted_versions:
             raise Http404
 
-        sorted_versions = sort_version_aware(public_versions)
-
         # This is a hack to swap the latest version with
         # stable version to get the stable version first in the sitemap.
         # We want stable with priority=1 and changefreq='weekly' and
@@ -608,58 +640,95 @@ class ServeSitemapXMLBase(View):
                 sorted_versions[1].slug == STABLE):
             sorted_versions[0], sorted_versions[1] = sorted_versions[1], sorted_versions[0]
 
-        versions = []
-        for version, priority, changefreq in zip(
-                sorted_versions,
-                priorities_generator(),
-                changefreqs_generator(),
-        ):
-            element = {
-                'loc': version.get_subdomain_url(),
-                'priority': priority,
-                'changefreq': changefreq,
-                'languages': [],
-            }
-
-            # Version can be enabled, but not ``built`` yet. We want to show the
-            # link without a ``lastmod`` attribute
-            last_build = version.builds.order_by('-date').first()
-            if last_build:
-                element['lastmod'] = last_build.date.isoformat()
-
-            if project.translations.exists():
-                for translation in project.translations.all():
-                    translation_versions = (
-                        Version.internal.public(project=translation
-                                                ).values_list('slug', flat=True)
-                    )
-                    if version.slug in translation_versions:
-                        href = project.get_docs_url(
-                            version_slug=version.slug,
-                            lang_slug=translation.language,
-                        )
-                        element['languages'].append({
-                            'hreflang': hreflang_formatter(translation.language),
-                            'href': href,
-                        })
-
-                # Add itself also as protocol requires
-                element['languages'].append({
-                    'hreflang': project.language,
-                    'href': element['loc'],
-                })
-
-            versions.append(element)
+        # Avoid querying the canonical domain and the superprojects
+        # of the project each time a URL is resolved.
+        prefetch_related_objects(
+            [project],
+            Prefetch(
+                'superprojects',
+                ProjectRelationship.objects.all().select_related('parent'),
+                to_attr='_superprojects',
+            ),
+            Prefetch(
+                'domains',
+                Domain.objects.filter(canonical=True),
+                to_attr='_canonical_domains',
+            ),
+        )
 
-        context = {
-            'versions': versions,
-        }
-        return render(
-            request,
-            'sitemap.xml',
-            context,
+        # Slugs of the public versions of each translation, loaded in a single query.
+        translations = list(project.translations.all())
+        translation_slugs = defaultdict(set)
+        if translations:
+            translation_versions = (
+                Version.internal.public(only_active=True)
+                .filter(project__in=translations)
+                .values_list('project_id', 'slug')
+            )
+            for project_id, slug in translation_versions:
+                translation_slugs[project_id].add(slug)
+
+        def versions_generator():
+            for version, priority, changefreq in zip(
+                    sorted_versions,
+                    priorities_generator(),
+                    changefreqs_generator(),
+            ):
+                element = {
+                    'loc': version.get_subdomain_url(),
+                    'priority': priority,
+                    'changefreq': changefreq,
+                    'languages': [],
+                }
+
+                # Version can be enabled, but not ``built`` yet. We want to show the
+                # link without a ``lastmod`` attribute
+                if version.last_build_date:
+                    element['lastmod'] = version.last_build_date.isoformat()
+
+                if translations:
+                    for translation in translations:
+                        if version.slug in translation_slugs[translation.pk]:
+                            href = project.get_docs_url(
+                                version_slug=version.slug,
+                                lang_slug=translation.language,
+                            )
+                            element['languages'].append({
+                                'hreflang': hreflang_formatter(translation.language),
+                                'href': href,
+                            })
+
+                    # Add itself also as protocol requires
+                    element['languages'].append({
+                        'hreflang': project.language,
+                        'href': element['loc'],
+                    })
+
+                yield element
+
+        def sitemap_generator():
+            """
+            Render the sitemap one URL at a time.
+
+            The rendered sitemap is cached after the last chunk is generated.
+            """
+            url_template = get_template('sitemap_url.xml')
+            chunks = [SITEMAP_HEADER]
+            yield SITEMAP_HEADER
+            for element in versions_generator():
+                chunk = url_template.render({'version': element}).encode()
+                chunks.append(chunk)
+                yield chunk
+            chunks.append(SITEMAP_FOOTER)
+            yield SITEMAP_FOOTER
+            set_sitemap(project, b''.join(chunks))
+
+        response = StreamingHttpResponse(
+            sitemap_generator(),
             content_type='application/xml',
         )
+        patch_response_headers(response, cache_timeout=settings.RTD_SITEMAP_CACHE_TIMEOUT)
+        return response
 
 
 class ServeSitemapXML(SettingsOverrideObject):
@@ -0,0 +1,11 @@
+"""Redirects app."""
+
+from django.apps import AppConfig
+
+
+class RedirectsConfig(AppConfig):
+
+    name = 'readthedocs.redirects'
+
+    def ready(self):
+        import readthedocs.redirects.signals  # noqa
@@ -0,0 +1,232 @@
+"""
+Compiled redirects of a project.
+
+Instead of querying the database to find the redirects that match a path,
+all redirects of a project are compiled into a ``RedirectMatcher``,
+which finds the matching redirects in time proportional to the length of the path.
+
+Matchers are cached in Django's cache and in memory,
+the cache is versioned per project, and the version is changed
+when a redirect is saved or deleted (see ``readthedocs.redirects.signals``).
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import get_random_string
+
+log = structlog.get_logger(__name__)
+
+# Number of matchers kept in the memory of each process.
+LOCAL_CACHE_SIZE = 1000
+
+_local_cache = OrderedDict()
+_local_cache_lock = threading.Lock()
+
+
+def normalize_path(path):
+    r"""
+    Normalize path.
+
+    We normalize ``path`` to:
+
+    - Remove the query params.
+    - Remove any invalid URL chars (\r, \n, \t).
+    - Always start the path with ``/``.
+
+    We don't use ``.path`` to avoid parsing the filename as a full url.
+    For example if the path is ``http://example.com/my-path``,
+    ``.path`` would return ``my-path``.
+    """
+    parsed_path = urlparse(path)
+    normalized_path = parsed_path._replace(query="").geturl()
+    normalized_path = "/" + normalized_path.lstrip("/")
+    return normalized_path
+
+
+class PrefixTrie:
+
+    """Character trie to find all the values whose key is a prefix of a string."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, key, value):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        # ``None`` can't be a character of the key.
+        node.setdefault(None, []).append(value)
+
+    def get_prefixes(self, string):
+        """Return the values of all keys that are a prefix of ``string``."""
+        node = self.root
+        values = list(node.get(None, []))
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                break
+            values.extend(node.get(None, []))
+        return values
+
+
+class RedirectMatcher:
+
+    """
+    Redirects compiled into lookup tables.
+
+    - Prefix redirects are stored in a prefix trie.
+    - Page and exact redirects are stored in a dictionary by their ``from_url``.
+    - Exact redirects with ``$rest`` are stored in a prefix trie.
+    - Sphinx HTML and HTMLDir redirects only depend on the ending of the path,
+      so they are stored in a list.
+
+    Redirects are returned in the same order they are given,
+    the first one that generates a path is used.
+    """
+
+    def __init__(self, redirects):
+        self.redirects = list(redirects)
+        self.has_forced = any(redirect.force for redirect in self.redirects)
+        self.prefix = PrefixTrie()
+        self.page = {}
+        self.exact = {}
+        self.exact_rest = PrefixTrie()
+        self.sphinx_html = []
+        self.sphinx_htmldir = []
+
+        for index, redirect in enumerate(self.redirects):
+            if redirect.redirect_type == 'prefix':
+                self.prefix.add(redirect.from_url, index)
+            elif redirect.redirect_type == 'page':
+                self.page.setdefault(redirect.from_url, []).append(index)
+            elif redirect.redirect_type == 'exact':
+                self.exact.setdefault(redirect.from_url, []).append(index)
+                if (
+                    redirect.from_url.endswith('$rest')
+                    and redirect.from_url_without_rest is not None
+                ):
+                    self.exact_rest.add(redirect.from_url_without_rest, index)
+            elif redirect.redirect_type == 'sphinx_html':
+                self.sphinx_html.append(index)
+            elif redirect.redirect_type == 'sphinx_htmldir':
+                self.sphinx_htmldir.append(index)
+
+    def get_redirects(self, path, full_path, forced_only=False):
+        """
+        Return the redirects that could match ``path`` and ``full_path``.
+
+        :param path: Normalized path without the language and version parts.
+        :param full_path: Normalized full path including the language and version parts.
+        :param forced_only: Include only forced redirects in the results.
+        """
+        if forced_only and not self.has_forced:
+            return []
+
+        indexes = set(self.prefix.get_prefixes(path))
+        indexes.update(self.page.get(path, []))
+        indexes.update(self.exact.get(full_path, []))
+        indexes.update(self.exact_rest.get_prefixes(full_path))
+        if path.endswith('/') or path.endswith('/index.html'):
+            indexes.update(self.sphinx_html)
+        if path.endswith('.html'):
+            indexes.update(self.sphinx_htmldir)
+
+        redirects = (self.redirects[index] for index in sorted(indexes))
+        if forced_only:
+            return [redirect for redirect in redirects if redirect.force]
+        return list(redirects)
+
+    def get_redirect_path_with_status(
+        self,
+        path,
+        full_path=None,
+        language=None,
+        version_slug=None,
+        forced_only=False,
+        project=None,
+    ):
+        """
+        Get the final redirect with its status code.
+
+        :param path: Is the path without the language and version parts.
+        :param full_path: Is the full path including the language and version parts.
+        :param forced_only: Include only forced redirects in the results.
+        :param project: Project of the redirects,
+         used to avoid fetching it from the database for each redirect.
+
+        The redirects of the matcher are shared between requests,
+        so a copy of each redirect is used to set its project.
+        """
+        normalized_path = normalize_path(path)
+        normalized_full_path = normalize_path(full_path)
+        for redirect in self.get_redirects(
+            path=normalized_path,
+            full_path=normalized_full_path,
+            forced_only=forced_only,
+        ):
+            redirect = copy.copy(redirect)
+            if project is not None:
+                redirect.project = project
+            new_path = redirect.get_redirect_path(
+                path=normalized_path,
+                language=language,
+                version_slug=version_slug,
+            )
+            if new_path:
+                return new_path, redirect.http_status
+        return (None, None)
+
+
+def _get_version_cache_key(project_id):
+    return f'redirects-version:{project_id}'
+
+
+def _get_matcher_cache_key(project_id, version):
+    return f'redirects-matcher:{project_id}:{version}'
+
+
+def get_redirect_matcher(project):
+    """
+    Return the compiled redirects of ``project``.
+
+    The version of the project's redirects is always read from Django's cache,
+    the matcher is read from memory, Django's cache, or compiled from the database,
+    in that order.
+    """
+    timeout = settings.RTD_REDIRECTS_CACHE_TIMEOUT
+    version_key = _get_version_cache_key(project.pk)
+    version = cache.get(version_key)
+    if version is None:
+        version = get_random_string(16)
+        cache.set(version_key, version, timeout=timeout)
+
+    local_key = (project.pk, version)
+    with _local_cache_lock:
+        matcher = _local_cache.get(local_key)
+        if matcher is not None:
+            _local_cache.move_to_end(local_key)
+            return matcher
+
+    matcher_key = _get_matcher_cache_key(project.pk, version)
+    matcher = cache.get(matcher_key)
+    if matcher is None:
+        log.debug('Compiling redirects.', project_slug=project.slug)
+        matcher = RedirectMatcher(project.redirects.all())
+        cache.set(matcher_key, matcher, timeout=timeout)
+
+    with _local_cache_lock:
+        _local_cache[local_key] = matcher
+        while len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+    return matcher
+
+
+def invalidate_redirect_matcher(project_id):
+    """Change the version of the redirects of the project, so they are compiled again."""
+    cache.delete(_get_version_cache_key(project_id))
@@ -0,0 +1,22 @@
+"""Invalidate the compiled redirects of a project when its redirects change."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from readthedocs.redirects.matcher import invalidate_redirect_matcher
+from readthedocs.redirects.models import Redirect
+
+
+@receiver(post_save, sender=Redirect)
+@receiver(post_delete, sender=Redirect)
+def invalidate_project_redirects(instance, *args, **kwargs):
+    """
+    Invalidate the compiled redirects of the project.
+
+    It's invalidated again after the transaction is committed,
+    otherwise a request could compile the redirects before the change is visible.
+    """
+    project_id = instance.project_id
+    invalidate_redirect_matcher(project_id)
+    transaction.on_commit(lambda: invalidate_redirect_matcher(project_id))
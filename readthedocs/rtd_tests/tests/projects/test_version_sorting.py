@@ -11,6 +11,11 @@ from readthedocs.projects.constants import (
 )
 from readthedocs.projects.models import Project
 from readthedocs.projects.templatetags.projects_tags import sort_version_aware
+from readthedocs.projects.version_handling import (
+    comparable_version,
+    highest_version,
+    version_sort_key,
+)
 
 
 class SortVersionsTest(TestCase):
@@ -189,3 +194,94 @@ class SortVersionsTest(TestCase):
             ['/trunk/', '2.0', '1.10', '1.9', '1.1', '1.0'],
             [v.slug for v in sort_version_aware(versions)],
         )
+
+    def test_sort_key_matches_comparable_version(self):
+        identifiers = [
+            '1.0', '1.0.0', '1.0.1', '1.1', '1.10', '1.9', '10.0', '2!0.1',
+            '1.0a1', '1.0b2', '1.0rc1', '1.0.dev1', '1.0a1.dev1', '1.0.post1',
+            '1.0.post1.dev2', '1.0+local', '1.0+local.2', '1.0+local.10',
+            '1.0+2', '1.0.x', 'v2.0', '20200101', 'latest', 'stable', 'master',
+            'banana', '0.01', '0.0.1',
+        ]
+        for repo_type in (None, REPO_TYPE_GIT):
+            self.assertEqual(
+                sorted(
+                    identifiers,
+                    key=lambda identifier: comparable_version(identifier, repo_type),
+                ),
+                sorted(
+                    identifiers,
+                    key=lambda identifier: version_sort_key(identifier, repo_type),
+                ),
+            )
+
+        self.assertTrue(version_sort_key('1.0').endswith('1'))
+        self.assertTrue(version_sort_key('latest').endswith('0'))
+        self.assertTrue(version_sort_key('1.0').isdigit())
+
+    def test_sort_matches_comparable_version(self):
+        for repo_type, fallback_branch in ((REPO_TYPE_GIT, 'master'), (REPO_TYPE_HG, 'default')):
+            project = get(Project, repo_type=repo_type)
+            for identifier in ['1.0', '2.0rc1', '2.0', 'stable', fallback_branch]:
+                get(
+                    Version,
+                    project=project,
+                    type=BRANCH,
+                    identifier=identifier,
+                    verbose_name=identifier,
+                    slug=identifier,
+                )
+
+            versions = Version.objects.filter(project=project)
+            # Versions were sorted by ``comparable_version`` before having a sort key.
+            expected = [
+                version.slug
+                for version in sorted(
+                    versions,
+                    key=lambda version: comparable_version(version.verbose_name, repo_type),
+                    reverse=True,
+                )
+            ]
+            self.assertEqual(
+                expected,
+                [fallback_branch, 'latest', 'stable', '2.0', '2.0rc1', '1.0'],
+            )
+            self.assertEqual(
+                expected,
+                [v.slug for v in sort_version_aware(list(versions))],
+            )
+            self.assertEqual(
+                expected,
+                [v.slug for v in versions.order_by_version(repo_type)],
+            )
+
+    def test_order_by_version(self):
+        identifiers = ['master', '1.0', '2.0', '2.0rc1', '1.10', 'banana', 'stable']
+        self.project.repo_type = REPO_TYPE_GIT
+        self.project.save()
+
+        for identifier in identifiers:
+            get(
+                Version,
+                project=self.project,
+                type=BRANCH,
+                identifier=identifier,
+                verbose_name=identifier,
+                slug=identifier,
+            )
+
+        versions = Version.objects.filter(project=self.project)
+        expected = ['master', 'latest', 'stable', '2.0', '2.0rc1', '1.10', '1.0', 'banana']
+        self.assertEqual(
+            expected,
+            [v.slug for v in sort_version_aware(list(versions))],
+        )
+        self.assertEqual(
+            expected,
+            [v.slug for v in versions.order_by_version(REPO_TYPE_GIT)],
+        )
+
+        with self.assertNumQueries(1):
+            version, comparable = highest_version(versions)
+        self.assertEqual(version.slug, '2.0')
+        self.assertEqual(str(comparable), '2.0')
@@ -483,6 +483,55 @@ class APIBuildTests(TestCase):
         self.assertEqual(build['commands'][0]['run_time'], 5)
         self.assertEqual(build['commands'][0]['description'], 'foo')
 
+    def test_make_build_commands_in_bulk(self):
+        client = APIClient()
+        client.login(username='super', password='test')
+        build = get(Build, project_id=1, version_id=1)
+        now = datetime.datetime.utcnow()
+        commands = [
+            {
+                'build': build.pk,
+                'command': f'echo {i}',
+                'output': str(i),
+                'exit_code': 0,
+                'start_time': str(now - datetime.timedelta(seconds=5)),
+                'end_time': str(now),
+            }
+            for i in range(3)
+        ]
+
+        resp = client.post('/api/v2/command/bulk/', commands, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.data, {'count': 3})
+
+        # Multipart requests send the commands encoded as JSON.
+        resp = client.post(
+            '/api/v2/command/bulk/',
+            {'commands': json.dumps(commands[:1])},
+            format='multipart',
+        )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            list(build.commands.values_list('command', flat=True)),
+            ['echo 0', 'echo 1', 'echo 2', 'echo 0'],
+        )
+
+        # The list can be in the ``commands`` field of a JSON object.
+        resp = client.post('/api/v2/command/bulk/', {'commands': commands[1:2]}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(build.commands.count(), 5)
+
+        resp = client.post('/api/v2/command/bulk/', [{'build': build.pk}], format='json')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        for data in ({'commands': 'invalid'}, {'commands': {}}, {}, 'invalid'):
+            resp = client.post('/api/v2/command/bulk/', data, format='json')
+            self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        client.logout()
+        resp = client.post('/api/v2/command/bulk/', commands, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(build.commands.count(), 5)
+
     def test_get_raw_log_success(self):
         project = Project.objects.get(pk=1)
         version = project.versions.first()
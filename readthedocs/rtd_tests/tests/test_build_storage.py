@@ -1,10 +1,16 @@
 import os
 import shutil
 import tempfile
+from collections import Counter
+from unittest import mock
 
+import boto3
+from django.core.exceptions import SuspiciousFileOperation
 from django.test import TestCase
+from moto import mock_aws
 
 from readthedocs.builds.storage import BuildMediaFileSystemStorage
+from readthedocs.storage.s3_storage import S3BuildMediaStorage
 
 
 files_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'files')
@@ -79,6 +85,98 @@ class TestBuildMediaStorage(TestCase):
         self.storage.sync_directory(tmp_files_dir, storage_dir)
         self.assertFileTree(storage_dir, tree)
 
+    def test_sync_directory_incremental(self):
+        tmp_files_dir = os.path.join(tempfile.mkdtemp(), 'files')
+        shutil.copytree(files_dir, tmp_files_dir)
+        storage_dir = 'files'
+        manifest_path = self.storage.get_sync_manifest_path('manifests', 'files')
+
+        tree = [
+            ('api', ['index.html']),
+            'api.fjson',
+            'conf.py',
+            'test.html',
+        ]
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            storage_dir,
+            manifest_path=manifest_path,
+        )
+        self.assertFileTree(storage_dir, tree)
+        self.assertTrue(self.storage.exists(manifest_path))
+        self.assertEqual(stats['uploaded'], 4)
+        self.assertEqual(stats['skipped'], 0)
+        self.assertEqual(stats['deleted'], 0)
+        self.assertGreater(stats['bytes_uploaded'], 0)
+
+        # Nothing changed
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            storage_dir,
+            manifest_path=manifest_path,
+        )
+        self.assertFileTree(storage_dir, tree)
+        self.assertEqual(stats['uploaded'], 0)
+        self.assertEqual(stats['skipped'], 4)
+        self.assertEqual(stats['bytes_uploaded'], 0)
+
+        # One file changed and another one was removed
+        with open(os.path.join(tmp_files_dir, 'test.html'), 'w') as f:
+            f.write('<p>Changed</p>')
+        os.remove(os.path.join(tmp_files_dir, 'api.fjson'))
+        tree = [
+            ('api', ['index.html']),
+            'conf.py',
+            'test.html',
+        ]
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            storage_dir,
+            manifest_path=manifest_path,
+        )
+        self.assertFileTree(storage_dir, tree)
+        self.assertEqual(stats['uploaded'], 1)
+        self.assertEqual(stats['skipped'], 2)
+        self.assertEqual(stats['deleted'], 1)
+        self.assertEqual(stats['bytes_uploaded'], len('<p>Changed</p>'))
+        with self.storage.open('files/test.html') as f:
+            self.assertEqual(f.read(), b'<p>Changed</p>')
+
+        # A file removed from storage is uploaded again
+        self.storage.delete('files/conf.py')
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            storage_dir,
+            manifest_path=manifest_path,
+        )
+        self.assertFileTree(storage_dir, tree)
+        self.assertEqual(stats['uploaded'], 1)
+        self.assertEqual(stats['skipped'], 2)
+
+        tree = [
+            # Cloud storage generally doesn't consider empty directories to exist
+            ('api', []),
+            'conf.py',
+            'test.html',
+        ]
+        shutil.rmtree(os.path.join(tmp_files_dir, 'api'))
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            storage_dir,
+            manifest_path=manifest_path,
+        )
+        self.assertFileTree(storage_dir, tree)
+        self.assertEqual(stats['deleted'], 1)
+
+    def test_delete_files(self):
+        self.storage.copy_directory(files_dir, 'files')
+        self.storage.delete_files(['files/conf.py', 'files/api/index.html'])
+
+        dirs, files = self.storage.listdir('files')
+        self.assertCountEqual(files, ['api.fjson', 'test.html'])
+        _, files = self.storage.listdir('files/api')
+        self.assertEqual(files, [])
+
     def test_delete_directory(self):
         self.storage.copy_directory(files_dir, 'files')
         dirs, files = self.storage.listdir('files')
@@ -111,3 +209,142 @@ class TestBuildMediaStorage(TestCase):
         self.assertEqual(top, 'files/api')
         self.assertCountEqual(dirs, [])
         self.assertCountEqual(files, ['index.html'])
+
+
+class TestS3BuildMediaStorage(TestCase):
+
+    """Test the S3 storage backend against a local S3 stand-in (moto)."""
+
+    bucket_name = 'readthedocs-media'
+
+    def setUp(self):
+        env = mock.patch.dict(
+            os.environ,
+            {
+                'AWS_ACCESS_KEY_ID': 'testing',
+                'AWS_SECRET_ACCESS_KEY': 'testing',
+                'AWS_DEFAULT_REGION': 'us-east-1',
+            },
+        )
+        env.start()
+        self.addCleanup(env.stop)
+
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+
+        boto3.client('s3').create_bucket(Bucket=self.bucket_name)
+        self.storage = S3BuildMediaStorage(bucket_name=self.bucket_name)
+
+        # Count the requests made to S3 by operation name
+        self.requests = Counter()
+        self.storage.connection.meta.client.meta.events.register(
+            'before-call.s3',
+            self._count_request,
+        )
+
+    def _count_request(self, model, **kwargs):
+        self.requests[model.name] += 1
+
+    def create_files(self, path, count):
+        client = boto3.client('s3')
+        for i in range(count):
+            client.put_object(
+                Bucket=self.bucket_name,
+                Key=f'{path}/dir{i % 10}/file{i}.html',
+                Body=b'<p>Test</p>',
+            )
+
+    def list_keys(self, prefix=''):
+        client = boto3.client('s3')
+        paginator = client.get_paginator('list_objects_v2')
+        return [
+            entry['Key']
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix)
+            for entry in page.get('Contents', ())
+        ]
+
+    def test_delete_directory(self):
+        self.create_files('html/project/latest', 2500)
+        self.create_files('html/project/latest-old', 10)
+
+        self.storage.delete_directory('html/project/latest')
+
+        self.assertEqual(self.list_keys('html/project/latest/'), [])
+        self.assertEqual(len(self.list_keys('html/project/latest-old/')), 10)
+        # One listing and one delete request per 1000 files
+        self.assertEqual(self.requests['ListObjectsV2'], 3)
+        self.assertEqual(self.requests['DeleteObjects'], 3)
+        self.assertEqual(self.requests['DeleteObject'], 0)
+
+    def test_delete_directory_root(self):
+        with self.assertRaises(SuspiciousFileOperation):
+            self.storage.delete_directory('/')
+
+    def test_delete_files(self):
+        self.create_files('html/project/latest', 1500)
+        paths = [
+            f'html/project/latest/dir{i % 10}/file{i}.html'
+            for i in range(1200)
+        ]
+
+        self.storage.delete_files(paths)
+
+        self.assertEqual(len(self.list_keys('html/project/latest/')), 300)
+        self.assertEqual(self.requests['DeleteObjects'], 2)
+
+    def test_sync_directory_incremental(self):
+        self.create_files('html/project/latest', 5)
+        tmp_files_dir = os.path.join(tempfile.mkdtemp(), 'files')
+        shutil.copytree(files_dir, tmp_files_dir)
+        manifest_path = self.storage.get_sync_manifest_path('json/project/latest', 'html')
+
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            'html/project/latest',
+            manifest_path=manifest_path,
+        )
+        self.assertEqual(stats['uploaded'], 4)
+        self.assertEqual(stats['deleted'], 5)
+        self.assertCountEqual(
+            self.list_keys('html/project/latest/'),
+            [
+                'html/project/latest/api/index.html',
+                'html/project/latest/api.fjson',
+                'html/project/latest/conf.py',
+                'html/project/latest/test.html',
+            ],
+        )
+        self.assertEqual(
+            self.list_keys('json/project/latest/'),
+            ['json/project/latest/.readthedocs-sync-manifest-html.json'],
+        )
+
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            'html/project/latest',
+            manifest_path=manifest_path,
+        )
+        self.assertEqual(stats['uploaded'], 0)
+        self.assertEqual(stats['skipped'], 4)
+        self.assertEqual(stats['deleted'], 0)
+
+        # The manifests of other directories saved in the synced directory are kept.
+        stats = self.storage.sync_directory_incremental(
+            tmp_files_dir,
+            'json/project/latest',
+            manifest_path=self.storage.get_sync_manifest_path('json/project/latest', 'json'),
+        )
+        self.assertEqual(stats['deleted'], 0)
+        self.assertIn(
+            'json/project/latest/.readthedocs-sync-manifest-html.json',
+            self.list_keys('json/project/latest/'),
+        )
+
+    def test_delete_files_errors(self):
+        self.create_files('html/project/latest', 2)
+        errors = [{'Key': 'html/project/latest/dir0/file0.html', 'Code': 'AccessDenied'}]
+        with mock.patch.object(self.storage, '_bucket', mock.MagicMock()) as bucket:
+            bucket.delete_objects.return_value = {'Errors': errors}
+            with self.assertRaises(OSError):
+                self.storage.delete_files(['html/project/latest/dir0/file0.html'])
@@ -295,6 +295,7 @@ class SphinxBuilderTest(TestCase):
 
         # Add the feature to use the regular builders
         feature.projects.add(self.project)
+        self.project.refresh_from_db()
 
         builder = HtmlBuilder(
             build_env=self.build_env,
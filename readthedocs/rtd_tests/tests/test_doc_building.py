@@ -1,6 +1,7 @@
 import os
 import tempfile
 import uuid
+from io import BytesIO
 from itertools import zip_longest
 from unittest import mock
 from unittest.mock import Mock, PropertyMock, patch
@@ -9,7 +10,10 @@ import pytest
 from django.test import TestCase, override_settings
 from django_dynamic_fixture import get
 from docker.errors import APIError as DockerAPIError
+from requests.exceptions import ConnectionError, ReadTimeout
+from slumber.exceptions import HttpClientError, HttpServerError
 
+from readthedocs.builds.constants import EXTERNAL
 from readthedocs.builds.models import Version
 from readthedocs.doc_builder.config import load_yaml_config
 from readthedocs.doc_builder.environments import (
@@ -19,10 +23,13 @@ from readthedocs.doc_builder.environments import (
     LocalBuildEnvironment,
 )
 from readthedocs.doc_builder.exceptions import BuildAppError
+from readthedocs.doc_builder.output import CommandOutput
 from readthedocs.doc_builder.python_environments import Conda, Virtualenv
+from readthedocs.projects.constants import PRIVATE
 from readthedocs.projects.models import Project
 from readthedocs.rtd_tests.mocks.paths import fake_paths_lookup
 from readthedocs.rtd_tests.tests.test_config_integration import create_load
+from readthedocs.vcs_support.mirrors import GitMirrorCache
 
 DUMMY_BUILD_ID = 123
 SAMPLE_UNICODE = 'HérÉ îß sömê ünïçó∂é'
@@ -60,14 +67,113 @@ class TestLocalBuildEnvironment(TestCase):
 
         command = build_env.commands[0]
         self.assertEqual(command.exit_code, 0)
-        api_v2.command.post.assert_called_once_with({
+        api_v2.command.bulk.post.assert_called_once_with([{
             'build': mock.ANY,
             'command': command.get_command(),
             'output': command.output,
             'exit_code': 0,
             'start_time': command.start_time,
             'end_time': command.end_time,
-        })
+        }])
+
+    @override_settings(RTD_BUILD_COMMANDS_BATCH_SIZE=2)
+    @patch('readthedocs.doc_builder.environments.api_v2')
+    def test_commands_are_saved_in_batches(self, api_v2):
+        project = get(Project)
+        build_env = LocalBuildEnvironment(project=project, build={'id': 1})
+
+        with build_env:
+            for _ in range(3):
+                build_env.run('true', cwd='/tmp')
+            self.assertEqual(api_v2.command.bulk.post.call_count, 1)
+            self.assertEqual(len(api_v2.command.bulk.post.call_args[0][0]), 2)
+
+        self.assertEqual(api_v2.command.bulk.post.call_count, 2)
+        self.assertEqual(len(api_v2.command.bulk.post.call_args[0][0]), 1)
+        api_v2.command.post.assert_not_called()
+
+    @override_settings(RTD_BUILD_COMMANDS_BATCH_SIZE=2)
+    @patch('readthedocs.doc_builder.environments.api_v2')
+    def test_commands_are_not_lost_when_batch_fails(self, api_v2):
+        project = get(Project)
+        build_env = LocalBuildEnvironment(project=project, build={'id': 1})
+        api_v2.command.bulk.post.side_effect = [
+            ConnectionError,
+            None,
+            HttpServerError(response=Mock(status_code=502)),
+            HttpServerError(response=Mock(status_code=502)),
+        ]
+
+        with build_env:
+            build_env.run('true', cwd='/tmp')
+            build_env.run('true', cwd='/tmp')
+            # The batch failed, the commands are kept in the buffer.
+            self.assertEqual(len(build_env.command_buffer.commands), 2)
+            # They are sent again before running the next command.
+            build_env.run('true', cwd='/tmp')
+            self.assertEqual(len(api_v2.command.bulk.post.call_args[0][0]), 2)
+            self.assertEqual(len(build_env.command_buffer.commands), 1)
+            build_env.run('true', cwd='/tmp')
+
+        # The last batch failed, the pending commands are saved individually.
+        self.assertEqual(api_v2.command.bulk.post.call_count, 4)
+        self.assertEqual(api_v2.command.post.call_count, 2)
+
+    @override_settings(RTD_BUILD_COMMANDS_BATCH_SIZE=2)
+    @patch('readthedocs.doc_builder.environments.api_v2')
+    def test_commands_are_saved_one_by_one_when_batch_is_rejected(self, api_v2):
+        project = get(Project)
+        build_env = LocalBuildEnvironment(project=project, build={'id': 1})
+        api_v2.command.bulk.post.side_effect = [
+            HttpClientError(response=Mock(status_code=400)),
+            None,
+        ]
+
+        with build_env:
+            build_env.run('true', cwd='/tmp')
+            build_env.run('true', cwd='/tmp')
+            # The rejected batch isn't retried, its commands are saved one by one.
+            self.assertEqual(len(build_env.command_buffer.commands), 0)
+            self.assertEqual(api_v2.command.post.call_count, 2)
+            build_env.run('true', cwd='/tmp')
+            build_env.run('true', cwd='/tmp')
+
+        self.assertEqual(api_v2.command.bulk.post.call_count, 2)
+        self.assertEqual(api_v2.command.post.call_count, 2)
+
+    @override_settings(RTD_BUILD_COMMANDS_BATCH_SIZE=2)
+    @patch('readthedocs.doc_builder.environments.api_v2')
+    def test_commands_are_not_duplicated_when_response_is_lost(self, api_v2):
+        project = get(Project)
+        build_env = LocalBuildEnvironment(project=project, build={'id': 1})
+        api_v2.command.bulk.post.side_effect = ReadTimeout
+
+        with build_env:
+            build_env.run('true', cwd='/tmp')
+            build_env.run('true', cwd='/tmp')
+            # The batch may have been saved, it isn't sent again.
+            self.assertEqual(len(build_env.command_buffer.commands), 0)
+
+        self.assertEqual(api_v2.command.bulk.post.call_count, 1)
+        api_v2.command.post.assert_not_called()
+
+    @override_settings(RTD_BUILD_COMMANDS_BATCH_INTERVAL=0)
+    @patch('readthedocs.doc_builder.environments.api_v2')
+    def test_commands_are_sent_after_interval(self, api_v2):
+        project = get(Project)
+        build_env = LocalBuildEnvironment(project=project, build={'id': 1})
+
+        with build_env:
+            build_env.run('true', cwd='/tmp')
+            api_v2.command.bulk.post.assert_called_once()
+
+    @patch('readthedocs.doc_builder.environments.api_v2')
+    def test_commands_are_saved_without_context(self, api_v2):
+        project = get(Project)
+        build_env = LocalBuildEnvironment(project=project, build={'id': 1})
+        build_env.run('true', cwd='/tmp')
+        api_v2.command.post.assert_called_once()
+        api_v2.command.bulk.post.assert_not_called()
 
 
 
@@ -99,7 +205,7 @@ class TestDockerBuildEnvironment(TestCase):
             'docker_client', {
                 'inspect_container.return_value': {'State': {'Running': True}},
                 'exec_create.return_value': {'Id': b'container-foobar'},
-                'exec_start.return_value': b'This is the return',
+                'exec_start.return_value': [b'This is the return'],
                 'exec_inspect.return_value': {'ExitCode': 0},
             },
         )
@@ -136,6 +242,46 @@ class TestDockerBuildEnvironment(TestCase):
             'builder': mock.ANY,
         })
 
+    def test_binds_only_project_mirror(self):
+        """Only the git mirror of the project is mounted in the container."""
+        mirrors_dir = tempfile.mkdtemp()
+        self.project.repo = 'https://github.com/pypa/pip'
+        build_env = DockerBuildEnvironment(
+            version=self.version,
+            project=self.project,
+            build={'id': DUMMY_BUILD_ID},
+            git_mirror_mode='rw',
+        )
+
+        with override_settings(RTD_GIT_MIRRORS_DIR=mirrors_dir):
+            binds = build_env._get_binds()
+            mirror_path = GitMirrorCache.from_settings().get_path(self.project)
+            self.assertTrue(os.path.isdir(mirror_path))
+            self.assertEqual(binds[mirror_path], {'bind': mirror_path, 'mode': 'rw'})
+            self.assertNotIn(mirrors_dir, binds)
+
+            # Read-only mirrors are mounted read-only.
+            build_env.git_mirror_mode = 'ro'
+            binds = build_env._get_binds()
+            self.assertEqual(binds[mirror_path], {'bind': mirror_path, 'mode': 'ro'})
+
+            # The environment that builds the docs doesn't have the mirror.
+            build_env.git_mirror_mode = None
+            binds = build_env._get_binds()
+            self.assertEqual(list(binds), [self.project.doc_path])
+
+            # External versions don't have the mirror.
+            build_env.git_mirror_mode = 'rw'
+            self.version.type = EXTERNAL
+            binds = build_env._get_binds()
+            self.assertEqual(list(binds), [self.project.doc_path])
+
+            # Private projects aren't mirrored.
+            self.version.type = 'branch'
+            self.project.privacy_level = PRIVATE
+            binds = build_env._get_binds()
+            self.assertEqual(list(binds), [self.project.doc_path])
+
     def test_container_timeout(self):
         """Docker container timeout and command failure."""
         response = Mock(status_code=404, reason='Container not found')
@@ -150,7 +296,7 @@ class TestDockerBuildEnvironment(TestCase):
                     {'State': {'Running': False, 'ExitCode': 42}},
                 ],
                 'exec_create.return_value': {'Id': b'container-foobar'},
-                'exec_start.return_value': b'This is the return',
+                'exec_start.return_value': [b'This is the return'],
                 'exec_inspect.return_value': {'ExitCode': 0},
             },
         )
@@ -267,11 +413,60 @@ class TestBuildCommand(TestCase):
         for output, sanitized in checks:
             self.assertEqual(cmd.sanitize_output(output), sanitized)
 
+    @override_settings(DATA_UPLOAD_MAX_MEMORY_SIZE=512 * 1024 + 100)
+    def test_output_is_truncated(self):
+        cmd = BuildCommand(['/bin/bash', '-c', 'printf "%01000d" 0; echo -n END'])
+        cmd.run()
+        self.assertTrue(cmd.output.startswith('.. (truncated) ...\n'))
+        self.assertIn('Truncated at 100 bytes.', cmd.output)
+        self.assertNotIn('Full output saved', cmd.output)
+        self.assertTrue(cmd.output.endswith('0' * 97 + 'END'))
+
+    @override_settings(
+        DATA_UPLOAD_MAX_MEMORY_SIZE=512 * 1024 + 100,
+        RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True,
+    )
+    @patch('readthedocs.doc_builder.environments.build_commands_storage')
+    def test_full_output_is_saved_to_storage(self, storage):
+        saved = []
+        storage.save.side_effect = lambda path, content: saved.append(content.read()) or path
+
+        build_env = Mock(build={'id': DUMMY_BUILD_ID})
+        cmd = BuildCommand(
+            ['/bin/bash', '-c', 'printf "%01000d" 0; echo -n END'],
+            build_env=build_env,
+        )
+        cmd.run()
+        path = storage.save.call_args[0][0]
+        self.assertTrue(path.startswith(f'output/{DUMMY_BUILD_ID}/'))
+        self.assertIn(f'Full output saved at {path}.', cmd.output)
+        self.assertEqual(saved, [b'0' * 1000 + b'END'])
+        self.assertTrue(cmd.output.endswith('0' * 97 + 'END'))
+
+    @override_settings(RTD_SAVE_BUILD_COMMANDS_TO_STORAGE=True)
+    @patch('readthedocs.doc_builder.environments.build_commands_storage')
+    def test_full_output_is_not_saved_if_not_truncated(self, storage):
+        build_env = Mock(build={'id': DUMMY_BUILD_ID})
+        cmd = BuildCommand(['/bin/bash', '-c', 'echo -n FOOBAR'], build_env=build_env)
+        cmd.run()
+        self.assertEqual(cmd.output, 'FOOBAR')
+        storage.save.assert_not_called()
+
+    def test_demux_output(self):
+        cmd = BuildCommand(
+            ['/bin/bash', '-c', 'echo -n FOO; echo -n BAR 1>&2'],
+            demux=True,
+        )
+        cmd.run()
+        self.assertEqual(cmd.output, 'FOO')
+        self.assertEqual(cmd.error, 'BAR')
+
     @patch('subprocess.Popen')
     def test_unicode_output(self, mock_subprocess):
         """Unicode output from command."""
         mock_process = Mock(**{
-            'communicate.return_value': (SAMPLE_UTF8_BYTES, b''),
+            'stdout': BytesIO(SAMPLE_UTF8_BYTES),
+            'wait.return_value': 0,
         })
         mock_subprocess.return_value = mock_process
 
@@ -283,6 +478,31 @@ class TestBuildCommand(TestCase):
         )
 
 
+class TestCommandOutput(TestCase):
+
+    def test_tail(self):
+        output = CommandOutput(max_length=10)
+        for chunk in (b'0123', b'4567', b'', None, b'89ab', b'cdef'):
+            output.write(chunk)
+        self.assertEqual(output.getvalue(), b'6789abcdef')
+        self.assertEqual(output.length, 16)
+        self.assertTrue(output.truncated)
+        # Only the chunks needed for the tail are kept.
+        self.assertEqual(len(output._chunks), 3)
+
+    def test_progress(self):
+        progress = []
+        output = CommandOutput(
+            max_length=10,
+            progress_callback=progress.append,
+            progress_interval=5,
+        )
+        for chunk in (b'012', b'345', b'6789abcdef', b'g'):
+            output.write(chunk)
+        self.assertEqual(progress, [6, 16])
+        self.assertFalse(output.keeps_full_output)
+
+
 # TODO: translate this tests once we have DockerBuildEnvironment properly
 # mocked. These can be done together with `TestDockerBuildEnvironment`.
 @pytest.mark.skip
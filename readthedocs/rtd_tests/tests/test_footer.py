@@ -2,6 +2,7 @@ from unittest import mock
 
 import pytest
 from django.contrib.sessions.backends.base import SessionBase
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 from django.urls import reverse
 from django_dynamic_fixture import get
@@ -89,6 +90,8 @@ class BaseTestFooterHTML:
             self.assertIn("#4 (PR)", r.data["html"])
             self.assertNotIn("#4 (MR)", r.data["html"])
             self.assertNotIn("#4 (EV)", r.data["html"])
+        # The provider is mocked, it doesn't invalidate the cached footer.
+        cache.clear()
         with mock.patch(git_provider_name, GITLAB_BRAND):
             r = self.render()
             self.assertIn("#4 (MR)", r.data["html"])
@@ -445,6 +448,7 @@ class TestVersionCompareFooter(TestCase):
 
 @pytest.mark.proxito
 @override_settings(PUBLIC_DOMAIN='readthedocs.io')
+@override_settings(RTD_FOOTER_CACHE_TIMEOUT=0)
 class TestFooterPerformance(TestCase):
     # The expected number of queries for generating the footer
     # This shouldn't increase unless we modify the footer API
@@ -509,3 +513,122 @@ class TestFooterPerformance(TestCase):
         with self.assertNumQueries(self.EXPECTED_QUERIES):
             response = self.client.get(self.url, HTTP_HOST=domain)
             self.assertContains(response, domain)
+
+
+class TestFooterCache(TestCase):
+
+    def setUp(self):
+        self.pip = get(
+            Project,
+            slug='pip',
+            privacy_level=PUBLIC,
+            main_language_project=None,
+        )
+        self.pip.versions.update(privacy_level=PUBLIC, built=True, active=True)
+        self.latest = self.pip.versions.get(slug=LATEST)
+        self.url = (
+            reverse('footer_html') +
+            f'?project={self.pip.slug}&version={self.latest.slug}&page=index&docroot=/'
+        )
+
+    def _get_footer_cache_hits(self, log):
+        return [
+            call[1]['footer_cache_hit']
+            for call in log.debug.call_args_list
+            if call[0] == ('Footer cache.',)
+        ]
+
+    @mock.patch('readthedocs.api.v2.cache.log')
+    def test_footer_is_cached(self, log):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._get_footer_cache_hits(log), [False])
+
+        # Only the queries to check the permissions are done.
+        with self.assertNumQueries(3):
+            cached_response = self.client.get(self.url)
+        self.assertEqual(cached_response.data, response.data)
+        self.assertEqual(self._get_footer_cache_hits(log), [False, True])
+
+        # The page is part of the key.
+        response = self.client.get(self.url.replace('page=index', 'page=install'))
+        self.assertEqual(self._get_footer_cache_hits(log), [False, True, False])
+
+    def test_footer_cache_is_invalidated(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('0.8.1', response.data['html'])
+
+        # A new version.
+        version = get(
+            Version,
+            project=self.pip,
+            verbose_name='0.8.1',
+            slug='0.8.1',
+            privacy_level=PUBLIC,
+            active=True,
+            built=True,
+        )
+        response = self.client.get(self.url)
+        self.assertIn('0.8.1', response.data['html'])
+
+        # A new translation of the project.
+        translation = get(
+            Project,
+            slug='pip-es',
+            language='es',
+            privacy_level=PUBLIC,
+            main_language_project=self.pip,
+        )
+        response = self.client.get(self.url)
+        self.assertIn('>es</a>', response.data['html'])
+
+        # A version of the translation.
+        translation_url = (
+            reverse('footer_html') + f'?project={translation.slug}&version={LATEST}'
+        )
+        response = self.client.get(translation_url)
+        self.assertNotIn('0.8.1', response.data['html'])
+        translation.versions.update(privacy_level=PUBLIC, built=True, active=True)
+        get(
+            Version,
+            project=translation,
+            verbose_name='0.8.1',
+            slug='0.8.1',
+            privacy_level=PUBLIC,
+            active=True,
+            built=True,
+        )
+        response = self.client.get(translation_url)
+        self.assertIn('0.8.1', response.data['html'])
+
+        # Nothing changed, the footers are cached.
+        self.client.get(self.url)
+        with mock.patch('readthedocs.api.v2.cache.log') as log:
+            self.client.get(self.url)
+            self.client.get(translation_url)
+        self.assertEqual(self._get_footer_cache_hits(log), [True, True])
+
+        version.delete()
+        response = self.client.get(self.url)
+        self.assertNotIn('/0.8.1/', response.data['html'])
+
+    def test_footer_cache_is_invalidated_by_parent_domain(self):
+        subproject = get(
+            Project,
+            slug='sub',
+            privacy_level=PUBLIC,
+            main_language_project=None,
+        )
+        subproject.versions.update(privacy_level=PUBLIC, built=True, active=True)
+        self.pip.add_subproject(subproject)
+        url = (
+            reverse('footer_html') +
+            f'?project={subproject.slug}&version={LATEST}&page=index&docroot=/'
+        )
+        response = self.client.get(url)
+        self.assertNotIn('docs.foobar.com', response.data['html'])
+
+        # The links of the subproject use the domain of the parent project.
+        self.pip.domains.create(domain='docs.foobar.com', canonical=True)
+        response = self.client.get(url)
+        self.assertIn('docs.foobar.com', response.data['html'])
@@ -1,16 +1,20 @@
 import os
+import zlib
 from unittest import mock
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from django.core.files.storage import get_storage_class
-from django.test import TestCase
-from django.test.utils import override_settings
+from django.test import TestCase, override_settings
+from django_dynamic_fixture import get
 
-from readthedocs.projects.models import HTMLFile, ImportedFile, Project
+from readthedocs.projects.models import Feature, HTMLFile, ImportedFile, Project
 from readthedocs.projects.tasks.search import (
     _create_imported_files,
     _create_intersphinx_data,
     _sync_imported_files,
+    index_build_files,
 )
 from readthedocs.sphinx_domains.models import SphinxDomain
 
@@ -154,6 +158,77 @@ class ImportedFileTests(TestCase):
         self.assertTrue(file_api.ignore)
         self.assertFalse(file_test.ignore)
 
+    def test_page_custom_rank_and_ignore_several_patterns(self):
+        search_ranking = {
+            '*.html': 1,
+            'api/*': 2,
+            'test.html': -1,
+        }
+        search_ignore = ['*/index.html', 'other.html']
+        self._manage_imported_files(
+            self.version,
+            'commit01',
+            1,
+            search_ranking=search_ranking,
+            search_ignore=search_ignore,
+        )
+
+        file_api = HTMLFile.objects.get(path='api/index.html')
+        file_test = HTMLFile.objects.get(path='test.html')
+        self.assertEqual(file_api.rank, 2)
+        self.assertTrue(file_api.ignore)
+        self.assertEqual(file_test.rank, -1)
+        self.assertFalse(file_test.ignore)
+
+    @mock.patch('readthedocs.projects.tasks.search.HTML_FILES_BATCH_SIZE', 500)
+    def test_create_imported_files_in_batches(self):
+        storage_path = self.project.get_storage_path(
+            type_='html',
+            version_slug=self.version.slug,
+            include_file=False,
+        )
+        tree = [
+            (
+                f'{storage_path}/section{section}',
+                [],
+                [f'page{page}.html' for page in range(1001)] + ['objects.inv'],
+            )
+            for section in range(2)
+        ]
+        search_ranking = {'*': 5, 'section1/*': 1}
+        search_ignore = ['section0/page1*.html']
+
+        with mock.patch(
+            'readthedocs.projects.tasks.search.build_media_storage.walk',
+            return_value=tree,
+        ), mock.patch.object(
+            HTMLFile.objects,
+            'bulk_create',
+            wraps=HTMLFile.objects.bulk_create,
+        ) as bulk_create:
+            _create_imported_files(
+                version=self.version,
+                commit='commit01',
+                build=1,
+                search_ranking=search_ranking,
+                search_ignore=search_ignore,
+            )
+
+        self.assertEqual(
+            [len(call[0][0]) for call in bulk_create.call_args_list],
+            [500, 500, 500, 500, 2],
+        )
+        self.assertEqual(HTMLFile.objects.count(), 2002)
+        # page1, page10-19, page100-199 and page1000.
+        self.assertEqual(HTMLFile.objects.filter(ignore=True).count(), 112)
+        self.assertFalse(HTMLFile.objects.get(path='section1/page1.html').ignore)
+        # The last pattern that matches takes precedence.
+        self.assertEqual(HTMLFile.objects.get(path='section0/page500.html').rank, 5)
+        html_file = HTMLFile.objects.get(path='section1/page500.html')
+        self.assertEqual(html_file.rank, 1)
+        self.assertEqual(html_file.commit, 'commit01')
+        self.assertEqual(html_file.build, 1)
+
     def test_update_content(self):
         test_dir = os.path.join(base_dir, 'files')
         self.assertEqual(ImportedFile.objects.count(), 0)
@@ -174,99 +249,296 @@ class ImportedFileTests(TestCase):
         self._manage_imported_files(self.version, 'commit02', 2)
         self.assertEqual(ImportedFile.objects.count(), 2)
 
-    @override_settings(PRODUCTION_DOMAIN="readthedocs.org")
-    @override_settings(RTD_INTERSPHINX_URL="https://readthedocs.org")
-    @mock.patch("readthedocs.doc_builder.director.os.path.exists")
-    def test_create_intersphinx_data(self, mock_exists):
-        mock_exists.return_Value = True
-
-        # Test data for objects.inv file
-        test_objects_inv = {
-            'cpp:function': {
-                'sphinx.test.function': [
-                    'dummy-proj-1',
-                    'dummy-version-1',
-                    'test.html#epub-faq',  # file generated by ``sphinx.builders.html.StandaloneHTMLBuilder``
-                    'dummy-func-name-1',
-                ]
-            },
-            'py:function': {
-                'sample.test.function': [
-                    'dummy-proj-2',
-                    'dummy-version-2',
-                    'test.html#sample-test-func',  # file generated by ``sphinx.builders.html.StandaloneHTMLBuilder``
-                    'dummy-func-name-2'
-                ]
-            },
-            'js:function': {
-                'testFunction': [
-                    'dummy-proj-3',
-                    'dummy-version-3',
-                    'api/#test-func',  # file generated by ``sphinx.builders.dirhtml.DirectoryHTMLBuilder``
-                    'dummy-func-name-3'
-                ]
-            }
-        }
+    @mock.patch('readthedocs.projects.tasks.search.remove_indexed_files')
+    @mock.patch('readthedocs.projects.tasks.search.update_indexed_files_build')
+    @mock.patch('readthedocs.projects.tasks.search.index_files')
+    @mock.patch('readthedocs.projects.tasks.search.DEDConfig.autosync_enabled')
+    def test_incremental_search_indexing(
+        self,
+        autosync_enabled,
+        index_files,
+        update_indexed_files_build,
+        remove_indexed_files,
+    ):
+        autosync_enabled.return_value = True
+        update_indexed_files_build.return_value = True
+        get(
+            Feature,
+            feature_id=Feature.INCREMENTAL_SEARCH_INDEXING,
+            projects=[self.project],
+        )
+        self.project.refresh_from_db()
+        storage_path = self.project.get_storage_path(
+            type_='html',
+            version_slug=self.version.slug,
+            include_file=False,
+        )
 
-        with mock.patch(
-            'sphinx.ext.intersphinx.fetch_inventory',
-            return_value=test_objects_inv
-        ) as mock_fetch_inventory:
+        def get_processed_json(html_file):
+            with self.storage.open(self.storage.join(storage_path, html_file.path)) as f:
+                return {'path': html_file.path, 'content': f.read().decode()}
+
+        with mock.patch.object(
+            HTMLFile,
+            'get_processed_json',
+            autospec=True,
+            side_effect=get_processed_json,
+        ):
+            self._manage_imported_files(self.version, 'commit01', 1)
+
+            self.assertEqual(index_files.call_count, 1)
+            self.assertEqual(
+                {html_file.path for html_file in index_files.call_args[1]['files']},
+                {'test.html', 'api/index.html'},
+            )
+            update_indexed_files_build.assert_not_called()
+            file_api = HTMLFile.objects.get(path='api/index.html')
+            file_test = HTMLFile.objects.get(path='test.html')
+            self.assertIsNotNone(file_api.content_hash)
+            self.assertIsNotNone(file_test.content_hash)
+
+            # Only test.html changes in the next build.
+            test_file = self.storage.join(storage_path, 'test.html')
+            self.storage.delete(test_file)
+            self.storage.save(test_file, ContentFile(b'Updated content'))
+            index_files.reset_mock()
 
             _create_imported_files(
                 version=self.version,
-                commit='commit01',
-                build=1,
+                commit='commit02',
+                build=2,
                 search_ranking={},
                 search_ignore=[],
             )
-            _create_intersphinx_data(self.version, 'commit01', 1)
-
-            # there will be two html files,
-            # `api/index.html` and `test.html`
-            self.assertEqual(
-                HTMLFile.objects.all().count(),
-                2
-            )
-            self.assertEqual(
-                HTMLFile.objects.filter(path='test.html').count(),
-                1
-            )
-            self.assertEqual(
-                HTMLFile.objects.filter(path='api/index.html').count(),
-                1
+            sphinx_domain = get(
+                SphinxDomain,
+                project=self.project,
+                version=self.version,
+                html_file=HTMLFile.objects.get(path='api/index.html', build=2),
+                build=2,
             )
+            _sync_imported_files(self.version, 2)
 
-            html_file_api = HTMLFile.objects.filter(path='api/index.html').first()
+        self.assertEqual(index_files.call_count, 1)
+        self.assertEqual(
+            [html_file.path for html_file in index_files.call_args[1]['files']],
+            ['test.html'],
+        )
+        update_indexed_files_build.assert_called_once_with(
+            model=HTMLFile,
+            objects_id=[file_api.pk],
+            build=2,
+            commit='commit02',
+        )
+        remove_indexed_files.assert_called_with(
+            model=HTMLFile,
+            project_slug=self.project.slug,
+            version_slug=self.version.slug,
+            build_id=2,
+        )
 
-            self.assertEqual(
-                SphinxDomain.objects.all().count(),
-                3
-            )
-            self.assertEqual(
-                SphinxDomain.objects.filter(html_file=html_file_api).count(),
-                1
-            )
-            mock_fetch_inventory.assert_called_once()
-            self.assertRegex(
-                mock_fetch_inventory.call_args[0][2],
-                r'^https://readthedocs\.org/media/.*/objects\.inv$'
-            )
+        # The object from the previous build is kept for the unchanged file.
+        self.assertEqual(HTMLFile.objects.count(), 2)
+        new_file_api = HTMLFile.objects.get(path='api/index.html')
+        self.assertEqual(new_file_api.pk, file_api.pk)
+        self.assertEqual(new_file_api.build, 2)
+        self.assertEqual(new_file_api.commit, 'commit02')
+        self.assertEqual(new_file_api.content_hash, file_api.content_hash)
+        sphinx_domain.refresh_from_db()
+        self.assertEqual(sphinx_domain.html_file, new_file_api)
+
+        new_file_test = HTMLFile.objects.get(path='test.html')
+        self.assertNotEqual(new_file_test.pk, file_test.pk)
+        self.assertEqual(new_file_test.build, 2)
+        self.assertNotEqual(new_file_test.content_hash, file_test.content_hash)
+
+    @override_settings(ES_TASK_CHUNK_SIZE=1)
+    @mock.patch('readthedocs.projects.tasks.search.remove_indexed_files')
+    @mock.patch('readthedocs.projects.tasks.search.index_new_files')
+    def test_sync_imported_files_in_chunks(self, index_new_files, remove_indexed_files):
+        self._manage_imported_files(self.version, 'commit01', 1)
+        self._manage_imported_files(self.version, 'commit02', 2)
+
+        # A task per file.
+        self.assertEqual(index_new_files.call_count, 4)
+        html_files = HTMLFile.objects.filter(build=2)
+        self.assertEqual(
+            sorted(call[1]['objects_id'] for call in index_new_files.call_args_list[2:]),
+            [[html_file.pk] for html_file in html_files.order_by('pk')],
+        )
+        # The previous files are removed once, after all the chunks are indexed.
+        self.assertEqual(remove_indexed_files.call_count, 2)
+        remove_indexed_files.assert_called_with(
+            model=HTMLFile,
+            project_slug=self.project.slug,
+            version_slug=self.version.slug,
+            build_id=2,
+        )
         self.assertEqual(ImportedFile.objects.count(), 2)
+        self.assertEqual(ImportedFile.objects.exclude(build=2).count(), 0)
+
+    @override_settings(ES_TASK_CHUNK_SIZE=1)
+    @mock.patch('readthedocs.projects.tasks.search.remove_indexed_files')
+    @mock.patch('readthedocs.projects.tasks.search.index_new_files')
+    def test_sync_imported_files_of_interleaved_builds(self, index_new_files, remove_indexed_files):
+        self._manage_imported_files(self.version, 'commit01', 1)
+        remove_indexed_files.reset_mock()
+
+        # The chunks of builds 2 and 3 are indexed after both builds created their files.
+        with mock.patch('readthedocs.projects.tasks.search.index_build_files.delay') as delay:
+            self._manage_imported_files(self.version, 'commit02', 2)
+            self._manage_imported_files(self.version, 'commit03', 3)
+        chunks = [call[1] for call in delay.call_args_list]
+        self.assertEqual([chunk['build'] for chunk in chunks], [2, 2, 3, 3])
+
+        # The last chunk of build 2 doesn't remove the files from build 3.
+        for chunk in chunks[:2]:
+            index_build_files(**chunk)
+        remove_indexed_files.assert_not_called()
+        self.assertEqual(HTMLFile.objects.filter(build=3).count(), 2)
+
+        for chunk in chunks[2:]:
+            index_build_files(**chunk)
+        remove_indexed_files.assert_called_once_with(
+            model=HTMLFile,
+            project_slug=self.project.slug,
+            version_slug=self.version.slug,
+            build_id=3,
+        )
+        self.assertEqual(
+            set(ImportedFile.objects.values_list('build', flat=True)),
+            {3},
+        )
+
+    @override_settings(ES_TASK_CHUNK_SIZE=1)
+    @mock.patch('readthedocs.projects.tasks.search.remove_indexed_files')
+    @mock.patch('readthedocs.projects.tasks.search.index_new_files')
+    def test_sync_imported_files_without_pending_chunks(self, index_new_files, remove_indexed_files):
+        self._manage_imported_files(self.version, 'commit01', 1)
 
-    @override_settings(RTD_INTERSPHINX_URL="http://localhost:8080")
-    @mock.patch("readthedocs.doc_builder.director.os.path.exists")
-    def test_custom_intersphinx_url(self, mock_exists):
-        mock_exists.return_Value = True
+        with mock.patch('readthedocs.projects.tasks.search.index_build_files.delay') as delay:
+            self._manage_imported_files(self.version, 'commit02', 2)
+        # The counter of pending chunks expired.
+        cache.clear()
+        index_build_files(**delay.call_args[1])
 
-        with mock.patch(
-            'sphinx.ext.intersphinx.fetch_inventory',
-            return_value={}
-        ) as mock_fetch_inventory:
+        # The files from the previous build are removed anyway.
+        self.assertEqual(
+            set(ImportedFile.objects.values_list('build', flat=True)),
+            {2},
+        )
+
+    def _write_objects_inv(self, entries):
+        """
+        Write an ``objects.inv`` file to the storage of the version.
+
+        :param entries: list of ``(name, domain:role, uri, display name)`` tuples.
+        """
+        lines = ''.join(
+            f'{name} {type_} 1 {uri} {display_name}\n'
+            for name, type_, uri, display_name in entries
+        )
+        content = (
+            b'# Sphinx inventory version 2\n'
+            b'# Project: pip\n'
+            b'# Version: latest\n'
+            b'# The remainder of this file is compressed using zlib.\n'
+        ) + zlib.compress(lines.encode())
+        storage_path = self.project.get_storage_path(
+            type_='html',
+            version_slug=self.version.slug,
+            include_file=False,
+        )
+        object_file = self.storage.join(storage_path, 'objects.inv')
+        self.storage.delete(object_file)
+        self.storage.save(object_file, ContentFile(content))
+
+    def test_create_intersphinx_data(self):
+        self._write_objects_inv([
+            # file generated by ``sphinx.builders.html.StandaloneHTMLBuilder``
+            ('sphinx.test.function', 'cpp:function', 'test.html#epub-faq', 'dummy-func-name-1'),
+            ('sample.test.function', 'py:function', 'test.html#sample-test-func', 'dummy-func-name-2'),
+            # file generated by ``sphinx.builders.dirhtml.DirectoryHTMLBuilder``
+            ('testFunction', 'js:function', 'api/#test-func', 'dummy-func-name-3'),
+            # There isn't an HTMLFile for this page
+            ('missing.function', 'py:function', 'missing.html#missing', '-'),
+        ])
+
+        _create_imported_files(
+            version=self.version,
+            commit='commit01',
+            build=1,
+            search_ranking={},
+            search_ignore=[],
+        )
+        _create_intersphinx_data(self.version, 'commit01', 1)
+
+        # there will be two html files,
+        # `api/index.html` and `test.html`
+        self.assertEqual(
+            HTMLFile.objects.all().count(),
+            2
+        )
+        self.assertEqual(
+            HTMLFile.objects.filter(path='test.html').count(),
+            1
+        )
+        self.assertEqual(
+            HTMLFile.objects.filter(path='api/index.html').count(),
+            1
+        )
+
+        html_file_api = HTMLFile.objects.filter(path='api/index.html').first()
+
+        self.assertEqual(
+            SphinxDomain.objects.all().count(),
+            3
+        )
+        self.assertEqual(
+            SphinxDomain.objects.filter(html_file=html_file_api).count(),
+            1
+        )
+        sphinx_domain = SphinxDomain.objects.get(name='sample.test.function')
+        self.assertEqual(sphinx_domain.domain, 'py')
+        self.assertEqual(sphinx_domain.type, 'function')
+        self.assertEqual(sphinx_domain.doc_name, 'test.html')
+        self.assertEqual(sphinx_domain.anchor, 'sample-test-func')
+        self.assertEqual(sphinx_domain.display_name, 'dummy-func-name-2')
+        self.assertEqual(sphinx_domain.html_file.path, 'test.html')
+        self.assertEqual(sphinx_domain.build, 1)
+        self.assertEqual(ImportedFile.objects.count(), 2)
+
+    @mock.patch('readthedocs.projects.tasks.search.SPHINX_DOMAINS_BATCH_SIZE', 100)
+    def test_create_intersphinx_data_in_batches(self):
+        self._write_objects_inv([
+            (f'function{i}', 'py:function', f'test.html#function{i}', '-')
+            for i in range(1000)
+        ])
+        _create_imported_files(
+            version=self.version,
+            commit='commit01',
+            build=1,
+            search_ranking={},
+            search_ignore=[],
+        )
+
+        with mock.patch.object(
+            HTMLFile.objects,
+            'filter',
+            wraps=HTMLFile.objects.filter,
+        ) as filter_html_files, mock.patch.object(
+            SphinxDomain.objects,
+            'bulk_create',
+            wraps=SphinxDomain.objects.bulk_create,
+        ) as bulk_create:
             _create_intersphinx_data(self.version, 'commit01', 1)
 
-            mock_fetch_inventory.assert_called_once()
-            self.assertRegex(
-                mock_fetch_inventory.call_args[0][2],
-                '^http://localhost:8080/media/.*/objects.inv$'
-            )
+        filter_html_files.assert_called_once()
+        self.assertEqual(bulk_create.call_count, 10)
+
+        self.assertEqual(SphinxDomain.objects.count(), 1000)
+        html_file = HTMLFile.objects.get(path='test.html')
+        self.assertEqual(
+            SphinxDomain.objects.filter(html_file=html_file).count(),
+            1000,
+        )
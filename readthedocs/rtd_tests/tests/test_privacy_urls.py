@@ -401,6 +401,7 @@ class APIMixin(URLAccessMixin):
         self.response_data = {
             'domain-list': {'status_code': 410},
             'buildcommandresult-list': {'status_code': 410},
+            'buildcommandresult-bulk': {'status_code': 405},
             'build-concurrent': {'status_code': 403},
             'build-list': {'status_code': 410},
             'build-reset': {'status_code': 403},
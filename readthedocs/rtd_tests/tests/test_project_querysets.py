@@ -2,7 +2,7 @@ from datetime import timedelta
 
 import django_dynamic_fixture as fixture
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django_dynamic_fixture import get
 
 from readthedocs.organizations.models import Organization
@@ -292,3 +292,51 @@ class FeatureQuerySetTests(TestCase):
             [repr(feature)],
             ordered=False,
         )
+
+    def test_has_feature_is_cached(self):
+        project = fixture.get(Project, main_language_project=None)
+        feature = fixture.get(Feature, projects=[project])
+
+        with self.assertNumQueries(1):
+            self.assertTrue(project.has_feature(feature.feature_id))
+            self.assertFalse(project.has_feature('non-existent'))
+            self.assertTrue(project.has_feature(feature.feature_id))
+
+        # A new instance of the project uses the cache.
+        project = Project.objects.get(pk=project.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(project.has_feature(feature.feature_id))
+
+    @override_settings(RTD_PROJECT_FEATURES_CACHE_TIMEOUT=0)
+    def test_has_feature_without_cache(self):
+        project = fixture.get(Project, main_language_project=None)
+        feature = fixture.get(Feature, projects=[project])
+        project.has_feature(feature.feature_id)
+
+        project = Project.objects.get(pk=project.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(project.has_feature(feature.feature_id))
+            self.assertFalse(project.has_feature('non-existent'))
+
+    def test_has_feature_cache_is_invalidated(self):
+        project = fixture.get(Project, main_language_project=None)
+        feature = fixture.get(Feature, projects=[])
+        self.assertFalse(project.has_feature(feature.feature_id))
+
+        feature.projects.add(project)
+        project = Project.objects.get(pk=project.pk)
+        self.assertTrue(project.has_feature(feature.feature_id))
+
+        feature.projects.remove(project)
+        project = Project.objects.get(pk=project.pk)
+        self.assertFalse(project.has_feature(feature.feature_id))
+
+        feature.default_true = True
+        feature.add_date = project.pub_date + timedelta(days=1)
+        feature.save()
+        project = Project.objects.get(pk=project.pk)
+        self.assertTrue(project.has_feature(feature.feature_id))
+
+        feature.delete()
+        project = Project.objects.get(pk=project.pk)
+        self.assertFalse(project.has_feature(feature.feature_id))
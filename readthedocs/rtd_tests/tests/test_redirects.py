@@ -6,6 +6,7 @@ from django_dynamic_fixture import fixture, get
 from readthedocs.builds.constants import LATEST
 from readthedocs.builds.models import Version
 from readthedocs.projects.models import Project
+from readthedocs.redirects.matcher import RedirectMatcher, get_redirect_matcher
 from readthedocs.redirects.models import Redirect
 
 
@@ -181,3 +182,142 @@ class GetFullPathTests(TestCase):
             self.redirect.get_full_path('faq.html'),
             '/docs/read-the-docs/faq.html',
         )
+
+
+class RedirectMatcherTests(TestCase):
+
+    def setUp(self):
+        self.project = get(
+            Project,
+            slug='project',
+            language='en',
+            main_language_project=None,
+        )
+
+    def test_get_redirects(self):
+        prefix = get(Redirect, project=self.project, redirect_type='prefix', from_url='/woot/')
+        root_prefix = get(Redirect, project=self.project, redirect_type='prefix', from_url='/')
+        page = get(Redirect, project=self.project, redirect_type='page', from_url='/woot/install.html')
+        exact = get(
+            Redirect,
+            project=self.project,
+            redirect_type='exact',
+            from_url='/en/latest/woot/install.html',
+        )
+        exact_rest = get(
+            Redirect,
+            project=self.project,
+            redirect_type='exact',
+            from_url='/en/latest/$rest',
+        )
+        sphinx_html = get(Redirect, project=self.project, redirect_type='sphinx_html')
+        sphinx_htmldir = get(Redirect, project=self.project, redirect_type='sphinx_htmldir')
+        redirects = [
+            prefix,
+            root_prefix,
+            page,
+            exact,
+            exact_rest,
+            sphinx_html,
+            sphinx_htmldir,
+        ]
+        matcher = RedirectMatcher(redirects)
+
+        self.assertEqual(
+            matcher.get_redirects(
+                path='/woot/install.html',
+                full_path='/en/latest/woot/install.html',
+            ),
+            [prefix, root_prefix, page, exact, exact_rest, sphinx_htmldir],
+        )
+        self.assertEqual(
+            matcher.get_redirects(path='/woot/', full_path='/en/stable/woot/'),
+            [prefix, root_prefix, sphinx_html],
+        )
+        self.assertEqual(
+            matcher.get_redirects(path='/other.txt', full_path='/es/latest/other.txt'),
+            [root_prefix],
+        )
+        self.assertEqual(
+            matcher.get_redirects(
+                path='/woot/install.html',
+                full_path='/en/latest/woot/install.html',
+                forced_only=True,
+            ),
+            [],
+        )
+
+        sphinx_html.force = True
+        matcher = RedirectMatcher(redirects)
+        self.assertEqual(
+            matcher.get_redirects(path='/woot/', full_path='/en/latest/woot/', forced_only=True),
+            [sphinx_html],
+        )
+
+    def test_get_redirect_path_with_status(self):
+        get(
+            Redirect,
+            project=self.project,
+            redirect_type='page',
+            from_url='/install.html',
+            to_url='/tutorial/install.html',
+            http_status=301,
+        )
+        matcher = RedirectMatcher(Redirect.objects.filter(project=self.project))
+        self.assertEqual(
+            matcher.get_redirect_path_with_status(
+                path='/install.html?query=1',
+                full_path='/en/latest/install.html',
+                language='en',
+                version_slug='latest',
+                project=self.project,
+            ),
+            ('/docs/project/en/latest/tutorial/install.html', 301),
+        )
+        # The redirects of the matcher are shared, they aren't modified.
+        self.assertFalse(Redirect.project.is_cached(matcher.redirects[0]))
+        # Paths without redirects don't hit the database.
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                matcher.get_redirect_path_with_status(
+                    path='/other.html',
+                    full_path='/en/latest/other.html',
+                    language='en',
+                    version_slug='latest',
+                    project=self.project,
+                ),
+                (None, None),
+            )
+
+    def test_get_redirect_matcher_cache(self):
+        redirect = get(
+            Redirect,
+            project=self.project,
+            redirect_type='page',
+            from_url='/install.html',
+        )
+
+        with self.assertNumQueries(1):
+            matcher = get_redirect_matcher(self.project)
+        self.assertEqual(matcher.redirects, [redirect])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_redirect_matcher(self.project), matcher)
+
+        # Saving or deleting a redirect invalidates the cache.
+        new_redirect = get(
+            Redirect,
+            project=self.project,
+            redirect_type='page',
+            from_url='/changelog.html',
+        )
+        self.assertEqual(
+            get_redirect_matcher(self.project).redirects,
+            [new_redirect, redirect],
+        )
+
+        redirect.delete()
+        self.assertEqual(
+            get_redirect_matcher(self.project).redirects,
+            [new_redirect],
+        )
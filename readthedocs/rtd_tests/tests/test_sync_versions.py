@@ -2,18 +2,22 @@ from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 from django_dynamic_fixture import get
 
+from readthedocs.api.v2.utils import sync_versions_to_db
 from readthedocs.builds.constants import BRANCH, EXTERNAL, LATEST, STABLE, TAG
 from readthedocs.builds.models import (
     RegexAutomationRule,
     Version,
     VersionAutomationRule,
 )
+from readthedocs.builds.refs import get_refs_snapshot
 from readthedocs.builds.tasks import sync_versions_task
 from readthedocs.organizations.models import Organization, OrganizationOwner
 from readthedocs.projects.models import Project
+from readthedocs.projects.version_handling import version_sort_key
 
 
 @mock.patch('readthedocs.core.utils.trigger_build', mock.MagicMock())
@@ -22,6 +26,7 @@ class TestSyncVersions(TestCase):
     fixtures = ['eric', 'test_data']
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.get(username='eric')
         self.client.force_login(self.user)
         self.pip = Project.objects.get(slug='pip')
@@ -774,6 +779,208 @@ class TestSyncVersions(TestCase):
             1,
         )
 
+    def test_new_versions_are_created_in_bulk(self):
+        get(
+            Version,
+            project=self.pip,
+            identifier='1234abc',
+            verbose_name='1.0',
+            slug='1.0',
+            type=BRANCH,
+        )
+        tags_data = [
+            {
+                'identifier': f'{i}abc',
+                'verbose_name': f'1.{i}',
+            }
+            for i in range(20)
+        ] + [
+            {
+                'identifier': '1234abc',
+                'verbose_name': 'release/1.0',
+            },
+            {
+                'identifier': '1234abc',
+                'verbose_name': 'release-1.0',
+            },
+        ]
+
+        # Slugs are generated without a query per version.
+        with self.assertNumQueries(6):
+            added = sync_versions_to_db(self.pip, tags_data, TAG)
+
+        self.assertEqual(len(added), 22)
+        self.assertIn('1.0_a', added)
+        self.assertIn('release-1.0', added)
+        self.assertIn('release-1.0_a', added)
+        version = self.pip.versions.get(slug='1.0_a')
+        self.assertEqual(version.verbose_name, '1.0')
+        self.assertEqual(version.type, TAG)
+        self.assertEqual(version.identifier, '0abc')
+        self.assertFalse(version.active)
+        self.assertFalse(version.machine)
+        self.assertEqual(version.sort_key, version_sort_key('1.0'))
+
+    def test_identifiers_are_updated_in_bulk(self):
+        for i in range(5):
+            get(
+                Version,
+                project=self.pip,
+                identifier=f'old{i}',
+                verbose_name=f'2.{i}',
+                machine=True,
+                type=TAG,
+            )
+        get(
+            Version,
+            project=self.pip,
+            identifier='old0',
+            verbose_name='2.0',
+            type=BRANCH,
+        )
+        tags_data = [
+            {
+                'identifier': f'new{i}' if i % 2 else f'old{i}',
+                'verbose_name': f'2.{i}',
+            }
+            for i in range(5)
+        ]
+
+        with self.assertNumQueries(5):
+            added = sync_versions_to_db(self.pip, tags_data, TAG)
+
+        self.assertEqual(added, set())
+        for i in range(5):
+            version = self.pip.versions.get(verbose_name=f'2.{i}', type=TAG)
+            if i % 2:
+                self.assertEqual(version.identifier, f'new{i}')
+                self.assertFalse(version.machine)
+            else:
+                self.assertEqual(version.identifier, f'old{i}')
+                self.assertTrue(version.machine)
+        self.assertEqual(
+            self.pip.versions.get(verbose_name='2.0', type=BRANCH).identifier,
+            'old0',
+        )
+
+    def test_sync_only_changed_refs(self):
+        branches_data = [
+            {
+                'identifier': 'master',
+                'verbose_name': 'master',
+            },
+            {
+                'identifier': 'to_delete',
+                'verbose_name': 'to_delete',
+            },
+        ]
+        tags_data = [
+            {
+                'identifier': f'{i}abc',
+                'verbose_name': f'1.{i}',
+            }
+            for i in range(5)
+        ]
+        sync_versions_task(self.pip.pk, tags_data=tags_data, branches_data=branches_data)
+        self.assertEqual(
+            get_refs_snapshot(self.pip.pk),
+            {
+                'tags': {f'1.{i}': f'{i}abc' for i in range(5)},
+                'branches': {'master': 'master', 'to_delete': 'to_delete'},
+            },
+        )
+
+        # 1.0 is moved, 1.1 is removed, 1.5 is added, and to_delete is removed.
+        tags_data[0]['identifier'] = 'moved'
+        del tags_data[1]
+        tags_data.append({'identifier': '5abc', 'verbose_name': '1.5'})
+        del branches_data[1]
+
+        with mock.patch(
+            'readthedocs.builds.tasks.sync_versions_to_db',
+            wraps=sync_versions_to_db,
+        ) as sync:
+            sync_versions_task(self.pip.pk, tags_data=tags_data, branches_data=branches_data)
+
+        self.assertEqual(
+            [call.kwargs['versions'] for call in sync.call_args_list],
+            [
+                [
+                    {'identifier': 'moved', 'verbose_name': '1.0'},
+                    {'identifier': '5abc', 'verbose_name': '1.5'},
+                ],
+                [],
+            ],
+        )
+        self.assertEqual(
+            set(
+                self.pip.versions.filter(type=TAG, verbose_name__startswith='1.')
+                .values_list('verbose_name', 'identifier')
+            ),
+            {('1.0', 'moved'), ('1.2', '2abc'), ('1.3', '3abc'), ('1.4', '4abc'), ('1.5', '5abc')},
+        )
+        self.assertFalse(self.pip.versions.filter(slug='to_delete').exists())
+        self.assertEqual(
+            get_refs_snapshot(self.pip.pk)['tags'],
+            {version['verbose_name']: version['identifier'] for version in tags_data},
+        )
+
+    def test_refs_snapshot_is_invalidated(self):
+        sync_versions_task(
+            self.pip.pk,
+            tags_data=[{'identifier': '1abc', 'verbose_name': '1.0'}],
+            branches_data=[{'identifier': 'master', 'verbose_name': 'master'}],
+        )
+        self.assertIsNotNone(get_refs_snapshot(self.pip.pk))
+
+        # Versions saved without changing their ref (e.g. by builds) keep the snapshot.
+        version = self.pip.versions.get(slug='1.0')
+        version.active = True
+        version.built = True
+        version.save()
+        self.assertIsNotNone(get_refs_snapshot(self.pip.pk))
+
+        # A ref changed outside of a sync needs a full sync.
+        version.identifier = '2abc'
+        version.save()
+        self.assertIsNone(get_refs_snapshot(self.pip.pk))
+
+        sync_versions_task(
+            self.pip.pk,
+            tags_data=[{'identifier': '1abc', 'verbose_name': '1.0'}],
+            branches_data=[{'identifier': 'master', 'verbose_name': 'master'}],
+        )
+        self.assertIsNotNone(get_refs_snapshot(self.pip.pk))
+        get(Version, project=self.pip, slug='new', verbose_name='new', type=BRANCH)
+        self.assertIsNone(get_refs_snapshot(self.pip.pk))
+
+        sync_versions_task(
+            self.pip.pk,
+            tags_data=[{'identifier': '1abc', 'verbose_name': '1.0'}],
+            branches_data=[{'identifier': 'master', 'verbose_name': 'master'}],
+        )
+        self.assertIsNotNone(get_refs_snapshot(self.pip.pk))
+        self.pip.versions.get(slug='1.0').delete()
+        self.assertIsNone(get_refs_snapshot(self.pip.pk))
+
+    @mock.patch('readthedocs.builds.tasks.run_automation_rules')
+    def test_deleted_active_version_is_reported_once_with_refs_snapshot(
+        self,
+        run_automation_rules,
+    ):
+        tags_data = [{'identifier': '1abc', 'verbose_name': '1.0'}]
+        branches_data = [{'identifier': 'master', 'verbose_name': 'master'}]
+        sync_versions_task(self.pip.pk, tags_data=tags_data, branches_data=branches_data)
+        self.pip.versions.filter(slug='1.0').update(active=True)
+
+        # Only the first sync that sees the ref removed reports the version.
+        sync_versions_task(self.pip.pk, tags_data=[], branches_data=branches_data)
+        self.assertIn('1.0', run_automation_rules.call_args[0][2])
+
+        sync_versions_task(self.pip.pk, tags_data=[], branches_data=branches_data)
+        self.assertEqual(run_automation_rules.call_args[0][2], set())
+        # Active versions aren't deleted.
+        self.assertTrue(self.pip.versions.filter(slug='1.0', active=True).exists())
 
     @mock.patch('readthedocs.builds.tasks.run_automation_rules')
     def test_automation_rules_are_triggered_for_new_versions(self, run_automation_rules):
@@ -941,6 +1148,7 @@ class TestStableVersion(TestCase):
     fixtures = ['eric', 'test_data']
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.get(username='eric')
         self.client.force_login(self.user)
         self.pip = Project.objects.get(slug='pip')
@@ -1419,6 +1627,7 @@ class TestLatestVersion(TestCase):
     fixtures = ['eric', 'test_data']
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.get(username='eric')
         self.client.force_login(self.user)
         self.pip = Project.objects.get(slug='pip')
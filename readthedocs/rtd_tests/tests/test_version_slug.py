@@ -106,6 +106,13 @@ class VersionSlugFieldTests(TestCase):
         self.assertEqual(field.uniquifying_suffix(26), '_ba')
         self.assertEqual(field.uniquifying_suffix(52), '_ca')
 
+    def test_create_slugs(self):
+        field = VersionSlugField(max_length=255, populate_from='foo')
+        self.assertEqual(
+            field.create_slugs(['1!0', '1%0', 'latest', 'v2', '!'], existing_slugs=['1-0', 'latest']),
+            ['1-0_a', '1-0_b', 'latest_a', 'v2', 'unknown'],
+        )
+
     def test_unicode(self):
         version = Version.objects.create(
             verbose_name='camión',
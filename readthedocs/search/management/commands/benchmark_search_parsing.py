@@ -0,0 +1,70 @@
+"""
+Benchmark parsing the pages of a version for search indexing.
+
+Parses all the ``HTMLFile`` objects of a stored version in the chunks
+indexed by each ``index_build_files`` task (``ES_TASK_CHUNK_SIZE`` files),
+and reports the pages parsed per second of a single task,
+and the number of tasks the version is split into when it's indexed.
+
+Invoked via ``./manage.py benchmark_search_parsing <project-slug> <version-slug>``.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from readthedocs.builds.models import Version
+from readthedocs.projects.models import HTMLFile
+
+
+class Command(BaseCommand):
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('project', help='Slug of the project.')
+        parser.add_argument('version', help='Slug of the version.')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.ES_TASK_CHUNK_SIZE,
+            help='Number of files indexed by each task.',
+        )
+
+    def handle(self, *args, **options):
+        version = Version.objects.select_related('project').get(
+            project__slug=options['project'],
+            slug=options['version'],
+        )
+        html_files_id = list(
+            HTMLFile.objects.filter(version=version)
+            .exclude(ignore=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        chunk_size = options['chunk_size']
+
+        pages = 0
+        elapsed = []
+        for i in range(0, len(html_files_id), chunk_size):
+            queryset = (
+                HTMLFile.objects.filter(pk__in=html_files_id[i:i + chunk_size])
+                .select_related('project', 'version')
+            )
+            start = time.monotonic()
+            for html_file in queryset.iterator():
+                html_file.processed_json  # noqa
+                pages += 1
+            elapsed.append(time.monotonic() - start)
+
+        total = sum(elapsed)
+        self.stdout.write(
+            f'{pages} pages in {len(elapsed)} tasks, {total:.2f}s '
+            f'({pages / total if total else 0:.1f} pages/sec per task)',
+        )
+        if elapsed:
+            self.stdout.write(
+                f'slowest task: {max(elapsed):.2f}s '
+                '(time to parse the version with a worker per task)',
+            )
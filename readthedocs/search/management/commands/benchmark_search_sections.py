@@ -0,0 +1,60 @@
+"""
+Micro-benchmark the extraction of sections from HTML pages.
+
+Copies the given local HTML files into a temporary build media storage
+and parses each of them with ``GenericParser.parse`` ``--iterations`` times,
+reporting the time spent per page and the number of sections extracted.
+
+Invoked via ``./manage.py benchmark_search_sections page.html [page.html ...]``.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from readthedocs.builds.models import Version
+from readthedocs.builds.storage import BuildMediaFileSystemStorage
+from readthedocs.projects.models import Project
+from readthedocs.search.parsers import GenericParser
+
+
+class Command(BaseCommand):
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='HTML files to parse.')
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        # The parser doesn't need objects from the database to parse content from storage.
+        version = Version(slug='benchmark', project=Project(slug='benchmark'))
+        parser = GenericParser(version)
+
+        with tempfile.TemporaryDirectory() as location:
+            parser.storage = BuildMediaFileSystemStorage(location=location)
+            storage_path = version.project.get_storage_path(
+                type_='html',
+                version_slug=version.slug,
+                include_file=False,
+            )
+            os.makedirs(os.path.join(location, storage_path))
+
+            total = 0
+            for i, file in enumerate(options['files']):
+                page = f'{i}-{os.path.basename(file)}'
+                shutil.copyfile(file, os.path.join(location, storage_path, page))
+                start = time.monotonic()
+                for _ in range(options['iterations']):
+                    parsed = parser.parse(page)
+                elapsed = (time.monotonic() - start) / options['iterations']
+                total += elapsed
+
+                self.stdout.write(
+                    f'{file}: {os.path.getsize(file) // 1024} KiB, '
+                    f'{len(parsed["sections"])} sections, {elapsed * 1000:.1f} ms/page',
+                )
+            self.stdout.write(f'Total: {total * 1000:.1f} ms')
@@ -13,6 +13,9 @@ from readthedocs.storage import build_media_storage
 
 log = structlog.get_logger(__name__)
 
+SECTION_TAG_RE = re.compile(r"h\d$")
+SECTION_HEADER_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
 
 class GenericParser:
 
@@ -43,16 +46,17 @@ class GenericParser:
             )
         return content
 
-    def _get_page_title(self, body, html):
+    def _get_page_title(self, headers, html):
         """
         Gets the title from the html page.
 
         The title is the first section in the document,
         falling back to the ``title`` tag.
+
+        :param headers: section headers from ``_clean_body``.
         """
-        first_header = body.css_first('h1')
-        if first_header:
-            title, _ = self._parse_section_title(first_header)
+        if headers and headers[0].tag == 'h1':
+            title, _ = self._parse_section_title(headers[0])
             return title
 
         title = html.css_first('title')
@@ -107,12 +111,9 @@ class GenericParser:
 
     def _parse_content(self, content):
         """Converts all new line characters and multiple spaces to a single space."""
-        content = content.strip().split()
-        content = (text.strip() for text in content)
-        content = ' '.join(text for text in content if text)
-        return content
+        return ' '.join(content.split())
 
-    def _parse_sections(self, title, body):
+    def _parse_sections(self, title, body, headers):
         """
         Parses each section into a structured dict.
 
@@ -141,24 +142,22 @@ class GenericParser:
             log.info('Unable to index section', section=str(e))
 
         # Index content from h1 to h6 headers.
-        for head_level in range(1, 7):
-            tags = body.css(f'h{head_level}')
-            for tag in tags:
-                try:
-                    title, id = self._parse_section_title(tag)
-                    next_tag = self._get_header_container(tag).next
-                    content, _ = self._parse_section_content(next_tag, depth=2)
-                    yield {
-                        'id': id,
-                        'title': title,
-                        'content': content,
-                    }
-                except Exception as e:
-                    log.info('Unable to index section.', section=str(e))
-
-    def _get_sections(self, title, body):
+        for tag in headers:
+            try:
+                title, id = self._parse_section_title(tag)
+                next_tag = self._get_header_container(tag).next
+                content, _ = self._parse_section_content(next_tag, depth=2)
+                yield {
+                    'id': id,
+                    'title': title,
+                    'content': content,
+                }
+            except Exception as e:
+                log.info('Unable to index section.', section=str(e))
+
+    def _get_sections(self, title, body, headers):
         """Get the first `self.max_inner_documents` sections."""
-        iterator = self._parse_sections(title=title, body=body)
+        iterator = self._parse_sections(title=title, body=body, headers=headers)
         sections = list(itertools.islice(iterator, 0, self.max_inner_documents))
         try:
             next(iterator)
@@ -175,24 +174,52 @@ class GenericParser:
 
     def _clean_body(self, body):
         """
-        Removes nodes with irrelevant content before parsing its sections.
+        Removes nodes with irrelevant content and gets the section headers of `body`.
+
+        This is done in a single walk over the nodes of `body` in document order,
+        the children of the nodes that are removed aren't visited.
 
         .. warning::
 
            This will mutate the original `body`.
+
+        :returns: the ``h1`` to ``h6`` tags sorted by level (all ``h1`` tags first,
+         then ``h2``, etc), and in the order they appear in the document for the same level.
         """
-        nodes_to_be_removed = itertools.chain(
-            # Navigation nodes
-            body.css('nav'),
-            body.css('[role=navigation]'),
-            body.css('[role=search]'),
-            # Permalinks
-            body.css('.headerlink'),
-        )
+        headers = {tag: [] for tag in SECTION_HEADER_TAGS}
+        nodes_to_be_removed = []
+        # The next sibling of a node is pushed before its first child,
+        # so all the children are visited before the sibling.
+        pending = [body.child]
+        while pending:
+            node = pending.pop()
+            if node is None:
+                continue
+            pending.append(node.next)
+
+            # Text and comment nodes.
+            if node.tag.startswith(('-', '_')):
+                continue
+            if self._is_irrelevant_node(node):
+                nodes_to_be_removed.append(node)
+                continue
+            if node.tag in headers:
+                headers[node.tag].append(node)
+            pending.append(node.child)
+
         for node in nodes_to_be_removed:
             node.decompose()
 
-        return body
+        return list(itertools.chain.from_iterable(headers.values()))
+
+    def _is_irrelevant_node(self, node):
+        """Check if `node` is a navigation node or a permalink."""
+        if node.tag == 'nav':
+            return True
+        attributes = node.attributes
+        if attributes.get('role') in ('navigation', 'search'):
+            return True
+        return 'headerlink' in (attributes.get('class') or '').split()
 
     def _is_section(self, tag):
         """
@@ -200,8 +227,7 @@ class GenericParser:
 
         The tag is a section if it's a ``h`` or a ``header`` tag.
         """
-        is_h_tag = re.match(r"h\d$", tag.tag)
-        return is_h_tag or tag.tag == "header"
+        return tag.tag == "header" or SECTION_TAG_RE.match(tag.tag)
 
     def _parse_section_title(self, tag):
         """
@@ -262,13 +288,11 @@ class GenericParser:
         Sphinx and Mkdocs codeblocks usually have a class named
         ``highlight`` or ``highlight-{language}``.
         """
-        if not tag.css_first('pre'):
+        # Check the classes first, looking for a ``pre`` tag requires walking all its children.
+        classes = tag.attributes.get('class') or ''
+        if not any(c.startswith('highlight') for c in classes.split()):
             return False
-
-        for c in tag.attributes.get('class', '').split():
-            if c.startswith('highlight'):
-                return True
-        return False
+        return bool(tag.css_first('pre'))
 
     def _parse_code_section(self, tag):
         """
@@ -332,9 +356,9 @@ class GenericParser:
         title = ""
         sections = []
         if body:
-            body = self._clean_body(body)
-            title = self._get_page_title(body, html) or page
-            sections = self._get_sections(title=title, body=body)
+            headers = self._clean_body(body)
+            title = self._get_page_title(headers, html) or page
+            sections = self._get_sections(title=title, body=body, headers=headers)
         else:
             log.info(
                 "Page doesn't look like it has valid content, skipping.",
@@ -422,8 +446,9 @@ class SphinxParser(GenericParser):
 
         if 'body' in data:
             try:
-                body = self._clean_body(HTMLParser(data["body"]))
-                sections = self._get_sections(title=title, body=body.body)
+                body = HTMLParser(data["body"]).body
+                headers = self._clean_body(body)
+                sections = self._get_sections(title=title, body=body, headers=headers)
             except Exception:
                 log.info('Unable to index sections.', path=fjson_path)
 
@@ -463,33 +488,34 @@ class SphinxParser(GenericParser):
                 domains.append(tag)
         return domains
 
-    def _clean_body(self, body):
+    def _is_irrelevant_node(self, node):
         """
-        Removes sphinx domain nodes.
+        Check if `node` is a sphinx domain or a table of contents.
 
         This method is overridden to remove contents that are likely
         to be a sphinx domain (`dl` tags).
         We already index those in another step.
         """
-        body = super()._clean_body(body)
-        # XXX: Don't exclude domains from the general search
-        # while we migrate the ID type of the sphinx domains table
-        # https://github.com/readthedocs/readthedocs.org/pull/9482.
-        nodes_to_be_removed = []
-        from readthedocs.projects.models import Feature
-
-        if not self.project.has_feature(Feature.DISABLE_SPHINX_DOMAINS):
-            nodes_to_be_removed = self._get_sphinx_domains(body)
+        if super()._is_irrelevant_node(node):
+            return True
 
+        classes = (node.attributes.get('class') or '').split()
         # TODO: see if we really need to remove these
         # remove `Table of Contents` elements
-        nodes_to_be_removed += body.css('.toctree-wrapper') + body.css('.contents.local.topic')
+        if 'toctree-wrapper' in classes or {'contents', 'local', 'topic'}.issubset(classes):
+            return True
 
-        # removing all nodes in list
-        for node in nodes_to_be_removed:
-            node.decompose()
+        # XXX: Don't exclude domains from the general search
+        # while we migrate the ID type of the sphinx domains table
+        # https://github.com/readthedocs/readthedocs.org/pull/9482.
+        from readthedocs.projects.models import Feature
 
-        return body
+        return (
+            node.tag == 'dl'
+            and 'footnote' not in classes
+            and not self.project.has_feature(Feature.DISABLE_SPHINX_DOMAINS)
+            and bool(node.css_first('dt[id]'))
+        )
 
     def _generate_domains_data(self, body):
         """
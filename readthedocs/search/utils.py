@@ -11,8 +11,13 @@ from readthedocs.projects.models import HTMLFile
 log = structlog.get_logger(__name__)
 
 
-def index_new_files(model, version, build):
-    """Index new files from the version into the search index."""
+def index_new_files(model, version, build, objects_id=None):
+    """
+    Index new files from the version into the search index.
+
+    :param objects_id: List of IDs of the files to index,
+     all the files from ``build`` are indexed if it isn't given.
+    """
 
     log.bind(
         project_slug=version.project.slug,
@@ -30,12 +35,69 @@ def index_new_files(model, version, build):
             doc_obj.get_queryset()
             .filter(project=version.project, version=version, build=build)
         )
+        if objects_id is not None:
+            queryset = queryset.filter(pk__in=objects_id)
         log.info('Indexing new objecst into search index.')
         doc_obj.update(queryset.iterator())
     except Exception:
         log.exception('Unable to index a subset of files. Continuing.')
 
 
+def index_files(model, files):
+    """
+    Index ``files`` into the search index.
+
+    :param model: Class of the model to be indexed.
+    :param files: Iterable of instances of ``model``.
+    """
+    if not DEDConfig.autosync_enabled():
+        log.info('Autosync disabled. Skipping indexing into the search index.')
+        return
+
+    try:
+        document = list(registry.get_documents(models=[model]))[0]
+        document().update(files)
+    except Exception:
+        log.exception('Unable to index a subset of files. Continuing.')
+
+
+def update_indexed_files_build(model, objects_id, build, commit):
+    """
+    Update the build and commit of files that are already in the search index.
+
+    Used to keep the documents of the files that didn't change between builds,
+    otherwise they would be deleted by ``remove_indexed_files``.
+
+    :param model: Class of the model to be updated.
+    :param objects_id: IDs of the objects to update.
+    :param build: Build id.
+    :param commit: Commit of the build.
+    :returns: ``True`` if the documents were updated.
+    """
+    if not DEDConfig.autosync_enabled():
+        log.info('Autosync disabled, skipping update of the search index.')
+        return False
+
+    try:
+        document = list(registry.get_documents(models=[model]))[0]
+        log.info('Updating build of unchanged files in search index.', count=len(objects_id))
+        (
+            document._index.updateByQuery()
+            .filter('ids', values=[str(object_id) for object_id in objects_id])
+            .script(
+                source='ctx._source.build = params.build; ctx._source.commit = params.commit',
+                params={'build': build, 'commit': commit},
+            )
+            # Make the changes visible to the next delete by query of ``remove_indexed_files``.
+            .params(refresh=True)
+            .execute()
+        )
+    except Exception:
+        log.exception('Unable to update a subset of files.')
+        return False
+    return True
+
+
 def remove_indexed_files(model, project_slug, version_slug=None, build_id=None):
     """
     Remove files from `version_slug` of `project_slug` from the search index.
@@ -44,7 +106,8 @@ def remove_indexed_files(model, project_slug, version_slug=None, build_id=None):
     :param project_slug: Project slug.
     :param version_slug: Version slug. If isn't given,
                     all index from `project` are deleted.
-    :param build_id: Build id. If isn't given, all index from `version` are deleted.
+    :param build_id: Build id. If it's given, only files from older builds are deleted,
+     otherwise all index from `version` are deleted.
     """
 
     log.bind(
@@ -66,7 +129,9 @@ def remove_indexed_files(model, project_slug, version_slug=None, build_id=None):
         if version_slug:
             documents = documents.filter('term', version=version_slug)
         if build_id:
-            documents = documents.exclude('term', build=build_id)
+            # Don't delete the files from this build or from newer builds,
+            # their files may be indexed before this build finishes.
+            documents = documents.exclude('range', build={'gte': build_id})
         documents.delete()
     except Exception:
         log.exception('Unable to delete a subset of files. Continuing.')
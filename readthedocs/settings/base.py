@@ -54,7 +54,6 @@ class CommunityBaseSettings(Settings):
     PUBLIC_DOMAIN_USES_HTTPS = env("PUBLIC_DOMAIN_USES_HTTPS", False,is_bool=True)
     USE_SUBDOMAIN = env("USE_SUBDOMAIN", False,is_bool=True)
     PUBLIC_API_URL = 'https://{}'.format(PRODUCTION_DOMAIN)
-    RTD_INTERSPHINX_URL = 'https://{}'.format(PRODUCTION_DOMAIN)
     RTD_EXTERNAL_VERSION_DOMAIN = env("RTD_EXTERNAL_VERSION_DOMAIN", 'build.docs.c3sl.ufpr.br')
 
     # Doc Builder Backends
@@ -125,7 +124,21 @@ class CommunityBaseSettings(Settings):
     RTD_BUILDS_RETRY_DELAY = env("RTD_BUILDS_RETRY_DELAY", 5 * 60) # seconds
     RTD_BUILD_STATUS_API_NAME = env("RTD_BUILD_STATUS_API_NAME", 'docs/readthedocs')
     RTD_ANALYTICS_DEFAULT_RETENTION_DAYS = env("RTD_ANALYTICS_DEFAULT_RETENTION_DAYS", 30 * 3)
+    # Count page views in memory and save them in bulk from a task,
+    # instead of updating the database on each request.
+    # The buffer is saved when it has this number of different pages or after this number of seconds.
+    RTD_PAGEVIEWS_BUFFER = env("RTD_PAGEVIEWS_BUFFER", False,is_bool=True)
+    RTD_PAGEVIEWS_BUFFER_MAX_SIZE = env("RTD_PAGEVIEWS_BUFFER_MAX_SIZE", 1000)
+    RTD_PAGEVIEWS_BUFFER_INTERVAL = env("RTD_PAGEVIEWS_BUFFER_INTERVAL", 60)
     RTD_AUDITLOGS_DEFAULT_RETENTION_DAYS = env("RTD_AUDITLOGS_DEFAULT_RETENTION_DAYS", 30 * 3)
+    # Save the audit logs of page views and downloads in bulk from a task,
+    # instead of saving each log while serving the file.
+    # Batches are sent when they have this number of logs or after this number of seconds,
+    # new logs are dropped when the queue of each process has more than the max size.
+    RTD_AUDITLOGS_QUEUE = env("RTD_AUDITLOGS_QUEUE", False,is_bool=True)
+    RTD_AUDITLOGS_QUEUE_BATCH_SIZE = env("RTD_AUDITLOGS_QUEUE_BATCH_SIZE", 100)
+    RTD_AUDITLOGS_QUEUE_INTERVAL = env("RTD_AUDITLOGS_QUEUE_INTERVAL", 5)
+    RTD_AUDITLOGS_QUEUE_MAX_SIZE = env("RTD_AUDITLOGS_QUEUE_MAX_SIZE", 10000)
 
     # Keep BuildData models on database during this time
     RTD_TELEMETRY_DATA_RETENTION_DAYS = env("RTD_TELEMETRY_DATA_RETENTION_DAYS", 30 * 6  )
@@ -134,6 +147,13 @@ class CommunityBaseSettings(Settings):
     DONT_HIT_API = env("DONT_HIT_API", False,is_bool=True)
     DONT_HIT_DB = env("DONT_HIT_DB", True,is_bool=True)
     RTD_SAVE_BUILD_COMMANDS_TO_STORAGE = env("RTD_SAVE_BUILD_COMMANDS_TO_STORAGE", False,is_bool=True)
+    # Builders send the build commands to the API in batches of this number of commands,
+    # or when this number of seconds have passed since the first command of the batch was run.
+    RTD_BUILD_COMMANDS_BATCH_SIZE = env("RTD_BUILD_COMMANDS_BATCH_SIZE", 20)
+    RTD_BUILD_COMMANDS_BATCH_INTERVAL = env("RTD_BUILD_COMMANDS_BATCH_INTERVAL", 10)
+    # Max time the refs of the last sync of versions of a project are kept,
+    # a full sync of versions is done after that.
+    RTD_REFS_SNAPSHOT_CACHE_TIMEOUT = env("RTD_REFS_SNAPSHOT_CACHE_TIMEOUT", 60 * 60 * 24)
     DATABASE_ROUTERS = ['readthedocs.core.db.MapAppsRouter']
 
     USER_MATURITY_DAYS = env("USER_MATURITY_DAYS", 7)
@@ -149,6 +169,33 @@ class CommunityBaseSettings(Settings):
 
     RTD_EXT_THEME_DEV_SERVER = env("RTD_EXT_THEME_DEV_SERVER", None)
 
+    # Seconds to cache the host -> project resolution done by the proxito middleware.
+    # The cache is invalidated when a Domain, Project or ProjectRelationship changes.
+    RTD_PROXITO_HOST_CACHE_TIMEOUT = env("RTD_PROXITO_HOST_CACHE_TIMEOUT", 60 * 60)
+    # Seconds to cache hosts and slugs that don't map to any project.
+    # Any client can send random hosts, so they are kept for a short time only.
+    RTD_PROXITO_HOST_NEGATIVE_CACHE_TIMEOUT = env("RTD_PROXITO_HOST_NEGATIVE_CACHE_TIMEOUT", 60)
+
+    # Seconds to cache the features of a project across requests, set to 0 to disable it.
+    # The cache is invalidated when a Feature changes.
+    RTD_PROJECT_FEATURES_CACHE_TIMEOUT = env("RTD_PROJECT_FEATURES_CACHE_TIMEOUT", 60 * 60)
+
+    # Seconds to cache the compiled redirects of a project.
+    # The cache is invalidated when a Redirect changes.
+    RTD_REDIRECTS_CACHE_TIMEOUT = env("RTD_REDIRECTS_CACHE_TIMEOUT", 60 * 60)
+
+    # Seconds to cache the rendered sitemap.xml of a project.
+    # The cache is invalidated when a build finishes or the versions of the project change.
+    RTD_SITEMAP_CACHE_TIMEOUT = env("RTD_SITEMAP_CACHE_TIMEOUT", 60 * 60 * 12)
+
+    # Seconds to cache the responses of the footer API, set to 0 to disable it.
+    # The cache is invalidated when a version, build or translation of the project changes.
+    RTD_FOOTER_CACHE_TIMEOUT = env("RTD_FOOTER_CACHE_TIMEOUT", 60 * 60)
+
+    # Seconds to keep the summary of the builds of a version used to route build tasks.
+    # The summary is updated when a build of the version finishes.
+    RTD_BUILD_ROUTING_CACHE_TIMEOUT = env("RTD_BUILD_ROUTING_CACHE_TIMEOUT", 60 * 60 * 24 * 7)
+
     # Application classes
     @property
     def INSTALLED_APPS(self):  # noqa
@@ -329,6 +376,9 @@ class CommunityBaseSettings(Settings):
     RTD_BUILD_TOOLS_STORAGE = 'readthedocs.builds.storage.BuildMediaFileSystemStorage'
     RTD_BUILD_COMMANDS_STORAGE = 'readthedocs.builds.storage.BuildMediaFileSystemStorage'
     RTD_STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+    # Number of threads used to upload build artifacts
+    # when syncing them incrementally (``INCREMENTAL_STORAGE_SYNC`` feature)
+    RTD_BUILD_MEDIA_SYNC_MAX_WORKERS = env("RTD_BUILD_MEDIA_SYNC_MAX_WORKERS", 8)
 
     @property
     def TEMPLATES(self):
@@ -432,6 +482,11 @@ class CommunityBaseSettings(Settings):
             'schedule': crontab(minute=0, hour=1),
             'options': {'queue': 'web'},
         },
+        'every-hour-update-page-view-rollups': {
+            'task': 'readthedocs.analytics.tasks.update_page_view_rollups',
+            'schedule': crontab(minute=30),
+            'options': {'queue': 'web'},
+        },
         'every-day-delete-old-buildata-models': {
             'task': 'readthedocs.telemetry.tasks.delete_old_build_data',
             'schedule': crontab(minute=0, hour=2),
@@ -448,7 +503,7 @@ class CommunityBaseSettings(Settings):
             'options': {'queue': 'web'},
             'kwargs': {
                 'days': 1,
-                'limit': 500,
+                'limit': 5000,
                 'delete': True,
             },
         },
@@ -487,6 +542,12 @@ class CommunityBaseSettings(Settings):
 
     RTD_DOCKER_COMPOSE = env("RTD_DOCKER_COMPOSE", False,is_bool=True)
 
+    # Directory where builders keep bare mirrors of the repositories they clone,
+    # mirrors are disabled if it's empty. See ``readthedocs.vcs_support.mirrors``.
+    RTD_GIT_MIRRORS_DIR = env("RTD_GIT_MIRRORS_DIR", None)
+    # Max size in bytes of all the mirrors of a builder.
+    RTD_GIT_MIRRORS_MAX_SIZE = env("RTD_GIT_MIRRORS_MAX_SIZE", 50 * 1024 ** 3)
+
     DOCKER_DEFAULT_IMAGE = env("DOCKER_DEFAULT_IMAGE", 'readthedocs/build')
     DOCKER_VERSION = env("DOCKER_VERSION", 'auto')
     DOCKER_DEFAULT_VERSION = env("DOCKER_DEFAULT_VERSION", 'latest')
@@ -940,6 +1001,9 @@ class CommunityBaseSettings(Settings):
     RTD_EMBED_API_DEFAULT_REQUEST_TIMEOUT = env("RTD_EMBED_API_DEFAULT_REQUEST_TIMEOUT", 1)
     RTD_EMBED_API_DOMAIN_RATE_LIMIT = env("RTD_EMBED_API_DOMAIN_RATE_LIMIT", 50)
     RTD_EMBED_API_DOMAIN_RATE_LIMIT_TIMEOUT = env("RTD_EMBED_API_DOMAIN_RATE_LIMIT_TIMEOUT", 60)
+    # Responses are keyed by the latest build of the version,
+    # the ones of previous builds expire after this time (see ``readthedocs.embed.cache``).
+    RTD_EMBED_API_RESPONSE_CACHE_TIMEOUT = env("RTD_EMBED_API_RESPONSE_CACHE_TIMEOUT", 60 * 60)
 
     RTD_SPAM_THRESHOLD_DONT_SHOW_ADS = env("RTD_SPAM_THRESHOLD_DONT_SHOW_ADS", 100)
     RTD_SPAM_THRESHOLD_DENY_ON_ROBOTS = env("RTD_SPAM_THRESHOLD_DENY_ON_ROBOTS", 200)
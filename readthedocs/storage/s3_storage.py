@@ -9,14 +9,17 @@ in our Docker Development environment.
 
 # Disable abstract method because we are not overriding all the methods
 # pylint: disable=abstract-method
+import structlog
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
 from storages.backends.s3boto3 import S3Boto3Storage, S3ManifestStaticStorage
 
 from readthedocs.builds.storage import BuildMediaStorageMixin
 
 from .mixins import OverrideHostnameMixin, S3PrivateBucketMixin
 
+log = structlog.get_logger(__name__)
+
 
 class S3BuildMediaStorage(BuildMediaStorageMixin, OverrideHostnameMixin, S3Boto3Storage):
 
@@ -25,6 +28,9 @@ class S3BuildMediaStorage(BuildMediaStorageMixin, OverrideHostnameMixin, S3Boto3
     bucket_name = getattr(settings, 'S3_MEDIA_STORAGE_BUCKET', None)
     override_hostname = getattr(settings, 'S3_MEDIA_STORAGE_OVERRIDE_HOSTNAME', None)
 
+    # Max number of keys accepted by a single ``DeleteObjects`` request.
+    delete_objects_max_keys = 1000
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -34,6 +40,74 @@ class S3BuildMediaStorage(BuildMediaStorageMixin, OverrideHostnameMixin, S3Boto3
                 'Ensure S3_MEDIA_STORAGE_BUCKET is defined.',
             )
 
+    def delete_directory(self, path):
+        """
+        Delete all files under a certain path from storage.
+
+        Instead of walking the directory and deleting each file,
+        this lists all the keys under the prefix with ``ListObjectsV2``
+        (1000 keys per page), and deletes each page with one ``DeleteObjects`` request.
+
+        :param path: the path to the directory to remove
+        """
+        if path in ('', '/'):
+            raise SuspiciousFileOperation('Deleting all storage cannot be right')
+
+        log.debug('Deleting path from media storage', path=path)
+        for keys in self._iter_keys(path):
+            self._delete_keys(keys)
+
+    def delete_files(self, paths):
+        """Delete files using ``DeleteObjects`` requests of up to 1000 keys each."""
+        keys = [self._normalize_name(self._clean_name(path)) for path in paths]
+        for start in range(0, len(keys), self.delete_objects_max_keys):
+            self._delete_keys(keys[start:start + self.delete_objects_max_keys])
+
+    def _list_files(self, path):
+        """Return the paths of all files under ``path`` without listing each directory."""
+        prefix = self._get_prefix(path)
+        for keys in self._iter_keys(path):
+            for key in keys:
+                yield key[len(prefix):]
+
+    def _get_prefix(self, path):
+        return self._normalize_name(self._clean_name(self._dirpath(path)))
+
+    def _iter_keys(self, path):
+        """Yield the keys under ``path``, one list per page of ``ListObjectsV2``."""
+        paginator = self.connection.meta.client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=self._get_prefix(path),
+            PaginationConfig={'PageSize': self.delete_objects_max_keys},
+        )
+        for page in pages:
+            keys = [entry['Key'] for entry in page.get('Contents', ())]
+            if keys:
+                yield keys
+
+    def _delete_keys(self, keys):
+        if not keys:
+            return
+        response = self.bucket.delete_objects(
+            Delete={
+                'Objects': [{'Key': key} for key in keys],
+                'Quiet': True,
+            },
+        )
+        # With ``Quiet``, only the keys that couldn't be deleted are returned.
+        errors = response.get('Errors')
+        if errors:
+            log.error(
+                'Failed to delete files from storage.',
+                errors=[
+                    {'key': error.get('Key'), 'code': error.get('Code')}
+                    for error in errors[:10]
+                ],
+                count=len(errors),
+            )
+            raise OSError(f'Failed to delete {len(errors)} files from storage.')
+
 
 class S3BuildCommandsStorage(S3PrivateBucketMixin, S3Boto3Storage):
 
@@ -1,5 +1,6 @@
 """Git-related utilities."""
 
+import os
 import re
 
 import git
@@ -19,6 +20,7 @@ from readthedocs.projects.constants import (
 from readthedocs.projects.exceptions import RepositoryError
 from readthedocs.projects.validators import validate_submodule_url
 from readthedocs.vcs_support.base import BaseVCS, VCSVersion
+from readthedocs.vcs_support.mirrors import GitMirrorCache
 
 log = structlog.get_logger(__name__)
 
@@ -38,6 +40,7 @@ class Backend(BaseVCS):
         super().__init__(*args, **kwargs)
         self.token = kwargs.get('token')
         self.repo_url = self._get_clone_url()
+        self.mirrors = GitMirrorCache.from_settings()
 
     def _get_clone_url(self):
         if '://' in self.repo_url:
@@ -188,20 +191,97 @@ class Backend(BaseVCS):
             )
 
     def clone(self):
-        """Clones the repository."""
+        """
+        Clones the repository.
+
+        If the builder has a mirror of the repository,
+        the mirror is updated (if it's writable in the environment)
+        and used as reference for the clone.
+        """
         cmd = ['git', 'clone', '--no-single-branch']
 
         if self.use_shallow_clone():
             cmd.extend(['--depth', str(self.repo_depth)])
 
-        cmd.extend([self.repo_url, '.'])
-
         try:
-            code, stdout, stderr = self.run(*cmd)
+            mirror_path = self.get_mirror_path()
+            if mirror_path:
+                # Don't evict the mirror while it's updated and cloned from.
+                with self.mirrors.lock(mirror_path):
+                    # The mirror could have been evicted before it was locked.
+                    exists = self.mirrors.touch(mirror_path)
+                    # Read-only mirrors are used as they are.
+                    writable = exists and self.environment.git_mirror_mode == 'rw'
+                    if exists and (not writable or self.update_mirror(mirror_path)):
+                        cmd.extend(['--reference', mirror_path, '--dissociate'])
+                    cmd.extend([self.repo_url, '.'])
+                    code, stdout, stderr = self.run(*cmd)
+                    if writable:
+                        self.mirrors.update_size(mirror_path)
+            else:
+                cmd.extend([self.repo_url, '.'])
+                code, stdout, stderr = self.run(*cmd)
             return code, stdout, stderr
         except RepositoryError:
             raise RepositoryError(RepositoryError.CLONE_ERROR())
 
+    def get_mirror_path(self):
+        """
+        Return the path to the mirror of the repository.
+
+        The mirror is created when the build environment is started
+        (see ``DockerBuildEnvironment._get_binds``),
+        and it's only available in environments with a ``git_mirror_mode``.
+        External versions don't use the mirror.
+
+        :returns: the path to the mirror,
+         or ``None`` if there is no mirror of the repository.
+        """
+        if any([
+                not self.mirrors,
+                not getattr(self.environment, 'git_mirror_mode', None),
+                self.version_type == EXTERNAL,
+                self.token,
+        ]):
+            return None
+        if not self.mirrors.can_mirror(self.project):
+            return None
+        path = self.mirrors.get_path(self.project)
+        if not os.path.exists(path):
+            return None
+        return path
+
+    def update_mirror(self, path):
+        """
+        Fetch the branches and tags of the repository into the mirror at ``path``.
+
+        The fetch runs in the build environment, like the clone.
+        Hooks are disabled, so they aren't run even if they were added to the mirror.
+
+        :returns: ``True`` if the mirror was updated.
+        """
+        code, _, _ = self.run(
+            'git',
+            '-c',
+            'core.hooksPath=/dev/null',
+            '--git-dir',
+            path,
+            'fetch',
+            '--prune',
+            '--force',
+            self.repo_url,
+            '+refs/heads/*:refs/heads/*',
+            '+refs/tags/*:refs/tags/*',
+            record=False,
+        )
+        if code != 0:
+            log.warning(
+                'Git mirror update failed, cloning without mirror.',
+                project_slug=self.project.slug,
+            )
+            return False
+        return True
+
     def lsremote(self, include_tags=True, include_branches=True):
         """
         Use ``git ls-remote`` to list branches and tags without cloning the repository.
@@ -0,0 +1,254 @@
+"""
+Cache of bare git mirrors on the builders.
+
+Cloning a repository from scratch on each build is most of the time
+of the VCS step for big repositories.
+When ``RTD_GIT_MIRRORS_DIR`` is set, builders keep a bare mirror of the repository
+of each project they build (keyed by the project and its URL), update it before each clone,
+and clone with ``--reference`` to the mirror,
+so only the objects that aren't in the mirror are downloaded.
+``--dissociate`` is used, so the checkout doesn't depend on the mirror after the clone.
+
+Mirrors are only kept for public projects with repositories cloned without credentials
+(see ``GitMirrorCache.can_mirror``).
+The mirror is created empty on the builder, and only the mirror of the project
+is mounted in the container that clones its repository, where it's updated and cloned from.
+It isn't mounted in the container that builds the docs,
+and it isn't used for external versions (pull requests),
+so pull requests and the code that builds the docs can't change the mirror used by later builds.
+Since mirrors aren't shared between projects,
+a build can't change the contents of the mirror used by other projects.
+
+Mirrors are locked with ``flock`` while they are updated and cloned from, or evicted.
+The least recently used mirrors are removed when the size of all mirrors
+is over ``RTD_GIT_MIRRORS_MAX_SIZE`` bytes,
+the modification time of a mirror is updated each time it's used (see ``GitMirrorCache.touch``).
+The size of each mirror is recorded next to it after it's updated,
+so the other mirrors aren't walked on each build.
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager, suppress
+from urllib.parse import urlparse
+
+import structlog
+from django.conf import settings
+
+from readthedocs.projects.constants import PUBLIC
+
+log = structlog.get_logger(__name__)
+
+# Max number of seconds to wait to create a mirror.
+MIRROR_CREATE_TIMEOUT = 60
+
+# Schemes of the repositories that can be cloned without credentials.
+MIRROR_URL_SCHEMES = ('http', 'https', 'git', 'file')
+
+
+class GitMirrorError(Exception):
+    pass
+
+
+class GitMirrorCache:
+
+    """
+    Bare git mirrors stored in ``root``.
+
+    :param root: Directory where the mirrors are stored.
+    :param max_size: Max size in bytes of all the mirrors together.
+    """
+
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = int(max_size)
+
+    @classmethod
+    def from_settings(cls):
+        """Return the mirror cache of this builder, or ``None`` if it isn't enabled."""
+        if not settings.RTD_GIT_MIRRORS_DIR:
+            return None
+        return cls(
+            root=settings.RTD_GIT_MIRRORS_DIR,
+            max_size=settings.RTD_GIT_MIRRORS_MAX_SIZE,
+        )
+
+    @staticmethod
+    def can_mirror(project):
+        """
+        Check if the repository of ``project`` can be mirrored.
+
+        Mirrors are only kept for public projects,
+        with repositories that are cloned without credentials
+        (SSH URLs, and URLs with a user or a token, are for private repositories).
+        """
+        if project.privacy_level != PUBLIC:
+            return False
+        parsed = urlparse(project.repo)
+        return parsed.scheme in MIRROR_URL_SCHEMES and '@' not in parsed.netloc
+
+    def get_path(self, project):
+        digest = hashlib.sha256(f'{project.pk}:{project.repo}'.encode()).hexdigest()
+        return os.path.join(self.root, f'{digest}.git')
+
+    @contextmanager
+    def lock(self, path, blocking=True):
+        """
+        Lock the mirror at ``path``.
+
+        :raises BlockingIOError: if ``blocking`` is ``False``
+         and the mirror is already locked.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        lock_path = f'{path}.lock'
+        while True:
+            lock_file = open(lock_path, 'a')  # pylint: disable=consider-using-with
+            try:
+                operation = fcntl.LOCK_EX
+                if not blocking:
+                    operation |= fcntl.LOCK_NB
+                fcntl.flock(lock_file, operation)
+            except BaseException:
+                lock_file.close()
+                raise
+            # The lock file is removed when the mirror is evicted,
+            # lock again if it was removed while waiting for the lock.
+            try:
+                locked = os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino
+            except FileNotFoundError:
+                locked = False
+            if locked:
+                break
+            lock_file.close()
+
+        with lock_file:
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def touch(path):
+        """
+        Mark the mirror at ``path`` as used, it must be called holding its lock.
+
+        The modification time is used to evict the least recently used mirrors.
+
+        :returns: ``False`` if the mirror doesn't exist (e.g. it was evicted).
+        """
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def create(self, project):
+        """
+        Create the mirror of the repository of ``project`` if it doesn't exist.
+
+        The mirror is created empty, it's updated from the build environment.
+
+        :returns: the path to the mirror.
+        :raises GitMirrorError: if the mirror couldn't be created.
+        """
+        path = self.get_path(project)
+        with self.lock(path):
+            if not os.path.exists(path):
+                self._create(path)
+            self.touch(path)
+        self.evict(keep=path)
+        return path
+
+    def update_size(self, path):
+        """
+        Record the size of the mirror at ``path``.
+
+        It's called after the mirror is updated,
+        so only the mirror that changed is walked to get its size.
+        """
+        size = self._get_size(path)
+        # Write to a temporary file, so the size is never read half written.
+        tmp_path = f'{path}.size.tmp'
+        with open(tmp_path, 'w') as size_file:
+            size_file.write(str(size))
+        os.replace(tmp_path, f'{path}.size')
+        return size
+
+    def get_size(self, path):
+        """
+        Return the recorded size of the mirror at ``path``.
+
+        Mirrors without a recorded size haven't been updated yet, they are empty.
+        """
+        try:
+            with open(f'{path}.size') as size_file:
+                return int(size_file.read())
+        except (OSError, ValueError):
+            return 0
+
+    def evict(self, keep=None):
+        """Remove the least recently used mirrors until they fit in ``max_size``."""
+        mirrors = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name.endswith('.git'):
+                mirrors.append((entry.stat().st_mtime, entry.path, self.get_size(entry.path)))
+
+        total_size = sum(size for _, _, size in mirrors)
+        for _, path, size in sorted(mirrors):
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                with self.lock(path, blocking=False):
+                    shutil.rmtree(path, ignore_errors=True)
+                    if os.path.exists(path):
+                        log.warning('Git mirror could not be evicted.', path=path)
+                        continue
+                    for filename in (f'{path}.size', f'{path}.lock'):
+                        with suppress(FileNotFoundError):
+                            os.remove(filename)
+            except BlockingIOError:
+                # The mirror is being used by another build.
+                continue
+            total_size -= size
+            log.info('Git mirror evicted.', path=path, size=size)
+
+    def _create(self, path):
+        # Create the mirror in a temporary directory,
+        # so a failed creation doesn't leave a broken mirror behind.
+        tmp_path = tempfile.mkdtemp(dir=self.root, suffix='.tmp')
+        try:
+            self._git(tmp_path, 'init', '--bare', '--quiet')
+            os.rename(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    @staticmethod
+    def _get_size(path):
+        size = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    # Mirrors are written from build containers, don't follow symlinks.
+                    size += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        return size
+
+    @staticmethod
+    def _git(path, *args):
+        try:
+            subprocess.run(
+                ['git', '--git-dir', path, *args],
+                check=True,
+                capture_output=True,
+                timeout=MIRROR_CREATE_TIMEOUT,
+                env={**os.environ, 'GIT_TERMINAL_PROMPT': '0'},
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            raise GitMirrorError(str(e)) from e